@@ -24,19 +24,35 @@ Run:
     python app.py
 """
 
+import logging
 import os
 import sys
 import pathlib
 
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
-from flask_session import Session
 
 from config import get_config
+from utils.capture import capture_traffic
+from utils.log import configure_logging
+from utils.metrics import instrument_app
+from utils.sessions import init_sessions
+from utils.static_files import StaticManifest
+
+logger = logging.getLogger(__name__)
 
 # Path to frontend build directory
 FRONTEND_DIST = pathlib.Path(__file__).parent.parent / "frontend" / "dist"
 
+# Waitress worker threads in production (SERVER_THREADS overrides). Each
+# synchronous generation request holds one for the whole generation.
+DEFAULT_SERVER_THREADS = 16
+
+
+def server_threads():
+    """Get the number of waitress worker threads to serve with."""
+    return int(os.getenv("SERVER_THREADS", DEFAULT_SERVER_THREADS))
+
 
 def create_app(config_class=None):
     """
@@ -55,9 +71,14 @@ def create_app(config_class=None):
         config_class = get_config()
     app.config.from_object(config_class)
 
+    # Log through a background writer thread (see utils/log.py)
+    configure_logging(app.config.get("LOG_LEVEL"), app.config.get("LOG_FORMAT"))
+
     # Initialize extensions
     CORS(app, origins=app.config.get("CORS_ORIGINS", ["*"]))
-    Session(app)
+    init_sessions(app)
+    instrument_app(app)
+    capture_traffic(app)
 
     # Register blueprints
     from blueprints.profile import profile_bp
@@ -90,24 +111,27 @@ def create_app(config_class=None):
 
     @app.errorhandler(Exception)
     def handle_exception(error):
-        print(f"Unhandled error: {error}")
+        logger.exception("Unhandled error: %s", error)
         return jsonify({
             "error": "internal_error",
             "message": str(error)
         }), 500
 
-    # Serve React frontend static files (for non-API routes only)
+    # Serve React frontend static files (for non-API routes only) from an
+    # in-memory, precompressed manifest (reloaded on change in debug mode)
+    frontend = StaticManifest(FRONTEND_DIST, reload=app.debug)
+
     @app.route("/", defaults={"path": ""})
     @app.route("/<path:path>")
     def serve_frontend(path):
         # Don't serve frontend for API routes - let them 404 properly
         if path.startswith("api"):
             return jsonify({"error": "not_found", "message": "API endpoint not found"}), 404
-        # If path exists as a file, serve it (JS, CSS, images, etc.)
-        if path and (FRONTEND_DIST / path).exists():
-            return send_from_directory(FRONTEND_DIST, path)
-        # Otherwise serve index.html for client-side routing
-        return send_from_directory(FRONTEND_DIST, "index.html")
+        # Files (JS, CSS, images, etc.), else index.html for client-side routing
+        response = frontend.serve(path)
+        if response is None:
+            return not_found(None)
+        return response
 
     return app
 
@@ -124,13 +148,15 @@ def check_environment():
     missing = [var for var in required_vars if not os.getenv(var)]
 
     if missing:
-        print(f"Missing required environment variables: {', '.join(missing)}")
+        logger.error("Missing required environment variables: %s", ", ".join(missing))
         sys.exit(1)
 
     # Check for system refresh token (warn but don't exit)
     if not os.getenv("SPOTIFY_SYSTEM_REFRESH_TOKEN"):
-        print("WARNING: SPOTIFY_SYSTEM_REFRESH_TOKEN not set.")
-        print("Visit /api/admin/spotify-setup?key=YOUR_ADMIN_SECRET to configure.")
+        logger.warning(
+            "SPOTIFY_SYSTEM_REFRESH_TOKEN not set. "
+            "Visit /api/admin/spotify-setup?key=YOUR_ADMIN_SECRET to configure."
+        )
 
 
 # Create the app instance
@@ -151,11 +177,14 @@ if __name__ == "__main__":
 
     PORT = int(os.getenv("PORT", 5001))
     DEBUG = os.getenv("FLASK_ENV") != "production"
+    THREADS = server_threads()
 
     if DEBUG:
-        print(f"Running in development mode on http://127.0.0.1:{PORT}")
+        logger.info("Running in development mode on http://127.0.0.1:%s", PORT)
         app.run(host="0.0.0.0", port=PORT, debug=True)
     else:
         from waitress import serve
-        print(f"Running in production mode on http://0.0.0.0:{PORT}")
-        serve(app, host="0.0.0.0", port=PORT)
+        logger.info(
+            "Running in production mode on http://0.0.0.0:%s with %s threads", PORT, THREADS
+        )
+        serve(app, host="0.0.0.0", port=PORT, threads=THREADS)
@@ -0,0 +1,299 @@
+"""
+ASGI entry point: serve the API with async I/O for its slow waits.
+
+Under waitress every request holds a thread until it finishes, and most
+of that time is spent waiting on Spotify or Logic. Here the Flask app
+still runs on worker threads (via asgiref's WSGI adapter, at most
+ASGI_THREADS views at once), but the waits are moved onto an event loop
+(see utils/handoff.py):
+
+- Profile and playlist lookups call Spotify with an async client.
+- Generation jobs run as tasks on the loop, awaiting their Logic
+  execution; only the Spotify steps of a generation use worker threads.
+- Requests waiting for a generation, and event streams following one,
+  wait on the loop instead of holding a thread.
+
+So one process can hold hundreds of in-flight generations and lookups.
+Everything else is served by the Flask app unchanged.
+
+Requires asgiref, httpx and an ASGI server. Run from backend/ with one event loop
+per process, e.g.:
+    uvicorn asgi:app --host 0.0.0.0 --port 8080
+Raise MAX_PENDING_JOBS to let more generations run at once.
+"""
+
+import asyncio
+import io
+import logging
+import os
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from asgiref.wsgi import WsgiToAsgi
+
+try:
+    import httpx
+except ImportError:  # optional: only needed for this entry point
+    httpx = None
+
+from services import jobs
+from services.logic_api import get_logic_client
+from services.system_account import close_async_spotify
+from utils.handoff import Handoff, current_handoff
+
+logger = logging.getLogger(__name__)
+
+# Flask views running at once, each on its own worker thread; views only
+# block on quick calls now
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", 32))
+
+
+class AsyncApp:
+    """ASGI application running a Flask app with deferred waits on its loop."""
+
+    def __init__(self, flask_app, threads=ASGI_THREADS):
+        """
+        Args:
+            flask_app: Flask application
+            threads: Flask views allowed to run at once
+        """
+        self.flask_app = flask_app
+        self.threads = threads
+        self._wsgi = WsgiToAsgi(_closing(flask_app))
+        self._slots = None  # created on the server's loop
+        self._started = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            if not self._started:
+                self._startup()  # server without lifespan support
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    # Lifespan
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self._startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self._shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _startup(self):
+        if httpx is None:
+            raise RuntimeError("asgi.py requires httpx (pip install httpx)")
+        jobs.set_event_loop(asyncio.get_running_loop())
+        self._slots = asyncio.Semaphore(self.threads)
+        self._started = True
+        logger.info("Serving with async I/O", extra={"threads": self.threads})
+
+    async def _shutdown(self):
+        jobs.set_event_loop(None)
+        await close_async_spotify()
+        await get_logic_client().aclose()
+
+    # Requests
+
+    async def _http(self, scope, receive, send):
+        handoff = Handoff()
+        messages = []
+
+        async def hold(message):
+            # Sent from here once the view returns: a deferred view's own
+            # response is only a placeholder for the final one, and sending
+            # from the worker thread's context would leak asgiref's thread
+            # state into the server's next request on the connection
+            messages.append(message)
+
+        async def receive_body():
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise _Disconnected
+            return message
+
+        token = current_handoff.set(handoff)
+        try:
+            async with self._slots:
+                # Each request gets its own worker thread (asgiref would
+                # otherwise run every view on one shared thread)
+                async with ThreadSensitiveContext():
+                    await self._wsgi(_join_cookies(scope), receive_body, hold)
+        except _Disconnected:
+            return  # client went away before sending the whole body
+        finally:
+            current_handoff.reset(token)
+
+        if not handoff.deferred:
+            for message in messages:
+                await send(message)
+            return
+
+        status, headers = messages[0]["status"], messages[0]["headers"]
+        if handoff.stream is not None:
+            await self._send_stream(send, receive, status, headers, handoff.stream)
+        else:
+            status, headers, content = await self._finish_deferred(headers, handoff)
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": content})
+        handoff.finish(status)
+
+    async def _finish_deferred(self, headers, handoff):
+        """
+        Await a deferred view's awaitable and render the final response.
+
+        Returns:
+            tuple: (status, headers, body)
+        """
+        try:
+            result, error = await handoff.awaitable, None
+        except Exception as e:
+            result, error = None, e
+
+        async with self._slots:
+            status, rendered_headers, content = await sync_to_async(
+                self._render, thread_sensitive=False
+            )(handoff, result, error)
+        return status, merge_headers(headers, rendered_headers), content
+
+    def _render(self, handoff, result, error):
+        """
+        Call a deferred view's render function in its request's context.
+
+        Returns:
+            tuple: (status, encoded headers, body)
+        """
+        app = self.flask_app
+        # The request body was read (and its buffer closed) by the view
+        environ = dict(handoff.environ, **{"wsgi.input": io.BytesIO()})
+        with app.request_context(environ):
+            try:
+                response = app.make_response(handoff.render(result, error))
+            except Exception as e:
+                response = app.make_response(app.handle_user_exception(e))
+            # Drops the body of 304s and HEAD requests, as serving it would
+            body, status, headers = response.get_wsgi_response(environ)
+            return int(status.split(" ", 1)[0]), _encode_headers(headers), b"".join(body)
+
+    async def _send_stream(self, send, receive, status, headers, chunks):
+        """Send a deferred stream until it ends or the client disconnects."""
+        headers = [(name, value) for name, value in headers if name != b"content-length"]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+
+        async def pump():
+            async for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        streaming = asyncio.ensure_future(pump())
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+
+        if not streaming.done():
+            # Cancelling the pump closes the stream (and its job wait)
+            streaming.cancel()
+            try:
+                await streaming
+            except asyncio.CancelledError:
+                pass
+            return
+        disconnected.cancel()
+        if streaming.exception() is not None:
+            logger.error("Stream failed", exc_info=streaming.exception())
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class _Disconnected(Exception):
+    """The client disconnected while sending its request body."""
+
+
+def _closing(wsgi_app):
+    """
+    Wrap a WSGI app so its response iterable is always closed (asgiref
+    doesn't call close(), which runs Flask's call_on_close callbacks).
+    """
+    def app(environ, start_response):
+        result = wsgi_app(environ, start_response)
+        try:
+            yield from result
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
+    return app
+
+
+def _join_cookies(scope):
+    """
+    Combine repeated Cookie headers (e.g. split across HTTP/2 frames) with
+    "; ", as RFC 9113 requires; asgiref would join them with ",".
+    """
+    headers = scope.get("headers", [])
+    cookies = [value for name, value in headers if name == b"cookie"]
+    if len(cookies) < 2:
+        return scope
+    headers = [(name, value) for name, value in headers if name != b"cookie"]
+    headers.append((b"cookie", b"; ".join(cookies)))
+    return dict(scope, headers=headers)
+
+
+def merge_headers(base, override):
+    """
+    Combine the headers of a deferred view's placeholder response with
+    those of its final response.
+
+    Headers in ``override`` replace ones of the same name in ``base``,
+    except Vary, whose values are combined. The placeholder's own
+    Content-Type and Content-Length are dropped.
+
+    Args:
+        base: Placeholder (name, value) headers (cookies, CORS, ...)
+        override: Final response (name, value) headers
+
+    Both are ASGI headers: byte strings with lowercase names.
+
+    Returns:
+        list: Merged (name, value) headers
+    """
+    replaced = {name for name, _ in override} | {b"content-type", b"content-length"}
+    merged = [(name, value) for name, value in base if name not in replaced]
+    merged.extend(override)
+
+    vary = []
+    for name, value in merged:
+        if name == b"vary":
+            vary.extend(item.strip() for item in value.split(b",") if item.strip())
+    merged = [(name, value) for name, value in merged if name != b"vary"]
+    if vary:
+        merged.append((b"vary", b", ".join(dict.fromkeys(vary))))
+    return merged
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _encode_headers(headers):
+    return [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in headers
+    ]
+
+
+def _create_app():
+    from app import app as flask_app
+    return AsyncApp(flask_app)
+
+
+app = _create_app()
@@ -0,0 +1 @@
+"""End-to-end benchmarks against local Spotify and Logic stand-ins (see run.py)."""
@@ -0,0 +1,364 @@
+"""
+Local stand-ins for the Spotify and Logic APIs.
+
+One threaded HTTP server answers the Spotify accounts (token), Spotify Web
+API and Logic execution endpoints the app uses, with generated but
+deterministic data. Each upstream has its own latency profile, error rate
+and 429 rate, so the generation pipeline can be measured (and stressed)
+without touching live services.
+
+Point the app at it with:
+    SPOTIFY_TOKEN_URL={base}/api/token
+    SPOTIFY_API_URL={base}/
+    LOGIC_API_BASE={base}/logic
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class UpstreamProfile:
+    """Latency and failure behaviour of one stand-in upstream."""
+
+    def __init__(self, latency=0.05, jitter=0.3, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, samples=None):
+        """
+        Args:
+            latency: Median response time in seconds
+            jitter: Spread of the log-normal latency distribution (0 = fixed)
+            error_rate: Fraction of requests answered with a 500
+            throttle_rate: Fraction of requests answered with a 429
+            retry_after: Retry-After seconds sent with a 429
+            samples: Recorded response times to draw from instead of the
+                     log-normal distribution (e.g. from a traffic capture)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.samples = list(samples or ())
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Sample a response time."""
+        if self.samples:
+            with self._lock:
+                return self._random.choice(self.samples)
+        if self.latency <= 0:
+            return 0.0
+        with self._lock:
+            return self.latency * self._random.lognormvariate(0, self.jitter)
+
+    def failure(self):
+        """Pick an injected failure status (429 or 500), or None."""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+
+def _seed(*parts):
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _track(number):
+    """Generated catalog track number ``number``."""
+    artist = number % 400
+    return {
+        "id": f"track{number:07d}",
+        "name": f"Song {number}",
+        "artists": [{"name": f"Artist {artist}"}],
+        "album": {
+            "name": f"Album {number // 10}",
+            "release_date": f"{1960 + number % 64}-01-01",
+            "images": [{"url": f"https://images.example/{number // 10}.jpg"}],
+        },
+    }
+
+
+class FakeUpstream:
+    """
+    Threaded stand-in server for Spotify and Logic.
+
+    Requests are counted per endpoint, so a benchmark can report how many
+    upstream calls each app request costs.
+    """
+
+    def __init__(self, spotify=None, logic=None, catalog_size=5000, playlist_size=150,
+                 recommendations=30, miss_rate=0.05):
+        """
+        Args:
+            spotify: UpstreamProfile for the Spotify endpoints
+            logic: UpstreamProfile for Logic executions
+            catalog_size: Number of distinct tracks Logic recommends from
+            playlist_size: Tracks in every source playlist
+            recommendations: Tracks per Logic response
+            miss_rate: Fraction of recommended tracks search can't find
+        """
+        self.spotify = spotify or UpstreamProfile()
+        self.logic = logic or UpstreamProfile(latency=1.0, jitter=0.2)
+        self.catalog_size = catalog_size
+        self.playlist_size = playlist_size
+        self.recommendations = recommendations
+        self.miss_rate = miss_rate
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._public_url = None
+
+    @property
+    def base_url(self):
+        if self._public_url:
+            return self._public_url.rstrip("/")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host="127.0.0.1", port=0, public_url=None):
+        """
+        Start serving in a background thread.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            public_url: URL the app reaches the server at, if not the bound
+                        address (used for pagination links)
+
+        Returns:
+            str: Base URL of the server
+        """
+        self._public_url = public_url
+        upstream = self
+
+        class Handler(_Handler):
+            pass
+
+        Handler.upstream = upstream
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-upstream", daemon=True
+        )
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        """Stop the server."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def count(self, endpoint):
+        with self._calls_lock:
+            self.calls[endpoint] += 1
+
+    def reset_counts(self):
+        """Clear the per-endpoint call counts and return the old ones."""
+        with self._calls_lock:
+            calls = dict(self.calls)
+            self.calls.clear()
+        return calls
+
+    # Spotify data
+
+    def playlist(self, playlist_id, offset=0, limit=100):
+        rng = random.Random(_seed("playlist", playlist_id))
+        numbers = [rng.randrange(self.catalog_size) for _ in range(self.playlist_size)]
+        items = [{"track": _track(n)} for n in numbers[offset:offset + limit]]
+        return items
+
+    def search_tracks(self, query, limit):
+        match = re.match(r"track:(.*?) artist:(.*)$", query)
+        name, artist = (match.group(1), match.group(2)) if match else (query, "")
+        if random.Random(_seed("miss", name, artist)).random() < self.miss_rate:
+            return []
+
+        number = _seed("search", name) % self.catalog_size
+        found = _track(number)
+        found["name"] = name
+        if artist:
+            found["artists"] = [{"name": artist}]
+        # Pad with unrelated candidates, as a real search would
+        others = [_track((number + i * 7919) % self.catalog_size) for i in range(1, limit)]
+        return [found] + others
+
+    def logic_response(self, document, payload):
+        rng = random.Random(_seed("logic", document, json.dumps(payload, sort_keys=True)))
+        recommendations = []
+        for _ in range(self.recommendations):
+            track = _track(rng.randrange(self.catalog_size))
+            recommendations.append({
+                "name": track["name"],
+                "artist": track["artists"][0]["name"],
+            })
+        return {
+            "output": {
+                "playlistTitle": f"Benchmark mix {rng.randrange(10 ** 6)}",
+                "playlistDesc": "Generated by the benchmark stand-in",
+                "recommendations": recommendations,
+            }
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes stand-in requests. ``upstream`` is set per server."""
+
+    upstream = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        upstream = self.upstream
+        is_logic = url.path.startswith("/logic/")
+        profile = upstream.logic if is_logic else upstream.spotify
+        endpoint = self._endpoint(method, url.path)
+        upstream.count(endpoint)
+
+        time.sleep(profile.delay())
+        failure = profile.failure()
+        if failure == 429:
+            self._send(429, {"error": {"status": 429, "message": "rate limited"}},
+                       {"Retry-After": str(profile.retry_after)})
+            return
+        if failure == 500:
+            self._send(500, {"error": {"status": 500, "message": "injected error"}})
+            return
+
+        try:
+            status, payload = self._handle(method, url.path, query, body)
+        except Exception as e:
+            status, payload = 500, {"error": {"status": 500, "message": str(e)}}
+        self._send(status, payload)
+
+    @staticmethod
+    def _endpoint(method, path):
+        """Collapse IDs out of a path for per-endpoint counting."""
+        path = re.sub(r"/(users|playlists)/[^/]+", r"/\1/{id}", path)
+        path = re.sub(r"/documents/[^/]+", "/documents/{doc}", path)
+        return f"{method} {path}"
+
+    def _handle(self, method, path, query, body):
+        upstream = self.upstream
+        base = upstream.base_url
+
+        if path == "/api/token":
+            return 200, {"access_token": "benchmark-token", "token_type": "Bearer",
+                         "expires_in": 3600}
+
+        match = re.match(r"^/logic/documents/([^/]+)/executions$", path)
+        if match and method == "POST":
+            return 200, upstream.logic_response(match.group(1), json.loads(body or b"{}"))
+
+        if path == "/v1/me/":
+            return 200, {"id": "benchmark-system"}
+
+        if path == "/v1/search":
+            limit = int(query.get("limit", 10))
+            if query.get("type") == "playlist":
+                items = [self._playlist_summary(f"found{_seed(query.get('q'), i) % 10 ** 6}")
+                         for i in range(limit)]
+                return 200, {"playlists": {"items": items}}
+            return 200, {"tracks": {"items": upstream.search_tracks(query.get("q", ""), limit)}}
+
+        match = re.match(r"^/v1/users/([^/]+)$", path)
+        if match:
+            user_id = match.group(1)
+            return 200, {
+                "id": user_id,
+                "display_name": f"Benchmark {user_id}",
+                "images": [],
+                "external_urls": {"spotify": f"https://open.spotify.com/user/{user_id}"},
+            }
+
+        match = re.match(r"^/v1/users/([^/]+)/playlists$", path)
+        if match and method == "GET":
+            user_id = match.group(1)
+            offset = int(query.get("offset", 0))
+            limit = int(query.get("limit", 50))
+            total = 30
+            items = [self._playlist_summary(f"{user_id}-{i}")
+                     for i in range(offset, min(offset + limit, total))]
+            next_url = None
+            if offset + limit < total:
+                next_url = f"{base}/v1/users/{user_id}/playlists?offset={offset + limit}&limit={limit}"
+            return 200, {"items": items, "next": next_url, "total": total}
+        if match and method == "POST":
+            name = json.loads(body or b"{}").get("name", "")
+            return 201, {"id": f"created{_seed(name, time.time()) % 10 ** 9}", "name": name}
+
+        match = re.match(r"^/v1/playlists/([^/]+)/tracks$", path)
+        if match and method == "GET":
+            offset = int(query.get("offset", 0))
+            limit = int(query.get("limit", 100))
+            return 200, {"items": upstream.playlist(match.group(1), offset, limit)}
+        if match and method == "POST":
+            return 201, {"snapshot_id": "benchmark-snapshot"}
+
+        match = re.match(r"^/v1/playlists/([^/]+)$", path)
+        if match and method == "PUT":
+            return 200, {}
+        if match:
+            playlist_id = match.group(1)
+            return 200, {
+                "id": playlist_id,
+                "name": f"Playlist {playlist_id}",
+                "images": [],
+                "snapshot_id": f"snapshot-{playlist_id}",
+                "owner": {"id": "owner", "display_name": "Owner"},
+                "tracks": {
+                    "total": upstream.playlist_size,
+                    "items": upstream.playlist(playlist_id, 0, 100),
+                },
+            }
+
+        return 404, {"error": {"status": 404, "message": f"No stand-in for {method} {path}"}}
+
+    def _playlist_summary(self, playlist_id):
+        return {
+            "id": playlist_id,
+            "name": f"Playlist {playlist_id}",
+            "public": True,
+            "images": [],
+            "owner": {"id": "owner", "display_name": "Owner"},
+            "tracks": {"total": self.upstream.playlist_size},
+            "external_urls": {"spotify": f"https://open.spotify.com/playlist/{playlist_id}"},
+        }
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
@@ -0,0 +1,300 @@
+"""
+Replay captured API traffic for capacity testing.
+
+Reads a capture written with TRAFFIC_CAPTURE_PATH (see utils/capture.py)
+and reissues each client's request sequence (profile -> playlists ->
+validate -> generate -> job polling) against a target, keeping the
+recorded inter-arrival times divided by --speed. Requests from one client
+go out in order, so a slow response delays that client's next request the
+way it would delay a real visitor; different clients run concurrently.
+
+Upstream calls are answered by the local stand-in (benchmarks/
+fake_services.py), with response times drawn from the upstream timings in
+the capture and the recorded error rates. Only timings were captured, not
+upstream bodies, so the stand-in generates its data.
+
+Without --target, the app is booted locally against the stand-in. With
+--target, the stand-in is started on --stub-host/--stub-port and the
+environment the target must run with is printed before replay starts.
+
+Run from backend/:
+    python -m benchmarks.replay capture.jsonl --speed 4
+    python -m benchmarks.replay capture.jsonl --speed 10 --concurrency 64 --output replay.json
+    python -m benchmarks.replay capture.jsonl --target http://staging:5001 \\
+        --stub-host 0.0.0.0 --stub-url http://bench-host:8900 --stub-port 8900
+"""
+
+import argparse
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .fake_services import FakeUpstream, UpstreamProfile
+from .run import _configure_environment, _serve_app, _stop_app, percentile
+
+# Captured pseudonyms look like "user3f9c0a6b21d4e587"
+_PSEUDONYM = re.compile(r"\b[a-z]*[0-9a-f]{16}\b")
+
+
+def load_capture(path):
+    """
+    Read a capture file.
+
+    Returns:
+        tuple: (clients, upstream) where clients maps client ID to its
+               request records in time order, and upstream is the list of
+               upstream call records
+    """
+    clients = defaultdict(list)
+    upstream = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("type") == "request":
+                clients[record["client"]].append(record)
+            elif record.get("type") == "upstream":
+                upstream.append(record)
+
+    for records in clients.values():
+        records.sort(key=lambda r: r["t"])
+    return dict(clients), upstream
+
+
+def upstream_profiles(upstream):
+    """
+    Build stand-in profiles from captured upstream timings.
+
+    Returns:
+        tuple: (spotify, logic) UpstreamProfile
+    """
+    profiles = []
+    for service in ("spotify", "logic"):
+        records = [r for r in upstream if r["service"] == service]
+        samples = [r["duration"] for r in records if not r["error"]]
+        errors = sum(1 for r in records if r["error"])
+        profiles.append(UpstreamProfile(
+            latency=0.05 if service == "spotify" else 1.0,
+            samples=samples,
+            error_rate=errors / len(records) if records else 0.0,
+        ))
+    return tuple(profiles)
+
+
+def route_of(record):
+    """Group label for a request record, e.g. "GET /api/profile/{id}"."""
+    return f"{record['method']} {_PSEUDONYM.sub('{id}', record['path'])}"
+
+
+class Replayer:
+    """Reissue captured client sequences against a base URL."""
+
+    def __init__(self, base_url, speed=1.0, timeout=300):
+        self.base_url = base_url.rstrip("/")
+        self.speed = speed
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.results = []  # (route, recorded status, status, latency, lag)
+
+    def replay_client(self, records, started, first_t):
+        """
+        Send one client's requests in order, each no earlier than its
+        recorded offset divided by the speed.
+        """
+        session = requests.Session()
+        job_id = None
+
+        for record in records:
+            due = started + (record["t"] - first_t) / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            lag = max(0.0, time.monotonic() - due)
+
+            path = record["path"]
+            if "{job}" in path:
+                if job_id is None:
+                    continue  # the generate request that created it failed
+                path = path.replace("{job}", job_id)
+
+            sent = time.monotonic()
+            try:
+                response = session.request(
+                    record["method"],
+                    f"{self.base_url}{path}",
+                    params=record.get("query"),
+                    json=record.get("json"),
+                    headers=record.get("headers"),
+                    stream=record.get("streamed", False),
+                    timeout=self.timeout,
+                )
+                if record.get("streamed"):
+                    for _ in response.iter_content(chunk_size=None):
+                        pass
+                status = response.status_code
+                if status == 202:
+                    job_id = response.json().get("job_id") or job_id
+            except requests.RequestException:
+                status = "error"
+            latency = time.monotonic() - sent
+
+            with self._lock:
+                self.results.append((route_of(record), record["status"], status, latency, lag))
+
+    def run(self, clients, concurrency):
+        """
+        Replay every client.
+
+        Returns:
+            float: Wall-clock duration of the replay in seconds
+        """
+        first_t = min(records[0]["t"] for records in clients.values())
+        ordered = sorted(clients.values(), key=lambda records: records[0]["t"])
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for records in ordered:
+                pool.submit(self.replay_client, records, started, first_t)
+        return time.monotonic() - started
+
+
+def _is_error(status):
+    return status == "error" or status >= 500
+
+
+def build_report(results, duration, recorded_span, speed):
+    """
+    Summarize replay results per route and overall.
+
+    Returns:
+        dict: Report with throughput, latency percentiles, errors, status
+              mismatches against the capture, and schedule lag (how late
+              requests went out because their client was still waiting)
+    """
+    def summarize(rows):
+        latencies = sorted(row[3] for row in rows)
+        return {
+            "requests": len(rows),
+            "errors": sum(1 for row in rows if _is_error(row[2])),
+            "status_mismatches": sum(1 for row in rows if row[1] != row[2]),
+            "latency": {
+                "p50": round(percentile(latencies, 50), 4),
+                "p95": round(percentile(latencies, 95), 4),
+                "p99": round(percentile(latencies, 99), 4),
+                "max": round(latencies[-1], 4) if latencies else 0.0,
+            },
+        }
+
+    by_route = defaultdict(list)
+    for row in results:
+        by_route[row[0]].append(row)
+
+    lags = sorted(row[4] for row in results)
+    report = summarize(results)
+    report.update(
+        speed=speed,
+        duration=round(duration, 3),
+        recorded_span=round(recorded_span, 3),
+        throughput=round(len(results) / duration, 3) if duration else 0.0,
+        lag={
+            "p50": round(percentile(lags, 50), 4),
+            "p95": round(percentile(lags, 95), 4),
+            "max": round(lags[-1], 4) if lags else 0.0,
+        },
+        routes={route: summarize(rows) for route, rows in sorted(by_route.items())},
+    )
+    return report
+
+
+def print_report(report):
+    print(
+        f"{report['requests']} requests in {report['duration']:.1f}s "
+        f"(recorded {report['recorded_span']:.1f}s at {report['speed']}x): "
+        f"{report['throughput']:.2f} req/s, {report['errors']} errors, "
+        f"{report['status_mismatches']} status mismatches, "
+        f"lag p95 {report['lag']['p95'] * 1000:.0f}ms"
+    )
+    for route, summary in report["routes"].items():
+        latency = summary["latency"]
+        print(
+            f"  {route:<45} n={summary['requests']:<5} err={summary['errors']:<4} "
+            f"p50={latency['p50'] * 1000:>7.0f}ms p95={latency['p95'] * 1000:>7.0f}ms "
+            f"p99={latency['p99'] * 1000:>7.0f}ms"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture", help="Capture file (TRAFFIC_CAPTURE_PATH output)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed multiplier (4 = four times as fast)")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="Max clients replayed at once")
+    parser.add_argument("--target", help="Base URL to replay against (default: local app)")
+    parser.add_argument("--stub-host", default="127.0.0.1",
+                        help="Interface for the upstream stand-in")
+    parser.add_argument("--stub-port", type=int, default=0,
+                        help="Port for the upstream stand-in (default: any free port)")
+    parser.add_argument("--stub-url",
+                        help="URL the target reaches the stand-in at (default: bound address)")
+    parser.add_argument("--server", choices=("waitress", "asgi"), default="waitress",
+                        help="Server for the local app (see benchmarks.run --server)")
+    parser.add_argument("--threads", type=int,
+                        help="Worker threads for the local app (default: production's)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    clients, upstream_records = load_capture(args.capture)
+    if not clients:
+        print("No requests in capture", file=sys.stderr)
+        return 2
+
+    spotify, logic = upstream_profiles(upstream_records)
+    upstream = FakeUpstream(spotify=spotify, logic=logic)
+    stub_url = upstream.start(args.stub_host, args.stub_port, public_url=args.stub_url)
+
+    times = [r["t"] for records in clients.values() for r in records]
+    recorded_span = max(times) - min(times)
+
+    with tempfile.TemporaryDirectory(prefix="replay-") as data_dir:
+        server = None
+        if args.target:
+            base_url = args.target
+            print("Run the target with:")
+            print(f"  SPOTIFY_TOKEN_URL={stub_url}/api/token")
+            print(f"  SPOTIFY_API_URL={stub_url}/")
+            print(f"  LOGIC_API_BASE={stub_url}/logic")
+            print(f"Replaying against {base_url}")
+        else:
+            _configure_environment(stub_url, data_dir, logic_cache=0)
+            base_url, server, thread = _serve_app(data_dir, args.threads, args.server)
+
+        replayer = Replayer(base_url, speed=args.speed)
+        try:
+            duration = replayer.run(clients, args.concurrency)
+        finally:
+            if server:
+                _stop_app(server, thread)
+            upstream.stop()
+
+    report = build_report(replayer.results, duration, recorded_span, args.speed)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""
+End-to-end benchmark of the API against local Spotify and Logic stand-ins.
+
+Boots the stand-in upstream (benchmarks/fake_services.py), points the app
+at it, serves create_app() with waitress (or, with --server asgi, asgi.py
+under uvicorn) and drives each scenario at each concurrency level. Reports throughput, latency percentiles and upstream
+calls per request, and can fail when results regress against a baseline.
+
+Scenarios:
+    profile            GET  /api/profile/<user>
+    playlists          GET  /api/profile/<user>/playlists
+    search-playlists   GET  /api/search/playlists?q=...
+    generate-text      POST /api/generate/from-text
+    generate-playlist  POST /api/generate/from-playlist
+
+Generation requests follow their job (polling its status URL, as the
+frontend follows its event stream) until it finishes, so their latency is
+the whole generation.
+
+Every request uses a new user, query, description or playlist, so app-side
+caches don't hide upstream cost (the track cache and catalog still warm up
+over a run, as they would in production).
+
+Run from backend/:
+    python -m benchmarks.run
+    python -m benchmarks.run --scenarios generate-text --concurrency 1,8 --requests 40
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --server asgi --concurrency 16,64
+    python -m benchmarks.run --baseline results.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .fake_services import FakeUpstream, UpstreamProfile
+
+# Seconds between job status polls of a generation request
+JOB_POLL_INTERVAL = 0.05
+
+SCENARIOS = (
+    "profile",
+    "playlists",
+    "search-playlists",
+    "generate-text",
+    "generate-playlist",
+)
+
+
+def _request(session, base_url, scenario):
+    """
+    Send one request for a scenario.
+
+    Returns:
+        requests.Response: The response (for generations, the 202 with
+                           their job; see _follow_job)
+    """
+    unique = uuid.uuid4().hex[:12]
+    if scenario == "profile":
+        return session.get(f"{base_url}/api/profile/user{unique}", timeout=120)
+    if scenario == "playlists":
+        return session.get(f"{base_url}/api/profile/user{unique}/playlists", timeout=120)
+    if scenario == "search-playlists":
+        return session.get(f"{base_url}/api/search/playlists",
+                           params={"q": f"mix {unique}"}, timeout=120)
+    if scenario == "generate-text":
+        return session.post(f"{base_url}/api/generate/from-text",
+                            json={"description": f"Upbeat songs for a road trip {unique}"},
+                            timeout=300)
+    if scenario == "generate-playlist":
+        return session.post(f"{base_url}/api/generate/from-playlist",
+                            json={"playlist_id": f"source{unique}"}, timeout=300)
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def _follow_job(session, base_url, response):
+    """
+    Poll a generation's job until it finishes.
+
+    Args:
+        response: The generate request's response (a 202 for a job)
+
+    Returns:
+        int: The response's status if it wasn't a job, else 200 if the job
+             succeeded or 500 if it failed
+    """
+    if response.status_code != 202:
+        return response.status_code
+
+    status_url = base_url + response.json()["status_url"]
+    while True:
+        time.sleep(JOB_POLL_INTERVAL)
+        poll = session.get(status_url, timeout=120)
+        if poll.status_code != 200:
+            return poll.status_code
+        status = poll.json()["status"]
+        if status == "succeeded":
+            return 200
+        if status == "failed":
+            return 500
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values: Sorted list of numbers
+        pct: Percentile (0-100)
+
+    Returns:
+        float: The percentile, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def run_scenario(base_url, upstream, scenario, concurrency, total):
+    """
+    Send ``total`` requests for a scenario from ``concurrency`` clients.
+
+    Returns:
+        dict: Result with requests, errors, duration, throughput, latency
+              percentiles (seconds) and upstream calls per request
+    """
+    local = threading.local()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = _request(session, base_url, scenario)
+            status = _follow_job(session, base_url, response)
+        except requests.RequestException:
+            status = "error"
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    upstream.reset_counts()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    duration = time.perf_counter() - started
+    calls = upstream.reset_counts()
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items()
+                 if status == "error" or status >= 400)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "duration": round(duration, 3),
+        "throughput": round(total / duration, 3) if duration else 0.0,
+        "latency": {
+            "mean": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+        "upstream_calls_per_request": {
+            endpoint: round(count / total, 2) for endpoint, count in sorted(calls.items())
+        },
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Find regressions against a baseline run.
+
+    A scenario/concurrency pair regresses if its p95 latency grew, or its
+    throughput fell, by more than ``tolerance`` (a fraction), or if it has
+    errors where the baseline had none. Pairs missing from the baseline are
+    skipped.
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        key = (result["scenario"], result["concurrency"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        label = f"{key[0]} @ {key[1]}"
+
+        p95, old_p95 = result["latency"]["p95"], before["latency"]["p95"]
+        if old_p95 and p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{label}: p95 {old_p95:.3f}s -> {p95:.3f}s")
+
+        rps, old_rps = result["throughput"], before["throughput"]
+        if old_rps and rps < old_rps * (1 - tolerance):
+            regressions.append(f"{label}: throughput {old_rps:.2f}/s -> {rps:.2f}/s")
+
+        if result["errors"] and not before["errors"]:
+            regressions.append(f"{label}: {result['errors']} errors (baseline had none)")
+    return regressions
+
+
+def _print_result(result):
+    latency = result["latency"]
+    calls = sum(result["upstream_calls_per_request"].values())
+    print(
+        f"{result['scenario']:<18} c={result['concurrency']:<3} "
+        f"n={result['requests']:<4} err={result['errors']:<3} "
+        f"rps={result['throughput']:<8.2f} "
+        f"p50={latency['p50'] * 1000:>7.0f}ms p95={latency['p95'] * 1000:>7.0f}ms "
+        f"p99={latency['p99'] * 1000:>7.0f}ms max={latency['max'] * 1000:>7.0f}ms "
+        f"upstream/req={calls:.1f}"
+    )
+
+
+def _configure_environment(base_url, data_dir, logic_cache):
+    """Point the app's settings at the stand-ins. Must run before importing the app."""
+    os.environ.update({
+        "SPOTIFY_TOKEN_URL": f"{base_url}/api/token",
+        "SPOTIFY_API_URL": f"{base_url}/",
+        "LOGIC_API_BASE": f"{base_url}/logic",
+        "SPOTIFY_SYSTEM_REFRESH_TOKEN": "benchmark",
+        "SPOTIPY_CLIENT_ID": "benchmark",
+        "SPOTIPY_CLIENT_SECRET": "benchmark",
+        "LOGIC_API_TOKEN": "benchmark",
+        "TRACK_CACHE_PATH": os.path.join(data_dir, "track_cache.sqlite3"),
+        "CATALOG_PATH": os.path.join(data_dir, "catalog.sqlite3"),
+        "RATE_LIMIT_DB_PATH": os.path.join(data_dir, "rate_limit.sqlite3"),
+        "LOGIC_CACHE_TTL": str(logic_cache),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    })
+
+
+def _serve_app(data_dir, threads=None, server="waitress"):
+    """
+    Serve create_app() on a free local port.
+
+    Args:
+        data_dir: Directory for the app's SQLite files
+        threads: Worker threads (None: production's count)
+        server: "waitress", or "asgi" for asgi.py under uvicorn
+
+    Returns:
+        tuple: (base_url, server, thread running the server)
+    """
+    from waitress import create_server
+
+    from app import create_app, server_threads
+    from config import ProductionConfig
+
+    class BenchmarkConfig(ProductionConfig):
+        RATE_LIMIT_MAX = 10 ** 9
+
+    app = create_app(BenchmarkConfig)
+    if server == "asgi":
+        return _serve_asgi(app, threads)
+
+    server = create_server(
+        app, host="127.0.0.1", port=0, threads=threads or server_threads()
+    )
+    thread = threading.Thread(target=server.run, name="benchmark-app", daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.effective_port}", server, thread
+
+
+def _serve_asgi(flask_app, threads=None):
+    """Serve a Flask app through asgi.py with uvicorn; see _serve_app."""
+    import socket
+
+    import uvicorn
+
+    from asgi import ASGI_THREADS, AsyncApp
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(
+        AsyncApp(flask_app, threads or ASGI_THREADS), lifespan="on", log_level="warning",
+    ))
+    thread = threading.Thread(
+        target=server.run, kwargs={"sockets": [sock]}, name="benchmark-app", daemon=True
+    )
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("ASGI server failed to start")
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", server, thread
+
+
+def _app_threads(server):
+    """Worker threads of a server started by _serve_app."""
+    if hasattr(server, "adj"):
+        return server.adj.threads
+    return server.config.app.threads
+
+
+def _stop_app(server, thread):
+    """Let in-flight requests finish, then close the app server."""
+    if not hasattr(server, "task_dispatcher"):  # uvicorn
+        server.should_exit = True
+        thread.join(timeout=10)
+        return
+
+    from waitress import wasyncore
+
+    server.task_dispatcher.shutdown(timeout=10)
+    # Close the sockets from the server's own loop, so it exits instead of
+    # polling closed file descriptors
+    server.trigger.pull_trigger(lambda: wasyncore.close_all(server._map))
+    thread.join(timeout=10)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="Comma-separated scenarios (default: all)")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        help="Comma-separated client concurrency levels")
+    parser.add_argument("--requests", type=int, default=32,
+                        help="Requests per scenario and concurrency level")
+    parser.add_argument("--spotify-latency", type=float, default=0.04,
+                        help="Median Spotify response time in seconds")
+    parser.add_argument("--logic-latency", type=float, default=0.5,
+                        help="Median Logic execution time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.3,
+                        help="Log-normal spread of upstream latencies (0 = fixed)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of upstream requests answered with a 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of Spotify requests answered with a 429")
+    parser.add_argument("--retry-after", type=int, default=1,
+                        help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--recommendations", type=int, default=30,
+                        help="Tracks per Logic response")
+    parser.add_argument("--playlist-size", type=int, default=150,
+                        help="Tracks in every source playlist")
+    parser.add_argument("--logic-cache", type=int, default=0,
+                        help="LOGIC_CACHE_TTL for the run (default 0: disabled)")
+    parser.add_argument("--server", choices=("waitress", "asgi"), default="waitress",
+                        help="Serve the app with waitress (production) or asgi.py "
+                             "under uvicorn (needs asgiref, httpx and uvicorn)")
+    parser.add_argument("--threads", type=int,
+                        help="Worker threads (default: production's, SERVER_THREADS "
+                             "or 16; ASGI_THREADS or 32 with --server asgi)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed p95/throughput regression as a fraction")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    upstream = FakeUpstream(
+        spotify=UpstreamProfile(
+            latency=args.spotify_latency, jitter=args.jitter, error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+        ),
+        logic=UpstreamProfile(
+            latency=args.logic_latency, jitter=args.jitter, error_rate=args.error_rate,
+        ),
+        playlist_size=args.playlist_size,
+        recommendations=args.recommendations,
+    )
+    upstream_url = upstream.start()
+
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as data_dir:
+        _configure_environment(upstream_url, data_dir, args.logic_cache)
+        base_url, server, thread = _serve_app(data_dir, args.threads, args.server)
+        args.threads = _app_threads(server)
+
+        results = []
+        try:
+            for scenario in scenarios:
+                for concurrency in levels:
+                    result = run_scenario(base_url, upstream, scenario, concurrency, args.requests)
+                    _print_result(result)
+                    results.append(result)
+        finally:
+            _stop_app(server, thread)
+            upstream.stop()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "settings": {key: value for key, value in vars(args).items()
+                     if key not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
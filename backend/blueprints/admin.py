@@ -4,13 +4,67 @@ Admin API Blueprint
 Handles admin routes for system account OAuth setup.
 """
 
+import hmac
+import logging
 import os
-from flask import Blueprint, request, redirect, jsonify
+from flask import Blueprint, Response, request, redirect, jsonify
 import spotipy
 
+from services import catalog, jobs, track_cache
+from services.logic_api import get_logic_client
+from services.system_account import get_scheduler_stats, get_token_stats
+from utils.metrics import generate_latest, render_gauges
+
+logger = logging.getLogger(__name__)
+
 admin_bp = Blueprint("admin", __name__)
 
 
+def _is_admin():
+    """Check the admin secret from ?key= or an "Authorization: Bearer" header."""
+    admin_secret = os.getenv("ADMIN_SECRET")
+    if not admin_secret:
+        return False
+
+    provided_key = request.args.get("key")
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        provided_key = auth[len("Bearer "):]
+
+    return bool(provided_key) and hmac.compare_digest(provided_key, admin_secret)
+
+
+@admin_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Prometheus metrics for the app.
+
+    Requires the admin secret as ?key= or an "Authorization: Bearer" header
+    (Prometheus can send it with its bearer_token scrape setting).
+
+    Returns:
+        text/plain: Latency histograms and counters for routes, outbound
+                    calls and generations, plus gauges for the caches,
+                    scheduler, token refresher and job queue
+    """
+    if not _is_admin():
+        return jsonify({"error": "unauthorized"}), 401
+
+    lines = [generate_latest()]
+    lines.extend(render_gauges("spotify_scheduler", get_scheduler_stats()))
+    lines.extend(render_gauges("spotify_token", get_token_stats()))
+    lines.extend(render_gauges("logic_client", get_logic_client().get_stats()))
+    lines.extend(render_gauges("track_cache", track_cache.get_stats()))
+    lines.extend(render_gauges("catalog", catalog.get_stats()))
+    lines.extend(render_gauges("generation_jobs", jobs.get_stats()))
+
+    return Response(
+        "\n".join(lines) + "\n",
+        mimetype="text/plain; version=0.0.4",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
 @admin_bp.route("/debug-env", methods=["GET"])
 def debug_env():
     """Debug endpoint to check if environment variables are loaded."""
@@ -45,16 +99,6 @@ def admin_spotify_setup():
     admin_secret = os.getenv("ADMIN_SECRET")
     provided_key = request.args.get("key")
 
-    # Debug logging
-    print(f"[Admin] ADMIN_SECRET set: {bool(admin_secret)}")
-    if admin_secret:
-        print(f"[Admin] ADMIN_SECRET length: {len(admin_secret)}, starts with: {admin_secret[:4]}...")
-    print(f"[Admin] Provided key: {bool(provided_key)}")
-    if provided_key:
-        print(f"[Admin] Provided key length: {len(provided_key)}, starts with: {provided_key[:4]}...")
-    if admin_secret and provided_key:
-        print(f"[Admin] Keys match: {admin_secret == provided_key}")
-
     if not admin_secret:
         return jsonify({
             "error": "config_error",
@@ -62,6 +106,7 @@ def admin_spotify_setup():
         }), 500
 
     if not provided_key or provided_key != admin_secret:
+        logger.warning("Rejected admin setup request", extra={"key_provided": bool(provided_key)})
         return jsonify({
             "error": "unauthorized",
             "message": "Invalid or missing admin key"
@@ -69,7 +114,7 @@ def admin_spotify_setup():
 
     # Create OAuth manager for system account setup
     redirect_uri = os.getenv("SPOTIPY_REDIRECT_URI")
-    print(f"[Admin OAuth] Using redirect URI: {redirect_uri}")
+    logger.info("Starting system account OAuth setup", extra={"redirect_uri": redirect_uri})
 
     auth_manager = spotipy.oauth2.SpotifyOAuth(
         client_id=os.getenv("SPOTIPY_CLIENT_ID"),
@@ -80,7 +125,6 @@ def admin_spotify_setup():
     )
 
     auth_url = auth_manager.get_authorize_url()
-    print(f"[Admin OAuth] Generated auth URL: {auth_url[:100]}...")
     return redirect(auth_url)
 
 
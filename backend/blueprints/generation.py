@@ -4,17 +4,307 @@ Generation API Blueprint
 Handles playlist generation endpoints.
 """
 
-from flask import Blueprint, jsonify, request
+import functools
+import hashlib
+import json
+import logging
+
+from flask import Blueprint, Response, g, jsonify, request, url_for
 from services.system_account import (
     parse_playlist_id_from_url,
     get_playlist_tracks,
-    create_playlist_on_system_account,
+    get_playlist_snapshot_id,
+)
+from services.logic_api import (
+    analyze_playlist,
+    analyze_playlist_async,
+    generate_from_text,
+    generate_from_text_async,
+)
+from services.jobs import (
+    submit_job,
+    get_job,
+    has_event_loop,
+    wait_for_job,
+    wait_for_job_async,
+    wait_for_events,
+    wait_for_events_async,
+    JobQueueFull,
 )
-from services.logic_api import analyze_playlist, generate_from_text
-from utils.rate_limit import rate_limit_required
+from utils.handoff import can_defer, defer, defer_stream
+from utils.rate_limit import get_session_id, rate_limit_required
+
+logger = logging.getLogger(__name__)
 
 generation_bp = Blueprint("generation", __name__)
 
+# Seconds between keep-alive comments on an idle event stream
+SSE_HEARTBEAT = 15
+
+# Milliseconds before a client polls the event stream again when it isn't
+# held open (see stream_generation_job)
+SSE_POLL_RETRY = 1000
+
+# Longest a waiting generation request waits before answering 202 with its
+# job instead (see _wait_timeout)
+SYNC_WAIT_TIMEOUT = 60
+
+# Seconds a finished generation answers repeats of a request carrying the
+# same Idempotency-Key (requests without a key use the jobs default)
+IDEMPOTENCY_KEY_WINDOW = 600
+
+
+def _run_playlist_generation(playlist_id, fresh=False, progress=None):
+    """
+    Create a playlist on the system account and fill it with recommendations
+    based on an existing playlist.
+
+    Args:
+        playlist_id: Spotify playlist ID to analyze
+        fresh: If True, don't reuse a cached Logic result
+        progress: Optional callback(event, **data) for reporting progress
+
+    Returns:
+        dict: Generated playlist info with tracks
+    """
+    # Analyze source playlist and populate a new playlist
+    result = analyze_playlist(playlist_id, progress=progress, use_cache=not fresh)
+
+    return _generation_response(result)
+
+
+def _run_text_generation(description, fresh=False, progress=None):
+    """
+    Create a playlist on the system account and fill it with recommendations
+    based on a text description.
+
+    Args:
+        description: Text description of desired playlist
+        fresh: If True, don't reuse a cached Logic result
+        progress: Optional callback(event, **data) for reporting progress
+
+    Returns:
+        dict: Generated playlist info with tracks
+    """
+    # Generate playlist from text
+    result = generate_from_text(description, progress=progress, use_cache=not fresh)
+
+    return _generation_response(result)
+
+
+async def _run_playlist_generation_async(playlist_id, fresh=False, progress=None):
+    """Async _run_playlist_generation, for jobs on the ASGI server's event loop."""
+    result = await analyze_playlist_async(playlist_id, progress=progress, use_cache=not fresh)
+
+    return _generation_response(result)
+
+
+async def _run_text_generation_async(description, fresh=False, progress=None):
+    """Async _run_text_generation, for jobs on the ASGI server's event loop."""
+    result = await generate_from_text_async(description, progress=progress, use_cache=not fresh)
+
+    return _generation_response(result)
+
+
+def _generation_response(result):
+    """Build the JSON payload returned for a generated playlist."""
+    playlist_id = result["playlist_id"]
+    return {
+        "playlist_id": playlist_id,
+        "playlist_url": f"https://open.spotify.com/playlist/{playlist_id}",
+        "title": result["title"],
+        "description": result["description"],
+        "tracks": result["tracks"],
+        "not_found": result.get("not_found", [])
+    }
+
+
+def _playlist_generation_error(error):
+    """Map a from-playlist generation exception to (payload, status)."""
+    if isinstance(error, ValueError):
+        return {
+            "error": "playlist_error",
+            "message": str(error)
+        }, 400
+
+    logger.error("Error generating playlist: %s", error, exc_info=error)
+    return {
+        "error": "generation_error",
+        "message": "Failed to generate playlist. Please try again."
+    }, 500
+
+
+def _text_generation_error(error):
+    """Map a from-text generation exception to (payload, status)."""
+    if isinstance(error, ValueError):
+        return {
+            "error": "generation_error",
+            "message": str(error)
+        }, 400
+
+    logger.error("Error generating playlist from text: %s", error, exc_info=error)
+    return {
+        "error": "generation_error",
+        "message": "Failed to generate playlist. Please try again."
+    }, 500
+
+
+def _preferences():
+    """Parse the Prefer header into a dict of preference -> value (or "")."""
+    preferences = {}
+    for item in request.headers.get("Prefer", "").split(","):
+        name, _, value = item.split(";", 1)[0].partition("=")
+        if name.strip():
+            preferences[name.strip().lower()] = value.strip().strip('"')
+    return preferences
+
+
+def _wait_timeout(data):
+    """
+    Decide how long a generation request waits for its result.
+
+    Requests get a 202 with their job straight away unless the client asks
+    to wait (the "wait" flag, or "Prefer: wait=<seconds>"), so generations
+    don't hold request threads under waitress. Under the ASGI server a wait
+    costs no thread, so requests wait by default there, unless they ask
+    for the job (the "async" flag, or "Prefer: respond-async").
+
+    Returns:
+        float: Seconds to wait (at most SYNC_WAIT_TIMEOUT), or None to
+               answer 202 immediately
+    """
+    preferences = _preferences()
+    if data.get("async") or "respond-async" in preferences:
+        return None
+
+    if "wait" in preferences:
+        try:
+            return max(0.0, min(float(preferences["wait"]), SYNC_WAIT_TIMEOUT))
+        except ValueError:
+            return SYNC_WAIT_TIMEOUT
+    if data.get("wait") or can_defer():
+        return SYNC_WAIT_TIMEOUT
+    return None
+
+
+def _request_fingerprint(kind, content):
+    """
+    Fingerprint a generation request so duplicates can share one job.
+
+    Scoped to the session, so another user's identical request gets its
+    own playlist. Includes the Idempotency-Key header when the client
+    sends one.
+
+    Args:
+        kind: Generation type ("from-playlist" or "from-text")
+        content: Normalized request content
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    parts = [
+        kind,
+        get_session_id(),
+        content,
+        request.headers.get("Idempotency-Key", ""),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def _submit_generation(kind, func, args, error_handler, fingerprint):
+    """
+    Run a generation as a job, attaching to a matching in-flight one.
+
+    By default the request gets a 202 pointing at the job. Requests that
+    wait (see _wait_timeout) return the job's result like a normal call,
+    falling back to the 202 if it takes longer than their wait.
+    Duplicate submissions don't count toward the rate limit.
+    """
+    window = {}
+    if request.headers.get("Idempotency-Key"):
+        window["dedupe_window"] = IDEMPOTENCY_KEY_WINDOW
+
+    try:
+        job = submit_job(
+            kind, func, *args,
+            error_handler=error_handler,
+            dedupe_key=fingerprint,
+            **window,
+        )
+    except JobQueueFull as e:
+        return jsonify({
+            "error": "server_busy",
+            "message": f"{e}. Please try again in a minute."
+        }), 503
+
+    if job["deduplicated"]:
+        g.rate_limit_refund = True
+
+    timeout = _wait_timeout(request.get_json())
+    if timeout is None:
+        return _job_accepted(job, job["deduplicated"])
+
+    respond = functools.partial(_job_response, deduplicated=job["deduplicated"])
+    if can_defer():
+        return defer(wait_for_job_async(job["id"], timeout), respond)
+    return respond(wait_for_job(job["id"], timeout), None)
+
+
+def _job_accepted(job, deduplicated):
+    """Build the 202 response pointing at a job that is still running."""
+    status_url = url_for("generation.get_generation_job", job_id=job["id"])
+    response = jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": status_url,
+        "events_url": url_for("generation.stream_generation_job", job_id=job["id"]),
+        "deduplicated": deduplicated,
+    })
+    response.status_code = 202
+    response.headers["Location"] = status_url
+    return response
+
+
+def _job_response(job, error, deduplicated=False):
+    """Build the response of a request that waited for its job."""
+    if error is not None:
+        raise error
+    if job["status"] in ("queued", "running"):
+        return _job_accepted(job, deduplicated)
+    if job["status"] == "succeeded":
+        return jsonify(job["result"])
+    return jsonify(job["error"]), job["http_status"]
+
+
+def _format_event(event):
+    """Format a job event as a Server-Sent Event."""
+    return (
+        f"id: {event['id']}\n"
+        f"event: {event['event']}\n"
+        f"data: {json.dumps(event['data'])}\n\n"
+    )
+
+
+async def _stream_events_async(job_id, after):
+    """Async version of the event stream in stream_generation_job."""
+    yield "retry: 2000\n\n"
+
+    while True:
+        update = await wait_for_events_async(job_id, after=after, timeout=SSE_HEARTBEAT)
+        if update is None:
+            return
+
+        events, finished = update
+        if not events and not finished:
+            yield ": keep-alive\n\n"
+
+        for event in events:
+            after = event["id"]
+            yield _format_event(event)
+
+        if finished:
+            return
+
 
 @generation_bp.route("/generate/test-rate-limit", methods=["POST"])
 @rate_limit_required
@@ -93,7 +383,7 @@ def get_tracks(playlist_id):
         }), 404
 
     except Exception as e:
-        print(f"Error fetching playlist tracks: {e}")
+        logger.exception("Error fetching playlist tracks")
         return jsonify({
             "error": "api_error",
             "message": "Failed to fetch playlist from Spotify"
@@ -144,7 +434,7 @@ def validate_playlist_url():
         }), 400
 
     except Exception as e:
-        print(f"Error validating playlist: {e}")
+        logger.exception("Error validating playlist")
         return jsonify({
             "error": "api_error",
             "message": "Couldn't access this playlist. Make sure it's public."
@@ -159,9 +449,25 @@ def generate_from_playlist():
 
     Request body:
         playlist_id: Spotify playlist ID to analyze
+        wait: Optional; if true, wait for the result (up to
+              SYNC_WAIT_TIMEOUT) instead of returning 202 with a job ID
+              ("Prefer: wait=<seconds>" works too). Under the ASGI server
+              requests wait by default.
+        async: Optional; if true, return 202 with a job ID even under the
+               ASGI server (a "Prefer: respond-async" header works too)
+        fresh: Optional; if true, don't reuse a recent Logic result for the
+               same input
+
+    Headers:
+        Idempotency-Key: Optional; repeats with the same key get the same
+                         result instead of a new playlist
+
+    Duplicate submissions (same source playlist and snapshot) attach to
+    the generation already in progress.
 
     Returns:
-        JSON: Generated playlist info with tracks
+        JSON: The queued job (202), or the generated playlist info with
+              tracks for a request that waited
     """
     data = request.get_json()
     playlist_id = data.get("playlist_id")
@@ -173,36 +479,25 @@ def generate_from_playlist():
         }), 400
 
     try:
-        # Create new playlist on system account
-        new_playlist_id = create_playlist_on_system_account(
-            "GEN: Work in Progress",
-            "Being generated by the Logic API"
-        )
-
-        # Analyze source playlist and populate new playlist
-        result = analyze_playlist(playlist_id, new_playlist_id)
+        snapshot_id = get_playlist_snapshot_id(playlist_id)
+    except ValueError as e:
+        payload, status = _playlist_generation_error(e)
+        return jsonify(payload), status
+    except Exception as e:
+        # Let the generation itself surface the error
+        logger.warning("Error probing playlist snapshot: %s", e)
+        snapshot_id = ""
 
-        return jsonify({
-            "playlist_id": new_playlist_id,
-            "playlist_url": f"https://open.spotify.com/playlist/{new_playlist_id}",
-            "title": result["title"],
-            "description": result["description"],
-            "tracks": result["tracks"],
-            "not_found": result.get("not_found", [])
-        })
+    fresh = bool(data.get("fresh"))
 
-    except ValueError as e:
-        return jsonify({
-            "error": "playlist_error",
-            "message": str(e)
-        }), 400
+    # Under the ASGI server, generations run on its event loop
+    run = _run_playlist_generation_async if has_event_loop() else _run_playlist_generation
 
-    except Exception as e:
-        print(f"Error generating playlist: {e}")
-        return jsonify({
-            "error": "generation_error",
-            "message": "Failed to generate playlist. Please try again."
-        }), 500
+    return _submit_generation(
+        "from-playlist", run, (playlist_id, fresh),
+        _playlist_generation_error,
+        _request_fingerprint("from-playlist", f"{playlist_id}:{snapshot_id}:{fresh}"),
+    )
 
 
 @generation_bp.route("/generate/from-text", methods=["POST"])
@@ -213,9 +508,25 @@ def generate_from_text_route():
 
     Request body:
         description: Text description of desired playlist
+        wait: Optional; if true, wait for the result (up to
+              SYNC_WAIT_TIMEOUT) instead of returning 202 with a job ID
+              ("Prefer: wait=<seconds>" works too). Under the ASGI server
+              requests wait by default.
+        async: Optional; if true, return 202 with a job ID even under the
+               ASGI server (a "Prefer: respond-async" header works too)
+        fresh: Optional; if true, don't reuse a recent Logic result for the
+               same input
+
+    Headers:
+        Idempotency-Key: Optional; repeats with the same key get the same
+                         result instead of a new playlist
+
+    Duplicate submissions (same normalized description) attach to the
+    generation already in progress.
 
     Returns:
-        JSON: Generated playlist info with tracks
+        JSON: The queued job (202), or the generated playlist info with
+              tracks for a request that waited
     """
     data = request.get_json()
     description = data.get("description", "").strip()
@@ -226,34 +537,104 @@ def generate_from_text_route():
             "message": "description is required"
         }), 400
 
-    try:
-        # Create new playlist on system account
-        new_playlist_id = create_playlist_on_system_account(
-            "GEN: Work in Progress",
-            "Being generated by the Logic API"
-        )
+    fresh = bool(data.get("fresh"))
+    normalized = " ".join(description.casefold().split())
 
-        # Generate playlist from text
-        result = generate_from_text(description, new_playlist_id)
+    run = _run_text_generation_async if has_event_loop() else _run_text_generation
 
-        return jsonify({
-            "playlist_id": new_playlist_id,
-            "playlist_url": f"https://open.spotify.com/playlist/{new_playlist_id}",
-            "title": result["title"],
-            "description": result["description"],
-            "tracks": result["tracks"],
-            "not_found": result.get("not_found", [])
-        })
+    return _submit_generation(
+        "from-text", run, (description, fresh),
+        _text_generation_error,
+        _request_fingerprint("from-text", f"{normalized}:{fresh}"),
+    )
 
-    except ValueError as e:
+
+@generation_bp.route("/generate/jobs/<job_id>", methods=["GET"])
+def get_generation_job(job_id):
+    """
+    Get the status of a background generation job.
+
+    Args:
+        job_id: Job ID returned by a generate endpoint called with async
+
+    Returns:
+        JSON: { job_id, kind, status, stage, progress, result, error }
+              status is one of queued, running, succeeded, failed
+    """
+    job = get_job(job_id)
+
+    if not job:
         return jsonify({
-            "error": "generation_error",
-            "message": str(e)
-        }), 400
+            "error": "job_not_found",
+            "message": "Generation job not found or expired"
+        }), 404
 
-    except Exception as e:
-        print(f"Error generating playlist from text: {e}")
+    return jsonify({
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "result": job["result"],
+        "error": job["error"],
+    })
+
+
+@generation_bp.route("/generate/jobs/<job_id>/events", methods=["GET"])
+def stream_generation_job(job_id):
+    """
+    Stream a generation job's progress as Server-Sent Events.
+
+    Events (each with a JSON data payload):
+        fetching_playlist, waiting_for_logic: stage changes
+        logic_response: { title, description, tracks_total }
+        track: { index, track, query } as each recommendation resolves
+                (track is null if it wasn't found on Spotify)
+        adding_tracks, tracks_added: playlist is being / has been filled
+        done: { result } with the same payload as the synchronous endpoint
+        failed: { error } with the same payload as the synchronous endpoint
+
+    Reconnecting clients resume after the Last-Event-ID header. Under the
+    ASGI server the stream stays open until the job finishes. Otherwise a
+    held-open stream would tie up a worker thread for the whole generation,
+    so each response sends the events so far and ends, and EventSource
+    reconnects SSE_POLL_RETRY ms later to poll for more.
+
+    Args:
+        job_id: Job ID returned by a generate endpoint called with async
+
+    Returns:
+        text/event-stream response
+    """
+    if not get_job(job_id):
         return jsonify({
-            "error": "generation_error",
-            "message": "Failed to generate playlist. Please try again."
-        }), 500
+            "error": "job_not_found",
+            "message": "Generation job not found or expired"
+        }), 404
+
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        last_event_id = 0
+
+    def poll():
+        yield f"retry: {SSE_POLL_RETRY}\n\n"
+
+        update = wait_for_events(job_id, after=last_event_id, timeout=0)
+        if update is None:
+            return
+        for event in update[0]:
+            yield _format_event(event)
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    }
+    # Under the ASGI server, follow the job on the event loop
+    if can_defer():
+        return defer_stream(
+            _stream_events_async(job_id, last_event_id),
+            mimetype="text/event-stream",
+            headers=headers,
+        )
+    return Response(poll(), mimetype="text/event-stream", headers=headers)
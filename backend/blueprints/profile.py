@@ -4,15 +4,24 @@ Profile API Blueprint
 Handles user profile and playlist fetching endpoints.
 """
 
-from flask import Blueprint, jsonify, request
+import logging
+
+from flask import Blueprint, current_app, jsonify, request
 import spotipy
 from services.system_account import (
     parse_user_id_from_url,
     get_user_profile,
+    get_user_profile_async,
     get_user_public_playlists,
+    get_user_public_playlists_async,
     parse_playlist_id_from_url,
     get_system_spotify,
 )
+from utils.handoff import can_defer, defer
+from utils.http_cache import cacheable_json
+from utils.metrics import track_outbound
+
+logger = logging.getLogger(__name__)
 
 profile_bp = Blueprint("profile", __name__)
 
@@ -27,6 +36,7 @@ def get_profile(username):
 
     Returns:
         JSON: User profile with id, display_name, images, external_urls
+              (with ETag/Cache-Control headers; 304 if unchanged)
     """
     # Parse user ID from various input formats
     user_id = parse_user_id_from_url(username)
@@ -37,22 +47,34 @@ def get_profile(username):
             "message": "Invalid Spotify username or URL"
         }), 400
 
+    # Under the ASGI server, wait for Spotify on the event loop
+    if can_defer():
+        return defer(get_user_profile_async(user_id), _profile_response)
+
     try:
-        profile = get_user_profile(user_id)
-        return jsonify(profile)
+        return _profile_response(get_user_profile(user_id), None)
+    except Exception as e:
+        return _profile_response(None, e)
 
-    except ValueError as e:
+
+def _profile_response(profile, error):
+    """Build the get_profile response from the lookup's result or error."""
+    if error is None:
+        return cacheable_json(
+            profile, current_app.config.get("PROFILE_CACHE_MAX_AGE", 300)
+        )
+
+    if isinstance(error, ValueError):
         return jsonify({
             "error": "user_not_found",
-            "message": str(e)
+            "message": str(error)
         }), 404
 
-    except Exception as e:
-        print(f"Error fetching profile: {e}")
-        return jsonify({
-            "error": "api_error",
-            "message": "Failed to fetch profile from Spotify"
-        }), 500
+    logger.error("Error fetching profile: %s", error, exc_info=error)
+    return jsonify({
+        "error": "api_error",
+        "message": "Failed to fetch profile from Spotify"
+    }), 500
 
 
 @profile_bp.route("/profile/<username>/playlists", methods=["GET"])
@@ -65,6 +87,7 @@ def get_playlists(username):
 
     Returns:
         JSON: Object with playlists array
+              (with ETag/Cache-Control headers; 304 if unchanged)
     """
     # Parse user ID from various input formats
     user_id = parse_user_id_from_url(username)
@@ -75,18 +98,36 @@ def get_playlists(username):
             "message": "Invalid Spotify username or URL"
         }), 400
 
+    if can_defer():
+        return defer(get_user_public_playlists_async(user_id), _playlists_response)
+
     try:
-        playlists = get_user_public_playlists(user_id)
+        return _playlists_response(get_user_public_playlists(user_id), None)
+    except Exception as e:
+        return _playlists_response(None, e)
+
+
+def _playlists_response(playlists, error):
+    """Build the get_playlists response from the lookup's result or error."""
+    if error is None:
         # Sort alphabetically
         playlists.sort(key=lambda p: p["name"].lower())
-        return jsonify({"playlists": playlists})
+        return cacheable_json(
+            {"playlists": playlists},
+            current_app.config.get("PLAYLISTS_CACHE_MAX_AGE", 60),
+        )
 
-    except Exception as e:
-        print(f"Error fetching playlists: {e}")
+    if isinstance(error, ValueError):
         return jsonify({
-            "error": "api_error",
-            "message": "Failed to fetch playlists from Spotify"
-        }), 500
+            "error": "user_not_found",
+            "message": str(error)
+        }), 404
+
+    logger.error("Error fetching playlists: %s", error, exc_info=error)
+    return jsonify({
+        "error": "api_error",
+        "message": "Failed to fetch playlists from Spotify"
+    }), 500
 
 
 @profile_bp.route("/playlist/owner", methods=["POST"])
@@ -121,7 +162,8 @@ def get_playlist_owner():
 
         # Get playlist details via Spotify API
         sp = get_system_spotify()
-        playlist = sp.playlist(playlist_id, fields="id,name,owner(id,display_name)")
+        with track_outbound("spotify", "playlist_owner"):
+            playlist = sp.playlist(playlist_id, fields="id,name,owner(id,display_name)")
 
         owner = playlist['owner']
 
@@ -147,7 +189,7 @@ def get_playlist_owner():
         raise
 
     except Exception as e:
-        print(f"Error getting playlist owner: {e}")
+        logger.exception("Error getting playlist owner")
         return jsonify({
             "error": "api_error",
             "message": "Failed to get playlist information"
@@ -187,7 +229,8 @@ def search_playlists():
 
     try:
         sp = get_system_spotify()
-        results = sp.search(q=query, type='playlist', limit=limit)
+        with track_outbound("spotify", "playlist_search"):
+            results = sp.search(q=query, type='playlist', limit=limit)
 
         playlists = []
         for item in results['playlists']['items']:
@@ -210,7 +253,7 @@ def search_playlists():
         })
 
     except Exception as e:
-        print(f"Error searching playlists: {e}")
+        logger.exception("Error searching playlists")
         return jsonify({
             "error": "search_error",
             "message": "Failed to search playlists"
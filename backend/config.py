@@ -8,12 +8,17 @@ import os
 class Config:
     """Base configuration class."""
 
-    # Flask settings
-    SECRET_KEY = os.urandom(64)
-    SESSION_TYPE = "filesystem"
-    SESSION_FILE_DIR = "./.flask_session/"
+    # Flask settings (set SECRET_KEY so cookie sessions work across workers)
+    SECRET_KEY = os.getenv("SECRET_KEY") or os.urandom(64)
     TRAP_HTTP_EXCEPTIONS = True
 
+    # Sessions only carry the rate limit ID: "cookie" (signed cookie, no
+    # server state), "memory" (per process) or "sqlite" (shared on the host)
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "cookie")
+    SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "./.sessions.sqlite3")
+    PERMANENT_SESSION_LIFETIME = 86400  # seconds a server-side session lives
+    SESSION_COOKIE_SAMESITE = "Lax"
+
     # CORS settings
     CORS_ORIGINS = [
         "http://localhost:5173",  # Vite dev server
@@ -23,18 +28,34 @@ class Config:
     # Rate limiting
     RATE_LIMIT_MAX = 3  # Max generations per time window
     RATE_LIMIT_WINDOW = 60  # Time window in seconds (1 minute)
+    # "memory" (per process) or "sqlite" (shared by all workers on the host)
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", "./.rate_limit.sqlite3")
+
+    # Browser/CDN caching of public profile data (Cache-Control max-age, seconds)
+    PROFILE_CACHE_MAX_AGE = 300
+    PLAYLISTS_CACHE_MAX_AGE = 60
+
+    # Logging (per-track search logs are DEBUG)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+
+    # Sanitized traffic capture for replay (off unless a path is set)
+    TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH")
+    TRAFFIC_CAPTURE_KEY = os.getenv("TRAFFIC_CAPTURE_KEY")  # keeps pseudonyms stable
+    TRAFFIC_CAPTURE_SAMPLE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", 1.0))  # fraction of clients
 
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
 
 
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
-    # In production, you'd want to set a fixed SECRET_KEY
-    # SECRET_KEY = os.getenv("SECRET_KEY")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
 
 
 def get_config():
@@ -5,9 +5,22 @@ from .system_account import (
     parse_user_id_from_url,
     parse_playlist_id_from_url,
     get_user_profile,
+    get_user_profile_async,
     get_user_public_playlists,
+    get_user_public_playlists_async,
     get_playlist_tracks,
+    get_playlist_snapshot_id,
+    get_system_user_id,
+    get_scheduler_stats,
     create_playlist_on_system_account,
 )
 from .spotify import add_recommendations_to_playlist, search_and_get_tracks
-from .logic_api import analyze_playlist, generate_from_text
+from .logic_api import (
+    analyze_playlist,
+    analyze_playlist_async,
+    generate_from_text,
+    generate_from_text_async,
+    get_logic_client,
+    LogicAPIError,
+)
+from .jobs import submit_job, get_job, JobQueueFull
@@ -0,0 +1,393 @@
+"""
+Local track catalog.
+
+Keeps every Spotify track the app has seen (from fetched source playlists
+and successful searches) so recommendations can often be resolved without
+a search call.
+
+Tracks are stored in SQLite with an inverted index of normalized title and
+artist words, plus how many tracks each word appears in. Lookups try an
+exact (title, artist) match first, then a fuzzy match over the tracks that
+share the query's rarer words. The least recently seen tracks are evicted
+once the catalog grows past CATALOG_MAX_TRACKS.
+
+Each thread reads through its own connection, so lookups run in parallel
+(WAL mode); writes are serialized by _db_lock.
+"""
+
+import heapq
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from utils.text import normalize_text, similarity
+
+logger = logging.getLogger(__name__)
+
+# Catalog settings
+CATALOG_PATH = os.getenv("CATALOG_PATH", "./.catalog.sqlite3")
+CATALOG_MAX_TRACKS = 200000
+CATALOG_EVICT_BATCH = 2000  # extra tracks evicted at once, so trimming is rare
+CATALOG_MATCH_THRESHOLD = 0.9  # min title and artist similarity for a fuzzy match
+CATALOG_CANDIDATES = 25  # tracks scored per fuzzy lookup
+# Words in more tracks than this ("the", "love") are too common to find
+# fuzzy candidates by; scanning them would cost O(catalog) per lookup
+CATALOG_MAX_TERM_TRACKS = 2000
+
+_db_lock = threading.Lock()  # serializes writes and the schema setup
+_local = threading.local()  # per-thread connections
+_schema_ready = False
+
+_stats_lock = threading.Lock()
+_stats = {
+    "exact_hits": 0,
+    "fuzzy_hits": 0,
+    "misses": 0,
+    "added": 0,
+    "evictions": 0,
+}
+
+
+def _connect():
+    """Get this thread's catalog connection, creating the schema on first use."""
+    db = getattr(_local, "db", None)
+    if db is None:
+        db = sqlite3.connect(CATALOG_PATH, timeout=5)
+        db.execute("PRAGMA journal_mode=WAL")
+        with _db_lock:
+            _create_schema(db)
+        _local.db = db
+    return db
+
+
+def _create_schema(db):
+    """Create the catalog tables once per process. Caller must hold _db_lock."""
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    # One transaction, holding the write lock, so processes opening a new
+    # file at once can't both backfill the counts, or miss rows written
+    # between the backfill and the triggers
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        _create_tables(db)
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    _schema_ready = True
+
+
+def _create_tables(db):
+    """Create the tables, indexes and count triggers (see _create_schema)."""
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS catalog_tracks ("
+        " id TEXT PRIMARY KEY,"
+        " title TEXT NOT NULL,"
+        " artist TEXT NOT NULL,"
+        " track TEXT NOT NULL,"
+        " last_seen REAL NOT NULL) WITHOUT ROWID"
+    )
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS catalog_tracks_title_artist "
+        "ON catalog_tracks (title, artist)"
+    )
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS catalog_tracks_last_seen "
+        "ON catalog_tracks (last_seen)"
+    )
+    # Inverted index: "t:<title word>" / "a:<artist word>" -> track id
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS catalog_terms ("
+        " term TEXT NOT NULL,"
+        " track_id TEXT NOT NULL,"
+        " PRIMARY KEY (term, track_id)) WITHOUT ROWID"
+    )
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS catalog_terms_track "
+        "ON catalog_terms (track_id)"
+    )
+
+    # Running counts, kept by triggers so every process sharing the file
+    # sees them: tracks per term (document frequency) and catalog size
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS catalog_term_counts ("
+        " term TEXT PRIMARY KEY,"
+        " tracks INTEGER NOT NULL) WITHOUT ROWID"
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS catalog_size ("
+        " id INTEGER PRIMARY KEY CHECK (id = 0),"
+        " tracks INTEGER NOT NULL)"
+    )
+    created = db.execute(
+        "INSERT OR IGNORE INTO catalog_size (id, tracks) "
+        "SELECT 0, COUNT(*) FROM catalog_tracks"
+    ).rowcount
+    if created:
+        # New database, or one created before the counts existed
+        db.execute("DELETE FROM catalog_term_counts")
+        db.execute(
+            "INSERT INTO catalog_term_counts (term, tracks) "
+            "SELECT term, COUNT(*) FROM catalog_terms GROUP BY term"
+        )
+    db.execute(
+        "CREATE TRIGGER IF NOT EXISTS catalog_terms_added AFTER INSERT ON catalog_terms "
+        "BEGIN INSERT INTO catalog_term_counts (term, tracks) VALUES (NEW.term, 1) "
+        "ON CONFLICT (term) DO UPDATE SET tracks = tracks + 1; END"
+    )
+    db.execute(
+        "CREATE TRIGGER IF NOT EXISTS catalog_terms_removed AFTER DELETE ON catalog_terms "
+        "BEGIN UPDATE catalog_term_counts SET tracks = tracks - 1 WHERE term = OLD.term; END"
+    )
+    db.execute(
+        "CREATE TRIGGER IF NOT EXISTS catalog_tracks_added AFTER INSERT ON catalog_tracks "
+        "BEGIN UPDATE catalog_size SET tracks = tracks + 1 WHERE id = 0; END"
+    )
+    db.execute(
+        "CREATE TRIGGER IF NOT EXISTS catalog_tracks_removed AFTER DELETE ON catalog_tracks "
+        "BEGIN UPDATE catalog_size SET tracks = tracks - 1 WHERE id = 0; END"
+    )
+
+
+def _count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+
+
+def _terms(title, artist):
+    """Index terms for a normalized title and artist."""
+    terms = {f"t:{word}" for word in title.split()}
+    terms.update(f"a:{word}" for word in artist.split())
+    return terms
+
+
+def project_track(track):
+    """
+    Reduce a Spotify track object to the fields the app returns.
+
+    Args:
+        track: Track object from the Spotify API
+
+    Returns:
+        dict: Track with id, name, artist, album, image, or None if the
+              track can't be used (e.g. a local file with no ID)
+    """
+    if not track or not track.get("id") or not track.get("artists"):
+        return None
+
+    album = track.get("album") or {}
+    images = album.get("images") or []
+    return {
+        "id": track["id"],
+        "name": track["name"],
+        "artist": track["artists"][0]["name"],
+        "album": album.get("name"),
+        "image": images[0]["url"] if images else None,
+    }
+
+
+def add_tracks(tracks):
+    """
+    Add tracks to the catalog (or refresh ones already in it).
+
+    Args:
+        tracks: Iterable of projected track dicts (see project_track)
+    """
+    rows = {}
+    for track in tracks:
+        if track and track.get("id"):
+            rows[track["id"]] = track
+    if not rows:
+        return
+
+    now = time.time()
+    track_rows = []
+    term_rows = []
+    for track_id, track in rows.items():
+        title = normalize_text(track["name"])
+        artist = normalize_text(track["artist"])
+        track_rows.append((
+            track_id, title, artist,
+            json.dumps(track, separators=(",", ":")), now,
+        ))
+        term_rows.extend((term, track_id) for term in _terms(title, artist))
+
+    try:
+        db = _connect()
+        with _db_lock:
+            # Insert new tracks, then refresh existing ones (REPLACE would
+            # skip the delete trigger and miscount the catalog size)
+            db.executemany(
+                "INSERT OR IGNORE INTO catalog_tracks "
+                "(id, title, artist, track, last_seen) VALUES (?, ?, ?, ?, ?)",
+                track_rows,
+            )
+            db.executemany(
+                "UPDATE catalog_tracks SET title = ?, artist = ?, track = ?, last_seen = ? "
+                "WHERE id = ?",
+                [(*row[1:], row[0]) for row in track_rows],
+            )
+            db.executemany(
+                "INSERT OR IGNORE INTO catalog_terms (term, track_id) VALUES (?, ?)",
+                term_rows,
+            )
+            evicted = _evict(db)
+            db.commit()
+    except sqlite3.Error as e:
+        logger.warning("Store failed: %s", e)
+        return
+
+    _count("added", len(track_rows))
+    if evicted:
+        _count("evictions", evicted)
+
+
+def _evict(db):
+    """
+    Trim the catalog once it outgrows CATALOG_MAX_TRACKS, removing
+    CATALOG_EVICT_BATCH more tracks than needed. Caller must hold _db_lock.
+
+    Returns:
+        int: Number of tracks removed
+    """
+    (count,) = db.execute("SELECT tracks FROM catalog_size WHERE id = 0").fetchone()
+    excess = count - CATALOG_MAX_TRACKS
+    if excess <= 0:
+        return 0
+
+    ids = [
+        (track_id,) for (track_id,) in db.execute(
+            "SELECT id FROM catalog_tracks ORDER BY last_seen LIMIT ?",
+            (excess + CATALOG_EVICT_BATCH,),
+        )
+    ]
+    db.executemany("DELETE FROM catalog_terms WHERE track_id = ?", ids)
+    db.executemany("DELETE FROM catalog_tracks WHERE id = ?", ids)
+    db.execute("DELETE FROM catalog_term_counts WHERE tracks <= 0")
+    return len(ids)
+
+
+def lookup_many(queries):
+    """
+    Resolve several (name, artist) queries against the catalog.
+
+    Args:
+        queries: dict of key -> (name, artist)
+
+    Returns:
+        dict: key -> track dict for every query that matched.
+              Keys with no match are omitted.
+    """
+    if not queries:
+        return {}
+
+    found = {}
+    fuzzy = 0
+
+    try:
+        db = _connect()
+        for key, (name, artist) in queries.items():
+            title = normalize_text(name)
+            artist = normalize_text(artist)
+            if not title:
+                continue
+
+            row = db.execute(
+                "SELECT track FROM catalog_tracks WHERE title = ? AND artist = ? "
+                "ORDER BY last_seen DESC LIMIT 1",
+                (title, artist),
+            ).fetchone()
+            if row is None:
+                row = _fuzzy_match(db, title, artist)
+                if row is not None:
+                    fuzzy += 1
+
+            if row is not None:
+                found[key] = json.loads(row[0])
+    except sqlite3.Error as e:
+        logger.warning("Lookup failed: %s", e)
+        return {}
+
+    _count("exact_hits", len(found) - fuzzy)
+    _count("fuzzy_hits", fuzzy)
+    _count("misses", len(queries) - len(found))
+
+    return found
+
+
+def _fuzzy_match(db, title, artist):
+    """
+    Find the closest catalog track sharing words with the query.
+
+    Candidates are ranked by the IDF weight of the words they share, so a
+    rare word counts for more than a common one, and words in more than
+    CATALOG_MAX_TERM_TRACKS tracks are skipped altogether.
+
+    Returns:
+        tuple: (track_json,) row for the best match above
+               CATALOG_MATCH_THRESHOLD, or None
+    """
+    terms = list(_terms(title, artist))
+    placeholders = ",".join("?" * len(terms))
+    counts = db.execute(
+        f"SELECT term, tracks FROM catalog_term_counts "
+        f"WHERE term IN ({placeholders}) AND tracks > 0",
+        terms,
+    ).fetchall()
+    (total,) = db.execute("SELECT tracks FROM catalog_size WHERE id = 0").fetchone()
+    weights = {
+        term: math.log((total + 1) / tracks)
+        for term, tracks in counts
+        if tracks <= CATALOG_MAX_TERM_TRACKS
+    }
+    if not weights:
+        return None
+
+    placeholders = ",".join("?" * len(weights))
+    shared = {}
+    for term, track_id in db.execute(
+        f"SELECT term, track_id FROM catalog_terms WHERE term IN ({placeholders})",
+        list(weights),
+    ):
+        shared[track_id] = shared.get(track_id, 0.0) + weights[term]
+
+    top = heapq.nlargest(CATALOG_CANDIDATES, shared, key=shared.get)
+    if not top:
+        return None
+    placeholders = ",".join("?" * len(top))
+    candidates = db.execute(
+        f"SELECT title, artist, track FROM catalog_tracks WHERE id IN ({placeholders})",
+        top,
+    ).fetchall()
+
+    best = None
+    best_score = 0.0
+    for candidate_title, candidate_artist, track in candidates:
+        score = min(
+            similarity(title, candidate_title),
+            similarity(artist, candidate_artist),
+        )
+        if score > best_score:
+            best, best_score = (track,), score
+
+    if best_score < CATALOG_MATCH_THRESHOLD:
+        return None
+    return best
+
+
+def get_stats():
+    """
+    Get catalog lookup counters.
+
+    Returns:
+        dict: Counters with keys: exact_hits, fuzzy_hits, misses, added,
+              evictions
+    """
+    with _stats_lock:
+        return dict(_stats)
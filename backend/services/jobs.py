@@ -0,0 +1,460 @@
+"""
+Background generation jobs.
+
+Playlist generation takes tens of seconds (a Logic execution plus many
+Spotify calls). Running it on a bounded worker pool lets the API return
+a job ID right away, so server threads aren't tied up for the whole run.
+
+Each job keeps an ordered event log (stage changes, resolved tracks, the
+final result) that clients can follow as a stream.
+
+Jobs can carry a dedupe key (a fingerprint of the request). A duplicate
+submission while the job is running, or shortly after it succeeded, is
+attached to the existing job instead of starting the same work again.
+
+Jobs live in memory and are dropped JOB_TTL seconds after they finish.
+
+Under the ASGI server (asgi.py), coroutine job functions run as tasks on
+its event loop instead of taking a worker thread, and requests wait on
+jobs with wait_for_job_async / wait_for_events_async.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import GENERATION_LATENCY
+from utils.scheduler import BACKGROUND, request_priority
+
+# Job settings
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", 4))  # concurrent generations
+# Queued + running jobs before new submissions are rejected (async jobs
+# don't take a worker thread, so the ASGI server can run many more)
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", 50))
+JOB_TTL = 600  # seconds to keep a finished job's result
+DEDUPE_WINDOW = 60  # seconds a succeeded job still answers duplicate submissions
+
+_executor = ThreadPoolExecutor(
+    max_workers=GENERATION_WORKERS, thread_name_prefix="generation"
+)
+
+# In-memory job storage
+# Format: {job_id: {id, kind, status, stage, progress, result, error, events, ...}}
+_jobs_lock = threading.Lock()
+_jobs_changed = threading.Condition(_jobs_lock)
+_jobs = {}
+_dedupe_index = {}  # dedupe_key -> job_id
+
+# Event loop that runs coroutine jobs (set by the ASGI server), and the
+# (loop, asyncio.Event) pairs of coroutines waiting for job changes
+_loop = None
+_watchers = set()
+
+
+class JobQueueFull(Exception):
+    """Raised when too many generation jobs are already pending."""
+
+
+def submit_job(kind, func, *args, error_handler=None, dedupe_key=None,
+               dedupe_window=DEDUPE_WINDOW):
+    """
+    Queue a generation job on the worker pool, or attach to a matching one.
+
+    ``func`` is called as ``func(*args, progress=callback)`` and should
+    return a JSON-serializable result. ``callback(event, **data)`` appends
+    an event to the job's log and updates its stage and progress info.
+    A coroutine function runs on the event loop set with set_event_loop.
+
+    Args:
+        kind: Job type label (e.g. "from-playlist")
+        func: Function that performs the work
+        *args: Positional arguments for func
+        error_handler: Optional callable mapping an exception to
+            (error_payload, http_status) for the status endpoint
+        dedupe_key: Optional request fingerprint; a job with the same key
+            that is still running, or succeeded less than dedupe_window
+            seconds ago, is returned instead of starting a new one
+        dedupe_window: Seconds a succeeded job keeps answering duplicates
+
+    Returns:
+        dict: Snapshot of the job; "deduplicated" is True if an existing
+              job was returned
+
+    Raises:
+        JobQueueFull: If MAX_PENDING_JOBS jobs are already queued or running
+        RuntimeError: If func is a coroutine function and no event loop is set
+    """
+    is_async = inspect.iscoroutinefunction(func)
+    if is_async and _loop is None:
+        raise RuntimeError("Async jobs need an event loop (see set_event_loop)")
+    now = time.time()
+
+    with _jobs_lock:
+        _purge_finished(now)
+
+        existing = _jobs.get(_dedupe_index.get(dedupe_key)) if dedupe_key else None
+        if existing and _answers_duplicates(existing, now):
+            snapshot = _snapshot(existing)
+            snapshot["deduplicated"] = True
+            return snapshot
+
+        pending = sum(1 for job in _jobs.values() if job["status"] in ("queued", "running"))
+        if pending >= MAX_PENDING_JOBS:
+            raise JobQueueFull("Too many playlists are being generated right now")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "http_status": None,
+            "created_at": now,
+            "finished_at": None,
+            "events": [],
+            "dedupe_key": dedupe_key,
+            "dedupe_window": dedupe_window,
+        }
+        _jobs[job_id] = job
+        if dedupe_key:
+            _dedupe_index[dedupe_key] = job_id
+        snapshot = _snapshot(job)
+        snapshot["deduplicated"] = False
+
+    if is_async:
+        asyncio.run_coroutine_threadsafe(_run_job_async(job_id, func, args, error_handler), _loop)
+    else:
+        _executor.submit(_run_job, job_id, func, args, error_handler)
+    return snapshot
+
+
+def set_event_loop(loop):
+    """
+    Run coroutine jobs on an event loop.
+
+    Args:
+        loop: Running asyncio loop, or None to stop accepting async jobs
+    """
+    global _loop
+    _loop = loop
+
+
+def has_event_loop():
+    """Check whether coroutine jobs can be submitted."""
+    return _loop is not None
+
+
+def get_job(job_id):
+    """
+    Get a snapshot of a job.
+
+    Args:
+        job_id: Job ID returned by submit_job
+
+    Returns:
+        dict: Job snapshot, or None if the job doesn't exist or has expired
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return _snapshot(job) if job else None
+
+
+def wait_for_job(job_id, timeout=None):
+    """
+    Block until a job finishes.
+
+    Args:
+        job_id: Job ID returned by submit_job
+        timeout: Max seconds to wait (None waits indefinitely)
+
+    Returns:
+        dict: Job snapshot (check "status"), or None if the job doesn't exist
+    """
+    with _jobs_changed:
+        _jobs_changed.wait_for(
+            lambda: job_id not in _jobs or _jobs[job_id]["finished_at"] is not None,
+            timeout=timeout,
+        )
+        job = _jobs.get(job_id)
+        return _snapshot(job) if job else None
+
+
+def wait_for_events(job_id, after=0, timeout=15):
+    """
+    Get a job's events after a given event ID, waiting for new ones if needed.
+
+    Args:
+        job_id: Job ID returned by submit_job
+        after: Return events with an ID greater than this
+        timeout: Max seconds to wait when there are no new events
+
+    Returns:
+        tuple: (events, finished) where events is a list of
+               {id, event, data} dicts, or None if the job doesn't exist
+    """
+    with _jobs_changed:
+        _jobs_changed.wait_for(
+            lambda: _has_news(job_id, after), timeout=timeout
+        )
+        job = _jobs.get(job_id)
+        if not job:
+            return None
+        events = [event for event in job["events"] if event["id"] > after]
+        return events, job["finished_at"] is not None
+
+
+async def wait_for_job_async(job_id, timeout=None):
+    """
+    Wait for a job to finish without blocking the event loop.
+
+    Args:
+        job_id: Job ID returned by submit_job
+        timeout: Max seconds to wait (None waits indefinitely)
+
+    Returns:
+        dict: Job snapshot (check "status"), or None if the job doesn't exist
+    """
+    await _wait_async(
+        lambda: job_id not in _jobs or _jobs[job_id]["finished_at"] is not None, timeout
+    )
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return _snapshot(job) if job else None
+
+
+async def wait_for_events_async(job_id, after=0, timeout=15):
+    """
+    Async wait_for_events.
+
+    Args:
+        job_id: Job ID returned by submit_job
+        after: Return events with an ID greater than this
+        timeout: Max seconds to wait when there are no new events
+
+    Returns:
+        tuple: (events, finished), or None if the job doesn't exist
+    """
+    await _wait_async(lambda: _has_news(job_id, after), timeout)
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if not job:
+            return None
+        events = [event for event in job["events"] if event["id"] > after]
+        return events, job["finished_at"] is not None
+
+
+def get_stats():
+    """
+    Get the number of jobs in each status.
+
+    Returns:
+        dict: Counts with keys: queued, running, succeeded, failed
+    """
+    counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+    with _jobs_lock:
+        for job in _jobs.values():
+            counts[job["status"]] += 1
+    return counts
+
+
+def _has_news(job_id, after):
+    """Check for unseen events. Caller must hold _jobs_lock."""
+    job = _jobs.get(job_id)
+    return (
+        not job
+        or job["finished_at"] is not None
+        or (job["events"] and job["events"][-1]["id"] > after)
+    )
+
+
+async def _wait_async(predicate, timeout):
+    """
+    Wait until predicate() is true (checked under _jobs_lock) or timeout
+    seconds pass.
+    """
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+    watcher = (loop, changed)
+    deadline = None if timeout is None else loop.time() + timeout
+
+    with _jobs_lock:
+        _watchers.add(watcher)
+    try:
+        while True:
+            # Cleared before checking, so a change after the check still
+            # wakes us up
+            changed.clear()
+            with _jobs_lock:
+                if predicate():
+                    return
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+    finally:
+        with _jobs_lock:
+            _watchers.discard(watcher)
+
+
+def _notify():
+    """Wake up threads and coroutines waiting on jobs. Caller must hold _jobs_lock."""
+    _jobs_changed.notify_all()
+    for loop, changed in _watchers:
+        try:
+            loop.call_soon_threadsafe(changed.set)
+        except RuntimeError:
+            pass  # loop already closed
+
+
+def _run_job(job_id, func, args, error_handler):
+    """Execute a job on a worker thread and store its outcome."""
+    kind, started = _start_job(job_id)
+
+    def progress(event, **data):
+        _record_event(job_id, event, data)
+
+    try:
+        # Outbound calls made by jobs yield to interactive requests
+        with request_priority(BACKGROUND):
+            result = func(*args, progress=progress)
+    except Exception as e:
+        _fail_job(job_id, kind, started, e, error_handler)
+        return
+
+    _finish_job(job_id, kind, started, result)
+
+
+async def _run_job_async(job_id, func, args, error_handler):
+    """Execute a coroutine job on the event loop and store its outcome."""
+    kind, started = _start_job(job_id)
+
+    def progress(event, **data):
+        _record_event(job_id, event, data)
+
+    try:
+        # Set in this task's context, and copied to threads it starts
+        with request_priority(BACKGROUND):
+            result = await func(*args, progress=progress)
+    except Exception as e:
+        _fail_job(job_id, kind, started, e, error_handler)
+        return
+
+    _finish_job(job_id, kind, started, result)
+
+
+def _start_job(job_id):
+    """
+    Mark a job as running.
+
+    Returns:
+        tuple: (kind, start time for GENERATION_LATENCY)
+    """
+    _update(job_id, status="running", stage="started")
+    with _jobs_lock:
+        kind = _jobs[job_id]["kind"]
+    return kind, time.perf_counter()
+
+
+def _fail_job(job_id, kind, started, e, error_handler):
+    """Store a job's error."""
+    if error_handler:
+        error, http_status = error_handler(e)
+    else:
+        error, http_status = {"error": "internal_error", "message": str(e)}, 500
+    GENERATION_LATENCY.observe(time.perf_counter() - started, kind=kind, status="failed")
+    _record_event(job_id, "failed", {"error": error})
+    _update(
+        job_id,
+        status="failed",
+        stage="failed",
+        error=error,
+        http_status=http_status,
+        finished_at=time.time(),
+    )
+
+
+def _finish_job(job_id, kind, started, result):
+    """Store a job's result."""
+    GENERATION_LATENCY.observe(time.perf_counter() - started, kind=kind, status="succeeded")
+    _record_event(job_id, "done", {"result": result})
+    _update(
+        job_id,
+        status="succeeded",
+        stage="done",
+        result=result,
+        http_status=200,
+        finished_at=time.time(),
+    )
+
+
+def _update(job_id, **fields):
+    """Update job fields and wake up anyone waiting on the job."""
+    with _jobs_changed:
+        job = _jobs.get(job_id)
+        if not job:
+            return
+        job.update(fields)
+        _notify()
+
+
+def _record_event(job_id, event, data):
+    """
+    Append an event to a job's log and fold it into the job's stage/progress.
+    """
+    with _jobs_changed:
+        job = _jobs.get(job_id)
+        if not job:
+            return
+
+        job["events"].append({
+            "id": len(job["events"]) + 1,
+            "event": event,
+            "data": data,
+        })
+
+        if event == "track":
+            job["progress"]["tracks_resolved"] = job["progress"].get("tracks_resolved", 0) + 1
+        elif event not in ("done", "failed"):
+            job["stage"] = event
+            job["progress"].update(
+                (key, value) for key, value in data.items()
+                if isinstance(value, (str, int, float, bool))
+            )
+
+        _notify()
+
+
+def _answers_duplicates(job, now):
+    """Check whether a job should absorb a duplicate submission."""
+    if job["finished_at"] is None:
+        return True
+    return job["status"] == "succeeded" and now - job["finished_at"] < job["dedupe_window"]
+
+
+def _purge_finished(now):
+    """Drop finished jobs older than JOB_TTL. Caller must hold _jobs_lock."""
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job["finished_at"] and now - job["finished_at"] > JOB_TTL
+    ]
+    for job_id in expired:
+        job = _jobs.pop(job_id)
+        if _dedupe_index.get(job["dedupe_key"]) == job_id:
+            del _dedupe_index[job["dedupe_key"]]
+
+
+def _snapshot(job):
+    """Copy a job (without its event log) so callers never see it change."""
+    snapshot = {key: value for key, value in job.items() if key != "events"}
+    snapshot["progress"] = dict(job["progress"])
+    return snapshot
@@ -3,83 +3,546 @@ Logic API integration module.
 
 This module contains functions to interact with the Logic API
 for AI-powered playlist generation.
+
+Each generation and the client's retry loop are written once, as
+generators that yield the I/O they need (a Logic request, a sleep, a
+Spotify step). The sync functions perform those steps blocking; the
+*_async ones await them, for jobs on the ASGI server's event loop.
 """
 
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import logging
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from utils.cache import TTLCache
+from utils.metrics import track_outbound
+from .jobs import GENERATION_WORKERS
+from .playlist_summary import summarize_playlist
 from .system_account import get_playlist_tracks
 from .spotify import add_recommendations_to_playlist
 
+try:
+    import httpx
+except ImportError:  # only needed when serving through asgi.py
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
 # Logic API endpoints
-LOGIC_PLAYLIST_FROM_TEXT_DOC = "https://api.logic.inc/2024-03-01/documents/generate-spotify-playlist-from-text"
-LOGIC_PLAYLIST_FROM_PLAYLIST_DOC = "https://api.logic.inc/2024-03-01/documents/recommend-songs-from-playlist"
+LOGIC_API_BASE = os.getenv("LOGIC_API_BASE", "https://api.logic.inc/2024-03-01")
+LOGIC_PLAYLIST_FROM_TEXT_DOC = f"{LOGIC_API_BASE}/documents/generate-spotify-playlist-from-text"
+LOGIC_PLAYLIST_FROM_PLAYLIST_DOC = f"{LOGIC_API_BASE}/documents/recommend-songs-from-playlist"
+
+# Logic client settings
+LOGIC_POOL_SIZE = 10  # keep-alive connections to the Logic API
+LOGIC_TIMEOUT = (5, 120)  # (connect, read) timeouts in seconds
+LOGIC_RETRIES = 2  # retries after the first attempt
+LOGIC_BACKOFF = 1.0  # base backoff in seconds, doubled each retry (with jitter)
+LOGIC_MAX_RETRY_AFTER = 30  # cap on a server-provided Retry-After
+LOGIC_RETRY_CODES = (429, 500, 502, 503, 504)
+# Connections for execute_async; each in-flight execution holds one
+LOGIC_ASYNC_MAX_CONNECTIONS = int(os.getenv("LOGIC_ASYNC_MAX_CONNECTIONS", 500))
+
+# Memoized Logic results, off by default: a repeat of the same prompt or
+# playlist would get the same recommendations again. Set LOGIC_CACHE_TTL to
+# reuse results for that many seconds (requests with "fresh" skip them).
+LOGIC_CACHE_TTL = int(os.getenv("LOGIC_CACHE_TTL", 0))
+LOGIC_CACHE_SIZE = 500
+
+# (document_url, request fingerprint) -> Logic response
+_result_cache = TTLCache(LOGIC_CACHE_SIZE, LOGIC_CACHE_TTL)
+
+# Steps yielded by the shared generators (see the module docstring)
+_POST = ("post",)  # send one execution attempt; sent back (response, failure)
+_SLEEP = "sleep"  # (_SLEEP, seconds)
+_EXECUTE = "execute"  # (_EXECUTE, document_url, payload); sent back the response
+_CALL = "call"  # (_CALL, func, args, kwargs); sent back func's return value
+
+# Threads for the blocking Spotify steps of async generations, bounded like
+# the threaded generations themselves
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=GENERATION_WORKERS, thread_name_prefix="generation-io"
+)
+
+
+class LogicAPIError(Exception):
+    """Raised when a Logic execution fails."""
+
+
+class LogicClient:
+    """
+    Client for Logic document executions.
+
+    Keeps a pooled keep-alive session, applies connect/read timeouts, and
+    retries 429/5xx responses and failed connection attempts with jittered
+    exponential backoff. Read timeouts and connections lost after the
+    request was sent are not retried, since the execution may already
+    have run.
+
+    execute_async does the same with an httpx client, for coroutines
+    running on the ASGI server's event loop.
+    """
+
+    def __init__(self, token, pool_size=LOGIC_POOL_SIZE, timeout=LOGIC_TIMEOUT,
+                 retries=LOGIC_RETRIES, backoff=LOGIC_BACKOFF):
+        """
+        Args:
+            token: Logic API token
+            pool_size: Max keep-alive connections
+            timeout: (connect, read) timeouts in seconds
+            retries: Retries allowed after the first attempt
+            backoff: Base backoff in seconds
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self._headers)
+        self._async_client = None  # created by the first execute_async
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "executions": 0,
+            "errors": 0,
+            "retries": 0,
+            "total_latency": 0.0,
+            "last_latency": None,
+        }
+
+    def execute(self, document_url, payload):
+        """
+        Run a Logic document execution.
+
+        Args:
+            document_url: Document URL (without the /executions suffix)
+            payload: JSON body for the execution
+
+        Returns:
+            dict: Parsed execution response
+
+        Raises:
+            LogicAPIError: If the execution fails after all retries
+        """
+        # Label latency by document, e.g. "recommend-songs-from-playlist"
+        with track_outbound("logic", document_url.rstrip("/").rsplit("/", 1)[-1]):
+            attempts = self._attempts()
+            outcome = None
+            while True:
+                try:
+                    step = attempts.send(outcome)
+                except StopIteration as done:
+                    return done.value
+                if step is _POST:
+                    outcome = self._post(document_url, payload)
+                else:
+                    time.sleep(step[1])
+                    outcome = None
+
+    async def execute_async(self, document_url, payload):
+        """
+        Run a Logic document execution without blocking the event loop.
+
+        Args:
+            document_url: Document URL (without the /executions suffix)
+            payload: JSON body for the execution
+
+        Returns:
+            dict: Parsed execution response
+
+        Raises:
+            LogicAPIError: If the execution fails after all retries
+        """
+        client = self._get_async_client()
+        with track_outbound("logic", document_url.rstrip("/").rsplit("/", 1)[-1]):
+            attempts = self._attempts()
+            outcome = None
+            while True:
+                try:
+                    step = attempts.send(outcome)
+                except StopIteration as done:
+                    return done.value
+                if step is _POST:
+                    outcome = await self._post_async(client, document_url, payload)
+                else:
+                    await asyncio.sleep(step[1])
+                    outcome = None
+
+    def _attempts(self):
+        """
+        The retry loop of execute and execute_async, as described in the
+        class docstring.
+
+        Yields _POST for each attempt and is sent back its
+        (response, failure) outcome; yields (_SLEEP, seconds) before a
+        retry. Returns the parsed response.
+        """
+        started = time.monotonic()
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+
+            response, failure = yield _POST
+            if failure is not None:
+                kind, error = failure
+                if kind == "connect" and not last_attempt:
+                    yield (_SLEEP, self._retry_delay(attempt))
+                    continue
+                self._record(started, success=False)
+                if kind == "timeout":
+                    raise LogicAPIError(f"Logic API timed out: {error}") from error
+                raise LogicAPIError(f"Logic API connection failed: {error}") from error
+
+            if response.status_code == 200:
+                self._record(started, success=True)
+                return response.json()
+
+            if response.status_code not in LOGIC_RETRY_CODES or last_attempt:
+                self._record(started, success=False)
+                raise LogicAPIError(f"Logic API error: {response.text}")
+
+            yield (_SLEEP, self._retry_delay(attempt, response.headers.get("Retry-After")))
+
+    def _post(self, document_url, payload):
+        """
+        Send one execution attempt.
+
+        Returns:
+            tuple: (response, None), or (None, (kind, error)) where kind is
+                   "connect" (never sent), "lost" or "timeout"
+        """
+        try:
+            response = self.session.post(
+                f"{document_url}/executions",
+                json=payload,
+                timeout=self.timeout,
+            )
+        except requests.ConnectionError as e:
+            return None, ("connect" if _never_sent(e) else "lost", e)
+        except requests.Timeout as e:
+            return None, ("timeout", e)
+        return response, None
+
+    async def _post_async(self, client, document_url, payload):
+        """Async _post, with the httpx client."""
+        try:
+            response = await client.post(f"{document_url}/executions", json=payload)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            return None, ("connect", e)
+        except httpx.TimeoutException as e:
+            return None, ("timeout", e)
+        except httpx.TransportError as e:
+            return None, ("lost", e)
+        return response, None
+
+    def _get_async_client(self):
+        """Get the httpx client for execute_async, creating it on first use."""
+        if httpx is None:
+            raise LogicAPIError("execute_async requires httpx (pip install httpx)")
+        if self._async_client is None:
+            connect, read = self.timeout
+            self._async_client = httpx.AsyncClient(
+                headers=self._headers,
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(
+                    max_connections=LOGIC_ASYNC_MAX_CONNECTIONS,
+                    max_keepalive_connections=LOGIC_POOL_SIZE,
+                ),
+            )
+        return self._async_client
+
+    async def aclose(self):
+        """Close the execute_async connections (on ASGI server shutdown)."""
+        client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.aclose()
+
+    def _retry_delay(self, attempt, retry_after=None):
+        """Count a retry and pick its delay, preferring the server's Retry-After."""
+        with self._stats_lock:
+            self._stats["retries"] += 1
+
+        try:
+            return min(float(retry_after), LOGIC_MAX_RETRY_AFTER)
+        except (TypeError, ValueError):
+            # Full jitter: spread retries out so clients don't retry in lockstep
+            return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def _record(self, started, success):
+        latency = time.monotonic() - started
+        with self._stats_lock:
+            self._stats["executions"] += 1
+            if not success:
+                self._stats["errors"] += 1
+            self._stats["total_latency"] += latency
+            self._stats["last_latency"] = latency
+
+    def get_stats(self):
+        """
+        Get execution counters.
+
+        Returns:
+            dict: Counters with keys: executions, errors, retries,
+                  total_latency, last_latency
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+def _never_sent(error):
+    """Check whether a requests ConnectionError happened before the request was sent."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+_client_lock = threading.Lock()
+_client = None
+
+
+def get_logic_client():
+    """
+    Get the process-wide Logic client, creating it on first use.
+
+    Created lazily so LOGIC_API_TOKEN can be loaded from .env after import.
+
+    Returns:
+        LogicClient: Shared client
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LogicClient(os.getenv("LOGIC_API_TOKEN"))
+        return _client
 
 
-def generate_from_text(description, target_playlist_id):
+def _run(steps):
+    """Run a generation's steps, blocking on each."""
+    result = None
+    while True:
+        try:
+            step = steps.send(result)
+        except StopIteration as done:
+            return done.value
+        if step[0] == _EXECUTE:
+            result = get_logic_client().execute(*step[1:])
+        else:
+            _, func, args, kwargs = step
+            result = func(*args, **kwargs)
+
+
+async def _run_async(steps):
+    """
+    Run a generation's steps on the event loop.
+
+    Logic executions are awaited; the blocking Spotify steps run on
+    _blocking_executor, in a copy of the current context so they keep the
+    job's request priority.
+    """
+    loop = asyncio.get_running_loop()
+    result = None
+    while True:
+        try:
+            step = steps.send(result)
+        except StopIteration as done:
+            return done.value
+        if step[0] == _EXECUTE:
+            result = await get_logic_client().execute_async(*step[1:])
+        else:
+            _, func, args, kwargs = step
+            context = contextvars.copy_context()
+            result = await loop.run_in_executor(
+                _blocking_executor, functools.partial(context.run, func, *args, **kwargs)
+            )
+
+
+def _call(func, *args, **kwargs):
+    """Build the step that runs a blocking function."""
+    return (_CALL, func, args, kwargs)
+
+
+def _execute_cached(document_url, payload, cache_key, use_cache=True):
+    """
+    Run a Logic execution, reusing a recent result for the same request.
+
+    A step generator: use with ``yield from``.
+
+    Args:
+        document_url: Logic document URL
+        payload: JSON body for the execution
+        cache_key: Fingerprint of the request content
+        use_cache: If False, skip the lookup (the fresh result is still stored)
+
+    Returns:
+        dict: Logic execution response (treat as read-only)
+    """
+    if LOGIC_CACHE_TTL <= 0:
+        return (yield (_EXECUTE, document_url, payload))
+
+    key = (document_url, cache_key)
+    if use_cache:
+        cached = _result_cache.get(key)
+        if cached is not None:
+            logger.info("Using cached Logic result", extra={"sample": 10})
+            return cached
+
+    data = yield (_EXECUTE, document_url, payload)
+    _result_cache.set(key, data)
+    return data
+
+
+def _playlist_fingerprint(playlist_json):
+    """Hash a playlistJson payload, ignoring the order of its tracks."""
+    canonical = sorted(
+        json.dumps(track, sort_keys=True) for track in playlist_json["tracks"]
+    )
+    canonical.append(json.dumps(playlist_json.get("summary"), sort_keys=True))
+    return hashlib.sha256("\n".join(canonical).encode()).hexdigest()
+
+
+def generate_from_text(description, target_playlist_id=None, progress=None, use_cache=True):
     """
     Use the Logic API to generate a playlist from a text description.
 
     Args:
         description: Text description of the desired playlist
-        target_playlist_id: Spotify playlist ID to populate
+        target_playlist_id: Spotify playlist ID to populate, or None to
+                            create one titled after the Logic response
+        progress: Optional callback(event, **data) for reporting progress
+        use_cache: If False, always run a new Logic execution
 
     Returns:
-        dict: Result with keys: title, description, tracks, not_found
+        dict: Result with keys: playlist_id, title, description, tracks, not_found
 
     Raises:
         ValueError: If description is empty
-        Exception: If Logic API call fails
+        LogicAPIError: If Logic API call fails
     """
-    if not description:
-        raise ValueError("Description is required")
+    return _run(_generate_from_text(description, target_playlist_id, progress, use_cache))
 
-    LOGIC_API_TOKEN = os.getenv("LOGIC_API_TOKEN")
 
-    headers = {
-        "Authorization": f"Bearer {LOGIC_API_TOKEN}",
-        "Content-Type": "application/json",
-    }
+async def generate_from_text_async(description, target_playlist_id=None, progress=None,
+                                   use_cache=True):
+    """
+    Async version of generate_from_text for jobs on the ASGI server.
 
-    response = requests.post(
-        f"{LOGIC_PLAYLIST_FROM_TEXT_DOC}/executions",
-        headers=headers,
-        json={"description": description},
+    The Logic execution, the longest part of a generation, is awaited
+    without holding a thread. Resolving and adding the tracks reuses the
+    threaded Spotify code on a worker thread.
+
+    Args and return value are the same as generate_from_text.
+    """
+    return await _run_async(
+        _generate_from_text(description, target_playlist_id, progress, use_cache)
     )
 
-    if response.status_code != 200:
-        raise Exception(f"Logic API error: {response.text}")
 
-    data = response.json()
+def _generate_from_text(description, target_playlist_id, progress, use_cache):
+    """Steps of generate_from_text."""
+    if not description:
+        raise ValueError("Description is required")
+
+    if progress:
+        progress("waiting_for_logic")
 
-    # Add tracks to playlist and return result
-    result = add_recommendations_to_playlist(data, target_playlist_id)
+    data = yield from _execute_cached(
+        LOGIC_PLAYLIST_FROM_TEXT_DOC,
+        {"description": description},
+        " ".join(description.casefold().split()),
+        use_cache=use_cache,
+    )
 
-    return result
+    # Add tracks to playlist and return result
+    return (yield _call(
+        add_recommendations_to_playlist, data, target_playlist_id, progress=progress
+    ))
 
 
-def analyze_playlist(source_playlist_id, target_playlist_id):
+def analyze_playlist(source_playlist_id, target_playlist_id=None, progress=None, use_cache=True):
     """
     Use the Logic API to analyze an existing playlist and generate recommendations.
 
     Args:
         source_playlist_id: Spotify playlist ID to analyze
-        target_playlist_id: Spotify playlist ID to populate with recommendations
+        target_playlist_id: Spotify playlist ID to populate with recommendations,
+                            or None to create one titled after the Logic response
+        progress: Optional callback(event, **data) for reporting progress
+        use_cache: If False, always run a new Logic execution
 
     Returns:
-        dict: Result with keys: title, description, tracks, not_found
+        dict: Result with keys: playlist_id, title, description, tracks, not_found
 
     Raises:
         ValueError: If source playlist cannot be accessed
-        Exception: If Logic API call fails
+        LogicAPIError: If Logic API call fails
+    """
+    return _run(_analyze_playlist(source_playlist_id, target_playlist_id, progress, use_cache))
+
+
+async def analyze_playlist_async(source_playlist_id, target_playlist_id=None, progress=None,
+                                 use_cache=True):
     """
+    Async version of analyze_playlist for jobs on the ASGI server.
+
+    As with generate_from_text_async, only the Logic execution is awaited;
+    fetching and summarizing the source playlist and the Spotify steps run
+    on worker threads.
+
+    Args and return value are the same as analyze_playlist.
+    """
+    return await _run_async(
+        _analyze_playlist(source_playlist_id, target_playlist_id, progress, use_cache)
+    )
+
+
+def _analyze_playlist(source_playlist_id, target_playlist_id, progress, use_cache):
+    """Steps of analyze_playlist."""
     # Fetch the source playlist tracks
-    playlist = get_playlist_tracks(source_playlist_id)
+    if progress:
+        progress("fetching_playlist")
+    track_data_json = yield _call(_playlist_payload, source_playlist_id)
+
+    if progress:
+        progress("waiting_for_logic")
 
-    # Convert playlist to JSON format for Logic API
-    tracks = playlist["tracks"]["items"]
+    data = yield from _execute_cached(
+        LOGIC_PLAYLIST_FROM_PLAYLIST_DOC,
+        {"playlistJson": track_data_json},
+        _playlist_fingerprint(track_data_json),
+        use_cache=use_cache,
+    )
+
+    # Add tracks to playlist and return result
+    return (yield _call(
+        add_recommendations_to_playlist, data, target_playlist_id, progress=progress
+    ))
+
+
+def _playlist_payload(playlist_id):
+    """Fetch a playlist and convert it to the (summarized) playlistJson for Logic."""
+    playlist = get_playlist_tracks(playlist_id)
     track_data = []
 
-    for item in tracks:
+    for item in playlist["tracks"]["items"]:
         track = item.get("track")
         if not track:
             continue
@@ -92,27 +555,5 @@ def analyze_playlist(source_playlist_id, target_playlist_id):
         }
         track_data.append(track_info)
 
-    track_data_json = {"tracks": track_data}
-
-    LOGIC_API_TOKEN = os.getenv("LOGIC_API_TOKEN")
-
-    headers = {
-        "Authorization": f"Bearer {LOGIC_API_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
-    response = requests.post(
-        f"{LOGIC_PLAYLIST_FROM_PLAYLIST_DOC}/executions",
-        headers=headers,
-        json={"playlistJson": track_data_json},
-    )
-
-    if response.status_code != 200:
-        raise Exception(f"Logic API error: {response.text}")
-
-    data = response.json()
-
-    # Add tracks to playlist and return result
-    result = add_recommendations_to_playlist(data, target_playlist_id)
-
-    return result
+    # Keep the payload bounded no matter how large the playlist is
+    return summarize_playlist(track_data)
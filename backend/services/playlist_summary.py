@@ -0,0 +1,143 @@
+"""
+Bounded playlist payloads for the Logic API.
+
+analyze_playlist used to send every track of the source playlist to Logic,
+so large playlists made executions slow and the request body huge. This
+module reduces a playlist to a fixed budget of tracks plus a summary of
+the whole playlist:
+
+1. Duplicate tracks (same normalized title and artist) are dropped.
+2. Artist and era (decade) counts are computed over all unique tracks.
+3. If the playlist is still over budget, a stratified sample is taken:
+   each artist gets a share of the budget proportional to its track
+   count, and its tracks are picked evenly across the playlist.
+
+The reduction is deterministic, so the same playlist always produces the
+same payload (and the same Logic cache key).
+"""
+
+import hashlib
+import os
+from collections import Counter
+
+from utils.text import normalize_text
+
+# Payload budget
+PLAYLIST_MAX_TRACKS = int(os.getenv("LOGIC_MAX_TRACKS", 150))  # tracks sent to Logic
+PLAYLIST_TOP_ARTISTS = 20  # artists listed in the summary
+
+
+def dedupe_tracks(tracks):
+    """
+    Drop repeated tracks, keeping the first occurrence.
+
+    Args:
+        tracks: List of dicts with name and artist
+
+    Returns:
+        list: Unique tracks in playlist order
+    """
+    seen = set()
+    unique = []
+    for track in tracks:
+        key = (normalize_text(track["name"]), normalize_text(track["artist"]))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(track)
+    return unique
+
+
+def _era(release_date):
+    """Map a Spotify release date ("1994", "1994-05-01") to a decade label."""
+    year = (release_date or "")[:4]
+    if len(year) != 4 or not year.isdigit():
+        return None
+    return f"{year[:3]}0s"
+
+
+def _tie_break(artist_key):
+    """Stable pseudo-random order for artists with equal claims to a slot."""
+    return hashlib.md5(artist_key.encode()).hexdigest()
+
+
+def sample_tracks(tracks, budget):
+    """
+    Pick a representative, deterministic subset of tracks.
+
+    Each artist is a stratum. Slots are shared out in proportion to each
+    artist's track count (largest remainder method), and within an artist
+    the picks are spread evenly over its tracks.
+
+    Args:
+        tracks: List of unique track dicts in playlist order
+        budget: Max number of tracks to return
+
+    Returns:
+        list: Selected tracks in playlist order
+    """
+    if len(tracks) <= budget:
+        return list(tracks)
+    if budget <= 0:
+        return []
+
+    # artist key -> positions of its tracks, in playlist order
+    strata = {}
+    for position, track in enumerate(tracks):
+        strata.setdefault(normalize_text(track["artist"]), []).append(position)
+
+    total = len(tracks)
+    quotas = {key: budget * len(positions) / total for key, positions in strata.items()}
+    counts = {key: int(quota) for key, quota in quotas.items()}
+
+    # Hand out the leftover slots by largest remainder
+    leftover = budget - sum(counts.values())
+    by_remainder = sorted(
+        strata, key=lambda key: (counts[key] - quotas[key], _tie_break(key))
+    )
+    for key in by_remainder[:leftover]:
+        counts[key] += 1
+
+    selected = []
+    for key, positions in strata.items():
+        count = counts[key]
+        step = len(positions) / count if count else 0
+        selected.extend(positions[int(i * step)] for i in range(count))
+
+    return [tracks[position] for position in sorted(selected)]
+
+
+def summarize_playlist(tracks, budget=PLAYLIST_MAX_TRACKS):
+    """
+    Build the playlistJson payload for a Logic execution.
+
+    Args:
+        tracks: List of dicts with name, artist, album, release_date
+        budget: Max number of tracks to include
+
+    Returns:
+        dict: {"tracks": [...]} for playlists within budget; larger playlists
+              are sampled and get a "summary" of the full playlist with
+              total_tracks, unique_tracks, sampled_tracks, top_artists and eras
+    """
+    unique = dedupe_tracks(tracks)
+    if len(unique) <= budget:
+        return {"tracks": unique}
+
+    artists = Counter(track["artist"] for track in unique)
+    eras = Counter(filter(None, (_era(track.get("release_date")) for track in unique)))
+    sample = sample_tracks(unique, budget)
+
+    return {
+        "tracks": sample,
+        "summary": {
+            "total_tracks": len(tracks),
+            "unique_tracks": len(unique),
+            "sampled_tracks": len(sample),
+            "top_artists": [
+                {"artist": artist, "tracks": count}
+                for artist, count in artists.most_common(PLAYLIST_TOP_ARTISTS)
+            ],
+            "eras": dict(sorted(eras.items())),
+        },
+    }
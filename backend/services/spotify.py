@@ -7,106 +7,407 @@ for searching tracks and adding them to playlists.
 Uses the system account for all Spotify API calls.
 """
 
-import time
-from .system_account import get_system_spotify
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.metrics import track_outbound
+from utils.scheduler import inherit_priority
+from utils.text import (
+    normalize_text,
+    primary_artist,
+    similarity_many,
+    strip_featuring,
+    strip_title,
+)
+from . import catalog, track_cache
+from .system_account import get_system_spotify, create_playlist_on_system_account
+
+logger = logging.getLogger(__name__)
 
 # Spotify Constants
-RATE_LIMIT = 0.1  # seconds between API calls
+SEARCH_WORKERS = 8  # concurrent searches per generation (the scheduler caps the total)
+SEARCH_CANDIDATES = 5  # results requested per search query
+SEARCH_MATCH_THRESHOLD = 0.7  # min title and artist similarity for a match
+BARE_TITLE_WEIGHT = 0.95  # discount for matching only the stripped title
 SPOTIFY_ADD_LIMIT = 100  # Spotify allows adding up to 100 tracks at once
 
 
-def search_and_get_tracks(recommendations):
+def _search_queries(name, artist):
+    """
+    Build the tiered search queries for a recommendation.
+
+    The first tier is the strict field query. The later tier, used only if
+    the first finds no good match, has the decorations stripped from the
+    title ("(feat. X)", " - Remastered") and a looser free-text query.
+
+    Returns:
+        list: Tiers, each a list of query strings
+    """
+    strict = f"track:{name} artist:{artist}"
+    title = strip_title(name)
+    lead = primary_artist(artist)
+
+    fallbacks = []
+    for query in (f"track:{title} artist:{lead}", f"{title} {lead}"):
+        if query != strict and query not in fallbacks:
+            fallbacks.append(query)
+
+    return [[strict], fallbacks] if fallbacks else [[strict]]
+
+
+def _search(sp, query):
+    """
+    Run one track search.
+
+    Returns:
+        list: Up to SEARCH_CANDIDATES Spotify track objects
+    """
+    with track_outbound("spotify", "search"):
+        result = sp.search(q=query, type="track", limit=SEARCH_CANDIDATES)
+    return [item for item in result["tracks"]["items"] if item]
+
+
+def _best_match(name, artist, candidates):
+    """
+    Score search candidates against a recommendation in one pass.
+
+    The title is compared without featuring credits and again with all
+    decorations stripped (slightly discounted, so the requested version
+    wins), and the artist is compared against every credited artist of the
+    candidate. Each query string is scored against all the candidates at
+    once (see similarity_many).
+
+    Args:
+        name: Recommended track name
+        artist: Recommended artist name
+        candidates: Spotify track objects
+
+    Returns:
+        tuple: (score, track) for the best candidate meeting
+               SEARCH_MATCH_THRESHOLD, or None
+    """
+    if not candidates:
+        return None
+
+    exact_scores = similarity_many(
+        normalize_text(strip_featuring(name)),
+        [normalize_text(strip_featuring(candidate["name"])) for candidate in candidates],
+    )
+    bare_scores = similarity_many(
+        normalize_text(strip_title(name)),
+        [normalize_text(strip_title(candidate["name"])) for candidate in candidates],
+        cutoff=SEARCH_MATCH_THRESHOLD / BARE_TITLE_WEIGHT,
+    )
+
+    # Every credited artist of every candidate, scored against both forms
+    # of the requested artist
+    owners = []
+    credits = []
+    for index, candidate in enumerate(candidates):
+        for credit in candidate.get("artists") or []:
+            owners.append(index)
+            credits.append(normalize_text(credit["name"]))
+    artist_scores = [0.0] * len(candidates)
+    for query_artist in {normalize_text(artist), normalize_text(primary_artist(artist))}:
+        scores = similarity_many(query_artist, credits, cutoff=SEARCH_MATCH_THRESHOLD)
+        for index, score in zip(owners, scores):
+            artist_scores[index] = max(artist_scores[index], score)
+
+    best = None
+    best_rank = None
+    for candidate, exact_score, bare_score, artist_score in zip(
+        candidates, exact_scores, bare_scores, artist_scores
+    ):
+        title_score = max(exact_score, BARE_TITLE_WEIGHT * bare_score)
+        if min(title_score, artist_score) < SEARCH_MATCH_THRESHOLD:
+            continue
+
+        # Equal scores go to the closer unstripped title, then to Spotify's order
+        score = 0.6 * title_score + 0.4 * artist_score
+        rank = (score, exact_score)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = (score, candidate), rank
+
+    return best
+
+
+def search_and_get_tracks(recommendations, on_track=None):
     """
     Search for tracks on Spotify and return their details.
 
+    Tracks already in the track cache are served from it, then the local
+    catalog is checked for exact or close matches. Only the rest are
+    searched (see _search_pending), concurrently on a small worker pool
+    whose calls go through the shared Spotify request scheduler, and the
+    results are written back to the cache and catalog. Results keep the
+    order of the recommendations.
+
     Args:
         recommendations: List of dicts with 'name' and 'artist' keys
+        on_track: Optional callback(index, track, rec) called on the calling
+                  thread as each recommendation is resolved (track is None
+                  if it wasn't found), in completion order
 
     Returns:
         tuple: (found_tracks, not_found)
             - found_tracks: List of track dicts with id, name, artist, album, image
             - not_found: List of strings describing tracks not found
     """
-    sp = get_system_spotify()
     found_tracks = []
     not_found = []
 
-    for rec in recommendations:
-        name = rec.get("name")
-        artist = rec.get("artist")
-        query = f"track:{name} artist:{artist}"
+    if not recommendations:
+        return found_tracks, not_found
 
-        try:
-            result = sp.search(q=query, type="track", limit=1)
-            items = result["tracks"]["items"]
-
-            if items:
-                track = items[0]
-                album = track["album"]
-                found_tracks.append({
-                    "id": track["id"],
-                    "name": track["name"],
-                    "artist": track["artists"][0]["name"],
-                    "album": album["name"],
-                    "image": album["images"][0]["url"] if album["images"] else None,
-                })
-                print(f"Found: {name} by {artist}")
-            else:
-                not_found.append(f"{name} by {artist}")
-                print(f"Not found: {name} by {artist}")
+    keys = [
+        track_cache.make_key(rec.get("name"), rec.get("artist"))
+        for rec in recommendations
+    ]
+    resolved = track_cache.get_many(keys)
 
-        except Exception as e:
-            not_found.append(f"{name} by {artist}")
-            print(f"Error searching {name} by {artist}: {e}")
+    # Tracks the cache hasn't seen (or couldn't find) may be in the catalog
+    resolved.update(catalog.lookup_many({
+        key: (rec.get("name"), rec.get("artist"))
+        for key, rec in zip(keys, recommendations)
+        if resolved.get(key) is None
+    }))
+
+    # One search per distinct unresolved track
+    pending = {}
+    for index, (key, rec) in enumerate(zip(keys, recommendations)):
+        if key in resolved:
+            if on_track:
+                on_track(index, resolved[key], rec)
+        else:
+            pending.setdefault(key, []).append(index)
+
+    if pending:
+        to_cache = {}
+
+        for key, track, definitive in _search_pending(pending, recommendations):
+            resolved[key] = track
+            if definitive:
+                to_cache[key] = track
+            if on_track:
+                for index in pending[key]:
+                    on_track(index, track, recommendations[index])
+
+        track_cache.put_many(to_cache)
+        catalog.add_tracks(to_cache.values())
 
-        time.sleep(RATE_LIMIT)  # prevent rate-limiting
+    for key, rec in zip(keys, recommendations):
+        track = resolved.get(key)
+        if track:
+            found_tracks.append(track)
+        else:
+            not_found.append(f"{rec.get('name')} by {rec.get('artist')}")
+
+    logger.info(
+        "Resolved recommendations",
+        extra={
+            "requested": len(recommendations),
+            "found": len(found_tracks),
+            "searched": len(pending),
+        },
+    )
 
     return found_tracks, not_found
 
 
-def add_recommendations_to_playlist(response, playlist_id):
+def _search_pending(pending, recommendations):
+    """
+    Search Spotify for unresolved recommendations.
+
+    Every recommendation starts with its strict query. Those without a good
+    match move on to the fallback tier, whose queries run in parallel. All
+    searches share one worker pool, so fallbacks for one track overlap with
+    the first searches for others.
+
+    Args:
+        pending: dict of key -> indexes into recommendations
+        recommendations: List of dicts with 'name' and 'artist' keys
+
+    Yields:
+        tuple: (key, track, definitive) in completion order, where track is
+               a projected track dict or None, and definitive is False if a
+               search failed, so a miss shouldn't be cached
+    """
+    sp = get_system_spotify()
+    workers = min(SEARCH_WORKERS, len(pending))
+
+    # key -> {name, artist, tiers, tier, outstanding, best, failed}
+    searches = {}
+    for key, indexes in pending.items():
+        rec = recommendations[indexes[0]]
+        name, artist = rec.get("name"), rec.get("artist")
+        searches[key] = {
+            "name": name,
+            "artist": artist,
+            "tiers": _search_queries(name, artist),
+            "tier": 0,
+            "outstanding": 0,
+            "best": None,
+            "failed": False,
+        }
+
+    run_search = inherit_priority(_search)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+
+        def submit(key):
+            search = searches[key]
+            queries = search["tiers"][search["tier"]]
+            search["outstanding"] = len(queries)
+            for query in queries:
+                futures[executor.submit(run_search, sp, query)] = key
+
+        for key in searches:
+            submit(key)
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures.pop(future)
+                search = searches[key]
+                search["outstanding"] -= 1
+
+                try:
+                    candidates = future.result()
+                except Exception as e:
+                    logger.warning(
+                        "Track search failed: %s", e,
+                        extra={
+                            "query_name": search["name"],
+                            "query_artist": search["artist"],
+                            "sample": 10,
+                        },
+                    )
+                    search["failed"] = True
+                    candidates = []
+
+                match = _best_match(search["name"], search["artist"], candidates)
+                if match and (search["best"] is None or match[0] > search["best"][0]):
+                    search["best"] = match
+
+                if search["outstanding"]:
+                    continue
+                if search["best"] is None and search["tier"] + 1 < len(search["tiers"]):
+                    search["tier"] += 1
+                    submit(key)
+                    continue
+
+                # No candidate reached SEARCH_MATCH_THRESHOLD in any tier: a
+                # miss, rather than Spotify's unscored top hit
+                track = search["best"][1] if search["best"] else None
+                logger.debug(
+                    "Track %s: %s by %s",
+                    "found" if track else "not found", search["name"], search["artist"],
+                )
+                yield key, catalog.project_track(track), track is not None or not search["failed"]
+
+
+def _update_playlist_details(sp, playlist_id, name, description):
+    """Rename an existing playlist."""
+    with track_outbound("spotify", "playlist_update"):
+        sp.playlist_change_details(playlist_id, name=name, description=description)
+
+
+def add_recommendations_to_playlist(response, playlist_id=None, progress=None):
     """
     Given a Logic API response with recommendations, search for the tracks
-    on Spotify and add them to the specified playlist.
+    on Spotify and add them to a playlist on the system account.
+
+    Without a playlist_id, the playlist is created with its final title
+    while the tracks are being searched, so no placeholder playlist has to
+    be created up front and renamed afterwards.
 
     Args:
         response: Logic API response dict with output.recommendations
-        playlist_id: Target Spotify playlist ID
+        playlist_id: Existing Spotify playlist ID to rename and populate,
+                     or None to create a new playlist
+        progress: Optional callback(event, **data) for reporting progress
 
     Returns:
-        dict: Result with keys: title, description, tracks, not_found
+        dict: Result with keys: playlist_id, title, description, tracks, not_found
     """
     recommendations = response["output"]["recommendations"]
     playlist_title = response["output"]["playlistTitle"]
     playlist_desc = response["output"]["playlistDesc"]
 
+    if progress:
+        progress(
+            "logic_response",
+            title=playlist_title,
+            description=playlist_desc,
+            tracks_total=len(recommendations),
+        )
+
     sp = get_system_spotify()
 
-    # Update playlist name and description
-    sp.playlist_change_details(
-        playlist_id, name=playlist_title, description=playlist_desc
-    )
+    # Search for tracks, reporting each one as it resolves
+    on_track = None
+    if progress:
+        def on_track(index, track, rec):
+            progress(
+                "track",
+                index=index,
+                track=track,
+                query=f"{rec.get('name')} by {rec.get('artist')}",
+            )
+
+    # Create (or rename) the playlist while the searches run
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if playlist_id is None:
+            playlist_future = executor.submit(
+                inherit_priority(create_playlist_on_system_account),
+                playlist_title, playlist_desc,
+            )
+        else:
+            playlist_future = executor.submit(
+                inherit_priority(_update_playlist_details),
+                sp, playlist_id, playlist_title, playlist_desc,
+            )
+
+        found_tracks, not_found = search_and_get_tracks(recommendations, on_track=on_track)
+
+        created_id = playlist_future.result()
+        if playlist_id is None:
+            playlist_id = created_id
 
-    # Search for tracks
-    found_tracks, not_found = search_and_get_tracks(recommendations)
+    if progress:
+        progress("playlist_created", playlist_id=playlist_id)
 
     # Add tracks to playlist
+    if progress:
+        progress("adding_tracks", tracks_found=len(found_tracks))
     if found_tracks:
         track_ids = [t["id"] for t in found_tracks]
         try:
             # Spotify allows adding up to 100 tracks at once
             for i in range(0, len(track_ids), SPOTIFY_ADD_LIMIT):
-                sp.playlist_add_items(playlist_id, track_ids[i:i + SPOTIFY_ADD_LIMIT])
-            print(f"\nAdded {len(track_ids)} track(s) to the playlist!")
+                with track_outbound("spotify", "playlist_add"):
+                    sp.playlist_add_items(playlist_id, track_ids[i:i + SPOTIFY_ADD_LIMIT])
+            logger.info(
+                "Added tracks to playlist",
+                extra={"playlist_id": playlist_id, "tracks_added": len(track_ids)},
+            )
+            if progress:
+                progress("tracks_added", tracks_added=len(track_ids))
         except Exception as e:
-            print(f"Error adding tracks to playlist: {e}")
+            logger.error(
+                "Adding tracks to playlist failed: %s", e, extra={"playlist_id": playlist_id}
+            )
 
     if not_found:
-        print("\nThe following tracks could not be found on Spotify:")
-        for entry in not_found:
-            print(f"  - {entry}")
+        logger.info(
+            "Some recommendations were not found on Spotify",
+            extra={"playlist_id": playlist_id, "not_found": len(not_found)},
+        )
+        logger.debug("Not found on Spotify: %s", "; ".join(not_found))
 
     return {
+        "playlist_id": playlist_id,
         "title": playlist_title,
         "description": playlist_desc,
         "tracks": found_tracks,
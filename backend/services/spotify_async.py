@@ -0,0 +1,142 @@
+"""
+Async Spotify Web API client.
+
+Used by the ASGI server (asgi.py) for calls a coroutine waits on, such as
+profile lookups. Requests are admitted through the same RequestScheduler
+as the threaded spotipy client, so both share one concurrency limit and
+one 429 pause, and errors are raised as spotipy's SpotifyException so
+callers handle them the same way.
+
+Requires the httpx package.
+"""
+
+import asyncio
+import logging
+import random
+
+import spotipy
+
+from utils.scheduler import parse_retry_after
+
+try:
+    import httpx
+except ImportError:  # only needed when serving through asgi.py
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+RETRY_CODES = (500, 502, 503, 504)
+RETRY_BACKOFF = 0.3  # base backoff in seconds, doubled each retry (with jitter)
+
+
+class AsyncSpotifyClient:
+    """
+    Minimal async counterpart of spotipy.Spotify for read calls.
+
+    Like the threaded session, it retries connection failures and 5xx
+    responses with backoff, and retries 429s once the scheduler's pause
+    has passed. Read timeouts are not retried.
+    """
+
+    def __init__(self, token_getter, scheduler, base_url, timeout, pool_size,
+                 retries=3, max_retry_after=30):
+        """
+        Args:
+            token_getter: Coroutine function returning an access token
+            scheduler: RequestScheduler to admit requests through
+            base_url: Web API prefix (e.g. "https://api.spotify.com/v1/")
+            timeout: (connect, read) timeouts in seconds
+            pool_size: Max connections
+            retries: Retries for failed connections, 429s and 5xx responses
+            max_retry_after: Longest Retry-After (seconds) worth waiting for
+
+        Raises:
+            RuntimeError: If httpx isn't installed
+        """
+        if httpx is None:
+            raise RuntimeError("The async Spotify client requires httpx (pip install httpx)")
+        connect, read = timeout
+        self.base_url = base_url
+        self.scheduler = scheduler
+        self.retries = retries
+        self.max_retry_after = max_retry_after
+        self._token_getter = token_getter
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def get(self, url, params=None):
+        """
+        GET a Web API resource.
+
+        Args:
+            url: Path relative to base_url (e.g. "users/abc"), or a full
+                 URL such as a paging object's "next"
+            params: Optional query parameters
+
+        Returns:
+            dict: Parsed response body
+
+        Raises:
+            spotipy.exceptions.SpotifyException: For error responses
+            httpx.HTTPError: If the request couldn't be sent
+        """
+        return await self.request("GET", url, params=params)
+
+    async def request(self, method, url, **kwargs):
+        """Send a request through the scheduler, retrying as described above."""
+        if not url.startswith(("http://", "https://")):
+            url = f"{self.base_url}{url}"
+
+        attempt = 0
+        while True:
+            token = await self._token_getter()
+            await self.scheduler.acquire_async()
+            try:
+                response = await self._client.request(
+                    method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                self.scheduler.release()
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except Exception:
+                self.scheduler.release()
+                raise
+
+            status = response.status_code
+            if status == 429:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self.scheduler.release(429, retry_after)
+                if attempt < self.retries and retry_after <= self.max_retry_after:
+                    # acquire_async waits until the scheduler's pause is over
+                    attempt += 1
+                    continue
+            else:
+                self.scheduler.release(status)
+
+            if status in RETRY_CODES and attempt < self.retries:
+                attempt += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if status >= 400:
+                try:
+                    message = response.json()["error"]["message"]
+                except (ValueError, KeyError, TypeError):
+                    message = "error"
+                raise spotipy.exceptions.SpotifyException(
+                    status, -1, f"{url}:\n {message}", headers=dict(response.headers)
+                )
+            return response.json() if response.content else None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, RETRY_BACKOFF * (2 ** attempt))
+
+    async def aclose(self):
+        """Close the connection pool."""
+        await self._client.aclose()
@@ -10,29 +10,134 @@ The refresh token is obtained once through an admin OAuth flow and then
 used to get fresh access tokens as needed.
 """
 
+import asyncio
+import logging
 import os
 import re
 import requests
 import base64
 import threading
+import time
 import spotipy
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-
-# Thread-safe cache for the system account access token
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.cache import TTLCache
+from utils.metrics import track_outbound
+from utils.scheduler import RequestScheduler, ScheduledAdapter, inherit_priority
+from . import catalog
+from .spotify_async import AsyncSpotifyClient
+
+logger = logging.getLogger(__name__)
+
+# HTTP settings for the shared Spotify client
+SPOTIFY_POOL_SIZE = 20  # keep-alive connections per host
+SPOTIFY_TIMEOUT = (3.05, 10)  # (connect, read) timeouts in seconds
+SPOTIFY_RETRIES = 3
+SPOTIFY_RETRY_CODES = (429, 500, 502, 503, 504)
+# Overridable to point the app at a stand-in server (see benchmarks/)
+SPOTIFY_TOKEN_URL = os.getenv("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/")
+
+# Scheduling of Web API calls (429s are handled here, not by urllib3 retries)
+SPOTIFY_INITIAL_CONCURRENCY = 8  # concurrent API calls before adapting
+SPOTIFY_MAX_CONCURRENCY = SPOTIFY_POOL_SIZE
+SPOTIFY_MAX_RATE = float(os.getenv("SPOTIFY_MAX_RATE", 0)) or None  # optional calls/sec cap
+SPOTIFY_QUEUE_TIMEOUT = 30  # max seconds a call waits for a slot
+SPOTIFY_MAX_RETRY_AFTER = 30  # longer Retry-After values fail the call instead of waiting
+
+# Playlist fetching
+PLAYLIST_PAGE_SIZE = 100  # max items Spotify returns per playlist page
+PLAYLIST_PAGE_WORKERS = 4  # concurrent page requests for large playlists
+# Only the track fields the app actually uses
+PLAYLIST_ITEM_FIELDS = "track(id,name,artists(name),album(name,release_date,images))"
+PLAYLIST_FIELDS = f"id,name,images,snapshot_id,tracks(total,items({PLAYLIST_ITEM_FIELDS}))"
+
+# Caching of public user data
+PROFILE_CACHE_TTL = 300  # seconds to cache a user profile
+PLAYLISTS_CACHE_TTL = 120  # seconds to cache a user's playlist list
+NOT_FOUND_CACHE_TTL = 60  # seconds to remember that a user doesn't exist
+USER_CACHE_SIZE = 1000
+
+# Caching of playlist contents, validated against the playlist's snapshot_id
+PLAYLIST_CACHE_TTL = 3600
+PLAYLIST_CACHE_SIZE = 200
+
+# Background token refresh settings
+TOKEN_REFRESH_AHEAD = 300  # refresh this many seconds before the token expires
+TOKEN_REFRESH_RETRY = 15  # seconds to wait after a failed background refresh
+
+# Thread-safe cache for the system account access token.
+# _token_lock only guards reads/writes of the cache; _refresh_lock makes sure
+# a single refresh call is in flight at a time.
 _token_lock = threading.Lock()
+_refresh_lock = threading.Lock()
 _token_cache = {
     "access_token": None,
     "expires_at": None,
 }
 
+# Background refresher thread (tracked per process so forked workers start their own)
+_refresher_lock = threading.Lock()
+_refresher = {
+    "thread": None,
+    "pid": None,
+}
 
-def get_system_spotify():
+# Caches for get_user_profile / get_user_public_playlists.
+# A cached ValueError means the user wasn't found.
+_profile_cache = TTLCache(USER_CACHE_SIZE, PROFILE_CACHE_TTL)
+_playlists_cache = TTLCache(USER_CACHE_SIZE, PLAYLISTS_CACHE_TTL)
+
+# Cache of fetched playlists: playlist_id -> playlist dict (incl. snapshot_id).
+# An entry is only reused while Spotify reports the same snapshot_id.
+_playlist_cache = TTLCache(PLAYLIST_CACHE_SIZE, PLAYLIST_CACHE_TTL)
+
+# Token refresh metrics
+_token_stats = {
+    "refreshes": 0,
+    "failures": 0,
+    "last_latency": None,
+    "total_latency": 0.0,
+}
+
+# Process-wide Spotify client and the pooled session behind it
+_client_lock = threading.Lock()
+_client = None
+_session = None
+_async_client = None  # AsyncSpotifyClient for the ASGI server
+
+# Process-wide gate for every Web API call made through the pooled session
+_scheduler = RequestScheduler(
+    initial_limit=SPOTIFY_INITIAL_CONCURRENCY,
+    max_limit=SPOTIFY_MAX_CONCURRENCY,
+    rate=SPOTIFY_MAX_RATE,
+    queue_timeout=SPOTIFY_QUEUE_TIMEOUT,
+)
+
+# The system account's user ID never changes, so it is looked up only once
+_user_id_lock = threading.Lock()
+_system_user_id = None
+
+
+class _SystemTokenManager:
     """
-    Get a Spotipy client authenticated with the system account.
-    Uses the refresh token from environment variables.
+    Minimal spotipy auth manager for the system account.
 
-    Returns:
-        spotipy.Spotify: Authenticated Spotify client
+    Spotipy asks the auth manager for a token on every request, so the
+    shared client always uses the current cached token and picks up a
+    refreshed one without being rebuilt.
+    """
+
+    def get_access_token(self, as_dict=False):
+        return _get_access_token(_get_refresh_token())
+
+
+def _get_refresh_token():
+    """
+    Read the system account refresh token from the environment.
 
     Raises:
         ValueError: If SPOTIFY_SYSTEM_REFRESH_TOKEN is not set
@@ -43,20 +148,245 @@ def get_system_spotify():
             "SPOTIFY_SYSTEM_REFRESH_TOKEN environment variable is not set. "
             "Please visit /api/admin/spotify-setup to configure the system account."
         )
+    return refresh_token
+
+
+def _get_cached_token(margin=0):
+    """
+    Return the cached access token if it stays valid for ``margin`` more seconds.
+
+    Args:
+        margin: Seconds of validity required
+
+    Returns:
+        str: Access token or None
+    """
+    with _token_lock:
+        token = _token_cache["access_token"]
+        expires_at = _token_cache["expires_at"]
+    if token and expires_at and datetime.now() + timedelta(seconds=margin) < expires_at:
+        return token
+    return None
+
+
+def _get_access_token(refresh_token):
+    """
+    Return a valid access token, refreshing it if the cached one expired.
+
+    Normally the background refresher keeps the token fresh and this only
+    reads the cache. On a cold start or after expiry, concurrent callers
+    share a single refresh call instead of each making their own.
+
+    Args:
+        refresh_token: The Spotify refresh token
+
+    Returns:
+        str: Access token
+    """
+    token = _get_cached_token()
+    if token:
+        return token
+
+    with _refresh_lock:
+        # Another thread may have refreshed while we waited
+        token = _get_cached_token()
+        if token:
+            return token
+
+        logger.info("Refreshing system access token on the request path")
+        return refresh_access_token(refresh_token)
+
+
+def _refresh_loop():
+    """Keep the cached token fresh so the request path never has to refresh it."""
+    while True:
+        with _token_lock:
+            expires_at = _token_cache["expires_at"]
+
+        if expires_at:
+            delay = (expires_at - datetime.now()).total_seconds() - TOKEN_REFRESH_AHEAD
+            # Never spin, even if tokens live shorter than TOKEN_REFRESH_AHEAD
+            time.sleep(max(delay, TOKEN_REFRESH_RETRY))
+
+        refresh_token = os.getenv("SPOTIFY_SYSTEM_REFRESH_TOKEN")
+        if not refresh_token:
+            time.sleep(TOKEN_REFRESH_RETRY)
+            continue
+
+        try:
+            with _refresh_lock:
+                # Skip if a request-path refresh already renewed the token
+                if not _get_cached_token(margin=TOKEN_REFRESH_AHEAD):
+                    refresh_access_token(refresh_token)
+        except Exception as e:
+            logger.warning("Background token refresh failed: %s", e)
+            time.sleep(TOKEN_REFRESH_RETRY)
+
+
+def start_token_refresher():
+    """
+    Start the background token refresher for this process if it isn't running.
+    """
+    with _refresher_lock:
+        thread = _refresher["thread"]
+        if thread and thread.is_alive() and _refresher["pid"] == os.getpid():
+            return
+
+        thread = threading.Thread(
+            target=_refresh_loop, name="spotify-token-refresher", daemon=True
+        )
+        thread.start()
+        _refresher["thread"] = thread
+        _refresher["pid"] = os.getpid()
 
-    # Thread-safe token caching
+
+def get_token_stats():
+    """
+    Get token refresh metrics.
+
+    Returns:
+        dict: Counters with keys: refreshes, failures, last_latency, total_latency
+    """
     with _token_lock:
-        # Check if we have a valid cached token
-        if _token_cache["access_token"] and _token_cache["expires_at"]:
-            if datetime.now() < _token_cache["expires_at"]:
-                print("[SystemAccount] Using cached access token")
-                return spotipy.Spotify(auth=_token_cache["access_token"])
+        return dict(_token_stats)
 
-        # Get a new access token using the refresh token
-        print("[SystemAccount] Refreshing access token...")
-        access_token = refresh_access_token(refresh_token)
 
-    return spotipy.Spotify(auth=access_token)
+def get_http_session():
+    """
+    Get the pooled HTTP session shared by all system account calls.
+
+    Web API calls go through the shared request scheduler, which paces them,
+    adapts concurrency and waits out 429s. Only their idempotent methods are
+    retried on 5xx: a POST (playlist create, add items) that failed after
+    Spotify applied it would be duplicated. Other calls (token refreshes,
+    which are safe to repeat) use a plain adapter with retries on 429/5xx.
+
+    Returns:
+        requests.Session: Keep-alive session with retries on 5xx
+    """
+    global _session
+    with _client_lock:
+        if _session is None:
+            retry = Retry(
+                total=SPOTIFY_RETRIES,
+                connect=None,
+                read=False,
+                allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+                status=SPOTIFY_RETRIES,
+                backoff_factor=0.3,
+                status_forcelist=SPOTIFY_RETRY_CODES,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=SPOTIFY_POOL_SIZE,
+                max_retries=retry,
+            )
+            api_adapter = ScheduledAdapter(
+                _scheduler,
+                throttle_retries=SPOTIFY_RETRIES,
+                max_retry_after=SPOTIFY_MAX_RETRY_AFTER,
+                pool_connections=1,
+                pool_maxsize=SPOTIFY_POOL_SIZE,
+                max_retries=retry.new(
+                    allowed_methods=frozenset(["GET", "PUT", "DELETE"]),
+                    status_forcelist=[code for code in SPOTIFY_RETRY_CODES if code != 429],
+                ),
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.mount(SPOTIFY_API_URL, api_adapter)
+            _session = session
+        return _session
+
+
+def get_scheduler_stats():
+    """
+    Get the state of the Web API request scheduler.
+
+    Returns:
+        dict: Concurrency limit, in-flight and queued calls, and counters
+              (see RequestScheduler.get_stats)
+    """
+    return _scheduler.get_stats()
+
+
+def get_system_spotify():
+    """
+    Get the Spotipy client authenticated with the system account.
+    Uses the refresh token from environment variables.
+
+    The client is created once per process and reuses a pooled keep-alive
+    session. Token refreshes are picked up transparently.
+
+    Returns:
+        spotipy.Spotify: Authenticated Spotify client
+
+    Raises:
+        ValueError: If SPOTIFY_SYSTEM_REFRESH_TOKEN is not set
+    """
+    # Make sure a token can be obtained before handing out the client
+    _get_access_token(_get_refresh_token())
+    start_token_refresher()
+
+    global _client
+    session = get_http_session()
+    with _client_lock:
+        if _client is None:
+            _client = spotipy.Spotify(
+                auth_manager=_SystemTokenManager(),
+                requests_session=session,
+                requests_timeout=SPOTIFY_TIMEOUT,
+            )
+            _client.prefix = f"{SPOTIFY_API_URL}v1/"
+        return _client
+
+
+async def _get_access_token_async():
+    """Async _get_access_token; only a needed refresh is run on a thread."""
+    token = _get_cached_token()
+    if token:
+        return token
+    return await asyncio.to_thread(_get_access_token, _get_refresh_token())
+
+
+def get_async_spotify():
+    """
+    Get the async Web API client used by the ASGI server.
+
+    It shares the system token and the request scheduler with the
+    threaded client returned by get_system_spotify.
+
+    Returns:
+        AsyncSpotifyClient: Shared client
+
+    Raises:
+        RuntimeError: If httpx isn't installed
+    """
+    start_token_refresher()
+
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            _async_client = AsyncSpotifyClient(
+                _get_access_token_async,
+                _scheduler,
+                base_url=f"{SPOTIFY_API_URL}v1/",
+                timeout=SPOTIFY_TIMEOUT,
+                pool_size=SPOTIFY_POOL_SIZE,
+                retries=SPOTIFY_RETRIES,
+                max_retry_after=SPOTIFY_MAX_RETRY_AFTER,
+            )
+        return _async_client
+
+
+async def close_async_spotify():
+    """Close the async client's connections (on ASGI server shutdown)."""
+    global _async_client
+    with _client_lock:
+        client, _async_client = _async_client, None
+    if client is not None:
+        await client.aclose()
 
 
 def refresh_access_token(refresh_token):
@@ -75,52 +405,61 @@ def refresh_access_token(refresh_token):
     client_id = os.getenv("SPOTIPY_CLIENT_ID")
     client_secret = os.getenv("SPOTIPY_CLIENT_SECRET")
 
-    # Debug logging
-    print(f"[TokenRefresh] Client ID set: {bool(client_id)}")
-    if client_id:
-        print(f"[TokenRefresh] Client ID length: {len(client_id)}, starts with: {client_id[:8]}...")
-    print(f"[TokenRefresh] Client Secret set: {bool(client_secret)}")
-    if client_secret:
-        print(f"[TokenRefresh] Client Secret length: {len(client_secret)}")
-    print(f"[TokenRefresh] Refresh token length: {len(refresh_token)}, starts with: {refresh_token[:10]}...")
-
     # Create authorization header
     auth_header = base64.b64encode(
         f"{client_id}:{client_secret}".encode()
     ).decode()
 
-    print(f"[TokenRefresh] Making request to Spotify token endpoint...")
-
-    response = requests.post(
-        "https://accounts.spotify.com/api/token",
-        headers={
-            "Authorization": f"Basic {auth_header}",
-            "Content-Type": "application/x-www-form-urlencoded",
-        },
-        data={
-            "grant_type": "refresh_token",
-            "refresh_token": refresh_token,
-        },
-    )
-
-    print(f"[TokenRefresh] Response status: {response.status_code}")
+    started = time.monotonic()
+    try:
+        with track_outbound("spotify", "token_refresh"):
+            response = get_http_session().post(
+                SPOTIFY_TOKEN_URL,
+                headers={
+                    "Authorization": f"Basic {auth_header}",
+                    "Content-Type": "application/x-www-form-urlencoded",
+                },
+                data={
+                    "grant_type": "refresh_token",
+                    "refresh_token": refresh_token,
+                },
+                timeout=SPOTIFY_TIMEOUT,
+            )
+    except requests.RequestException:
+        _record_refresh(started, success=False)
+        raise
 
     if response.status_code != 200:
-        print(f"[TokenRefresh] Error response: {response.text}")
+        _record_refresh(started, success=False)
+        logger.error(
+            "Token refresh failed",
+            extra={"status": response.status_code, "response": response.text[:500]},
+        )
         raise Exception(f"Failed to refresh token: {response.text}")
 
     data = response.json()
     access_token = data["access_token"]
     expires_in = data.get("expires_in", 3600)
-    print(f"[TokenRefresh] Success! Token expires in {expires_in} seconds")
 
     # Cache the token with expiry time (with 60 second buffer)
-    _token_cache["access_token"] = access_token
-    _token_cache["expires_at"] = datetime.now() + timedelta(seconds=expires_in - 60)
+    with _token_lock:
+        _token_cache["access_token"] = access_token
+        _token_cache["expires_at"] = datetime.now() + timedelta(seconds=expires_in - 60)
+    _record_refresh(started, success=True)
+    logger.info("Refreshed system access token", extra={"expires_in": expires_in})
 
     return access_token
 
 
+def _record_refresh(started, success):
+    """Record the latency and outcome of a token refresh call."""
+    latency = time.monotonic() - started
+    with _token_lock:
+        _token_stats["refreshes" if success else "failures"] += 1
+        _token_stats["last_latency"] = latency
+        _token_stats["total_latency"] += latency
+
+
 def parse_user_id_from_url(profile_url):
     """
     Extract user ID from a Spotify profile URL, URI, or plain username.
@@ -202,6 +541,8 @@ def get_user_profile(user_id):
     """
     Fetch a user's public profile using the system account.
 
+    Results (including "not found") are cached briefly.
+
     Args:
         user_id: Spotify user ID
 
@@ -212,64 +553,227 @@ def get_user_profile(user_id):
         ValueError: If user not found
         Exception: If API error
     """
+    cached = _cached_user_data(_profile_cache, user_id)
+    if cached is not None:
+        return dict(cached)
+
     sp = get_system_spotify()
     try:
-        user = sp.user(user_id)
-        return {
-            "id": user["id"],
-            "display_name": user.get("display_name") or user["id"],
-            "images": user.get("images", []),
-            "external_urls": user.get("external_urls", {}),
-        }
+        with track_outbound("spotify", "user_profile"):
+            user = sp.user(user_id)
     except spotipy.exceptions.SpotifyException as e:
-        if e.http_status == 404:
-            raise ValueError(f"User '{user_id}' not found")
-        raise
+        _raise_user_error(_profile_cache, user_id, e)
+
+    profile = _profile_from_user(user)
+    _profile_cache.set(user_id, profile)
+    return dict(profile)
+
+
+async def get_user_profile_async(user_id):
+    """
+    Async version of get_user_profile for the ASGI server (same cache).
+
+    Args:
+        user_id: Spotify user ID
+
+    Returns:
+        dict: User profile data with keys: id, display_name, images, external_urls
+
+    Raises:
+        ValueError: If user not found
+        Exception: If API error
+    """
+    cached = _cached_user_data(_profile_cache, user_id)
+    if cached is not None:
+        return dict(cached)
+
+    _get_refresh_token()  # fail like get_system_spotify if unconfigured
+    try:
+        with track_outbound("spotify", "user_profile"):
+            user = await get_async_spotify().get(f"users/{user_id}")
+    except spotipy.exceptions.SpotifyException as e:
+        _raise_user_error(_profile_cache, user_id, e)
+
+    profile = _profile_from_user(user)
+    _profile_cache.set(user_id, profile)
+    return dict(profile)
 
 
 def get_user_public_playlists(user_id):
     """
     Fetch a user's public playlists using the system account.
 
+    Results (including "not found") are cached briefly.
+
     Args:
         user_id: Spotify user ID
 
     Returns:
         list: List of playlist dicts with keys: id, name, images, tracks_total
+
+    Raises:
+        ValueError: If user not found
     """
+    cached = _cached_user_data(_playlists_cache, user_id)
+    if cached is not None:
+        return list(cached)
+
     sp = get_system_spotify()
     playlists = []
 
-    results = sp.user_playlists(user_id, limit=50)
+    try:
+        with track_outbound("spotify", "user_playlists"):
+            results = sp.user_playlists(user_id, limit=50)
+    except spotipy.exceptions.SpotifyException as e:
+        _raise_user_error(_playlists_cache, user_id, e)
+
+    while results:
+        playlists.extend(_public_playlists(results["items"]))
+
+        if results["next"]:
+            with track_outbound("spotify", "user_playlists"):
+                results = sp.next(results)
+        else:
+            break
+
+    _playlists_cache.set(user_id, playlists)
+    return list(playlists)
+
+
+async def get_user_public_playlists_async(user_id):
+    """
+    Async version of get_user_public_playlists for the ASGI server (same cache).
+
+    Args:
+        user_id: Spotify user ID
+
+    Returns:
+        list: List of playlist dicts with keys: id, name, images, tracks_total
+
+    Raises:
+        ValueError: If user not found
+    """
+    cached = _cached_user_data(_playlists_cache, user_id)
+    if cached is not None:
+        return list(cached)
+
+    _get_refresh_token()  # fail like get_system_spotify if unconfigured
+    client = get_async_spotify()
+    playlists = []
+
+    try:
+        with track_outbound("spotify", "user_playlists"):
+            results = await client.get(
+                f"users/{user_id}/playlists", params={"limit": 50, "offset": 0}
+            )
+    except spotipy.exceptions.SpotifyException as e:
+        _raise_user_error(_playlists_cache, user_id, e)
 
     while results:
-        for item in results["items"]:
-            # Only include public playlists
-            if item.get("public", False):
-                playlists.append({
-                    "id": item["id"],
-                    "name": item["name"],
-                    "images": item.get("images", []),
-                    "tracks_total": item["tracks"]["total"],
-                })
+        playlists.extend(_public_playlists(results["items"]))
 
         if results["next"]:
-            results = sp.next(results)
+            with track_outbound("spotify", "user_playlists"):
+                results = await client.get(results["next"])
         else:
             break
 
-    return playlists
+    _playlists_cache.set(user_id, playlists)
+    return list(playlists)
+
+
+def _cached_user_data(cache, user_id):
+    """
+    Look up a user in a profile/playlists cache.
+
+    Returns:
+        The cached data, or None on a miss
+
+    Raises:
+        ValueError: If the user is cached as not found
+    """
+    cached = cache.get(user_id)
+    if isinstance(cached, ValueError):
+        raise ValueError(str(cached))
+    return cached
+
+
+def _raise_user_error(cache, user_id, error):
+    """Re-raise a user lookup error, caching a 404 as "not found"."""
+    if error.http_status == 404:
+        not_found = ValueError(f"User '{user_id}' not found")
+        cache.set(user_id, not_found, ttl=NOT_FOUND_CACHE_TTL)
+        raise not_found
+    raise error
+
+
+def _profile_from_user(user):
+    """Keep the public profile fields of a Web API user object."""
+    return {
+        "id": user["id"],
+        "display_name": user.get("display_name") or user["id"],
+        "images": user.get("images", []),
+        "external_urls": user.get("external_urls", {}),
+    }
+
+
+def _public_playlists(items):
+    """Keep the public playlists of a page of Web API playlist objects."""
+    return [
+        {
+            "id": item["id"],
+            "name": item["name"],
+            "images": item.get("images", []),
+            "tracks_total": item["tracks"]["total"],
+        }
+        for item in items
+        # Only include public playlists
+        if item.get("public", False)
+    ]
 
 
 def get_playlist_tracks(playlist_id):
     """
     Fetch tracks from a public playlist using the system account.
 
+    Playlist contents only change when Spotify's snapshot_id changes, so a
+    previously fetched playlist is reused after a cheap snapshot_id check
+    instead of being downloaded again.
+
     Args:
         playlist_id: Spotify playlist ID
 
     Returns:
-        dict: Playlist data with name and tracks
+        dict: Playlist data with id, name, images, snapshot_id and
+              tracks: {total, items} holding every item in playlist order
+
+    Raises:
+        ValueError: If playlist not found or not accessible
+    """
+    cached = _playlist_cache.get(playlist_id)
+    if cached and get_playlist_snapshot_id(playlist_id) == cached["snapshot_id"]:
+        return _copy_playlist(cached)
+
+    playlist = _fetch_playlist(playlist_id)
+    _playlist_cache.set(playlist_id, playlist)
+
+    # Remember the tracks so recommendations can be resolved without a search
+    catalog.add_tracks(
+        catalog.project_track(item.get("track"))
+        for item in playlist["tracks"]["items"]
+    )
+    return _copy_playlist(playlist)
+
+
+def get_playlist_snapshot_id(playlist_id):
+    """
+    Get a playlist's current snapshot_id (changes whenever its contents do).
+
+    Args:
+        playlist_id: Spotify playlist ID
+
+    Returns:
+        str: Snapshot ID
 
     Raises:
         ValueError: If playlist not found or not accessible
@@ -277,17 +781,89 @@ def get_playlist_tracks(playlist_id):
     sp = get_system_spotify()
 
     try:
-        playlist = sp.playlist(playlist_id)
-        return playlist
+        with track_outbound("spotify", "playlist_snapshot"):
+            return sp.playlist(playlist_id, fields="snapshot_id")["snapshot_id"]
     except spotipy.exceptions.SpotifyException as e:
         if e.http_status == 404:
-            raise ValueError(
-                "Couldn't access this playlist. "
-                "Make sure the playlist is public and the link is correct."
-            )
+            _playlist_cache.delete(playlist_id)
+            raise _playlist_not_accessible()
         raise
 
 
+def _fetch_playlist(playlist_id):
+    """
+    Download a playlist with all of its tracks.
+
+    Reads the first page along with the playlist details, then fetches any
+    remaining pages concurrently. Responses are limited to the fields the
+    app uses.
+    """
+    sp = get_system_spotify()
+
+    try:
+        with track_outbound("spotify", "playlist_fetch"):
+            playlist = sp.playlist(playlist_id, fields=PLAYLIST_FIELDS)
+    except spotipy.exceptions.SpotifyException as e:
+        if e.http_status == 404:
+            raise _playlist_not_accessible()
+        raise
+
+    items = playlist["tracks"]["items"]
+    offsets = range(len(items), playlist["tracks"]["total"], PLAYLIST_PAGE_SIZE)
+
+    if offsets:
+        def fetch_page(offset):
+            with track_outbound("spotify", "playlist_page"):
+                page = sp.playlist_items(
+                    playlist_id,
+                    fields=f"items({PLAYLIST_ITEM_FIELDS})",
+                    limit=PLAYLIST_PAGE_SIZE,
+                    offset=offset,
+                    additional_types=("track",),
+                )
+            return page["items"]
+
+        workers = min(PLAYLIST_PAGE_WORKERS, len(offsets))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for page_items in executor.map(inherit_priority(fetch_page), offsets):
+                items.extend(page_items)
+
+    return playlist
+
+
+def _copy_playlist(playlist):
+    """Copy a cached playlist so callers can't modify the cached item list."""
+    return {
+        **playlist,
+        "tracks": {**playlist["tracks"], "items": list(playlist["tracks"]["items"])},
+    }
+
+
+def _playlist_not_accessible():
+    return ValueError(
+        "Couldn't access this playlist. "
+        "Make sure the playlist is public and the link is correct."
+    )
+
+
+def get_system_user_id():
+    """
+    Get the Spotify user ID of the system account.
+
+    Looked up with /me on first use and cached for the life of the process.
+
+    Returns:
+        str: System account user ID
+    """
+    global _system_user_id
+    if _system_user_id is None:
+        with _user_id_lock:
+            if _system_user_id is None:
+                with track_outbound("spotify", "me"):
+                    _system_user_id = get_system_spotify().me()["id"]
+    return _system_user_id
+
+
 def create_playlist_on_system_account(name, description=""):
     """
     Create a new playlist on the system account.
@@ -300,13 +876,15 @@ def create_playlist_on_system_account(name, description=""):
         str: Created playlist ID
     """
     sp = get_system_spotify()
-    user_id = sp.me()["id"]
 
-    playlist = sp.user_playlist_create(
-        user_id,
-        name,
-        public=True,  # Must be public so users can access it
-        description=description,
-    )
+    user_id = get_system_user_id()
+
+    with track_outbound("spotify", "playlist_create"):
+        playlist = sp.user_playlist_create(
+            user_id,
+            name,
+            public=True,  # Must be public so users can access it
+            description=description,
+        )
 
     return playlist["id"]
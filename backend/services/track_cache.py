@@ -0,0 +1,213 @@
+"""
+Persistent track resolution cache.
+
+Maps a normalized (track name, artist) pair to the projected track dict
+returned by search_and_get_tracks, so popular recommendations don't need
+a Spotify search every time.
+
+Backed by SQLite so it survives restarts and can be shared by several
+worker processes on the same host. Misses are cached too (with a shorter
+TTL). Lookups ignore expired entries; a periodic sweep deletes them and
+evicts the least recently used entries once the cache has grown past
+TRACK_CACHE_MAX_ENTRIES.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Cache settings
+TRACK_CACHE_PATH = os.getenv("TRACK_CACHE_PATH", "./.track_cache.sqlite3")
+TRACK_CACHE_TTL = 7 * 24 * 3600  # seconds to keep a found track
+TRACK_CACHE_NEGATIVE_TTL = 24 * 3600  # seconds to keep a "not found" result
+TRACK_CACHE_MAX_ENTRIES = 50000
+TRACK_CACHE_SWEEP_INTERVAL = 60  # seconds between expiry/eviction sweeps
+
+_db_lock = threading.Lock()
+_db = None
+_next_sweep = 0
+
+_stats_lock = threading.Lock()
+_stats = {
+    "hits": 0,
+    "negative_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+
+def _get_db():
+    """Open the cache database on first use. Caller must hold _db_lock."""
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(TRACK_CACHE_PATH, check_same_thread=False, timeout=5)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS track_cache ("
+            " key TEXT PRIMARY KEY,"
+            " track TEXT,"
+            " expires_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        _db.execute(
+            "CREATE INDEX IF NOT EXISTS track_cache_last_used "
+            "ON track_cache (last_used)"
+        )
+        _db.commit()
+    return _db
+
+
+def _count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+
+
+def make_key(name, artist):
+    """
+    Build the cache key for a track.
+
+    Args:
+        name: Track name
+        artist: Artist name
+
+    Returns:
+        str: Normalized key
+    """
+    return f"{normalize_text(name)}\x1f{normalize_text(artist)}"
+
+
+def get_many(keys):
+    """
+    Look up several tracks at once.
+
+    Args:
+        keys: Iterable of keys from make_key
+
+    Returns:
+        dict: key -> track dict, or None for a cached "not found".
+              Keys with no live entry are omitted.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    now = time.time()
+    found = {}
+
+    try:
+        with _db_lock:
+            db = _get_db()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = db.execute(
+                    f"SELECT key, track FROM track_cache "
+                    f"WHERE key IN ({placeholders}) AND expires_at > ?",
+                    (*chunk, now),
+                ).fetchall()
+                for key, track in rows:
+                    found[key] = json.loads(track) if track else None
+
+            if found:
+                db.executemany(
+                    "UPDATE track_cache SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                db.commit()
+    except sqlite3.Error as e:
+        logger.warning("Lookup failed: %s", e)
+        return {}
+
+    negative = sum(1 for track in found.values() if track is None)
+    _count("hits", len(found) - negative)
+    _count("negative_hits", negative)
+    _count("misses", len(keys) - len(found))
+
+    return found
+
+
+def put_many(entries):
+    """
+    Store search results.
+
+    Args:
+        entries: dict of key -> track dict, or None to cache a "not found"
+    """
+    if not entries:
+        return
+
+    now = time.time()
+    rows = [
+        (
+            key,
+            json.dumps(track) if track else None,
+            now + (TRACK_CACHE_TTL if track else TRACK_CACHE_NEGATIVE_TTL),
+            now,
+        )
+        for key, track in entries.items()
+    ]
+
+    try:
+        with _db_lock:
+            db = _get_db()
+            db.executemany(
+                "INSERT OR REPLACE INTO track_cache "
+                "(key, track, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            evicted = _sweep(db, now)
+            db.commit()
+    except sqlite3.Error as e:
+        logger.warning("Store failed: %s", e)
+        return
+
+    if evicted:
+        _count("evictions", evicted)
+
+
+def _sweep(db, now):
+    """
+    Drop expired entries and trim the cache to TRACK_CACHE_MAX_ENTRIES, at
+    most every TRACK_CACHE_SWEEP_INTERVAL seconds (counting the entries
+    scans the table). Caller must hold _db_lock.
+
+    Returns:
+        int: Number of entries removed
+    """
+    global _next_sweep
+    if now < _next_sweep:
+        return 0
+    _next_sweep = now + TRACK_CACHE_SWEEP_INTERVAL
+
+    removed = db.execute(
+        "DELETE FROM track_cache WHERE expires_at <= ?", (now,)
+    ).rowcount
+
+    (count,) = db.execute("SELECT COUNT(*) FROM track_cache").fetchone()
+    excess = count - TRACK_CACHE_MAX_ENTRIES
+    if excess > 0:
+        removed += db.execute(
+            "DELETE FROM track_cache WHERE key IN ("
+            " SELECT key FROM track_cache ORDER BY last_used LIMIT ?)",
+            (excess,),
+        ).rowcount
+
+    return removed
+
+
+def get_stats():
+    """
+    Get cache hit/miss counters.
+
+    Returns:
+        dict: Counters with keys: hits, negative_hits, misses, evictions
+    """
+    with _stats_lock:
+        return dict(_stats)
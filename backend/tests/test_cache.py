@@ -0,0 +1,68 @@
+"""Tests for the in-memory TTL cache."""
+
+import pytest
+
+from utils import cache
+from utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    store = TTLCache(10, ttl=60)
+    store.set("a", 1)
+    clock.now += 59
+    assert store.get("a") == 1
+    clock.now += 1
+    assert store.get("a", "gone") == "gone"
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    store = TTLCache(10, ttl=60)
+    store.set("short", 1, ttl=5)
+    store.set("long", 2)
+    clock.now += 10
+    assert store.get("short") is None
+    assert store.get("long") == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    store = TTLCache(2, ttl=60)
+    store.set("a", 1)
+    store.set("b", 2)
+    store.get("a")
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1
+    assert store.get("c") == 3
+
+
+def test_falsy_values_are_cached(clock):
+    store = TTLCache(10, ttl=60)
+    store.set("empty", [])
+    assert store.get("empty", "missing") == []
+
+
+def test_delete_and_clear(clock):
+    store = TTLCache(10, ttl=60)
+    store.set("a", 1)
+    store.set("b", 2)
+    store.delete("a")
+    store.delete("missing")
+    assert store.get("a") is None
+    store.clear()
+    assert store.get("b") is None
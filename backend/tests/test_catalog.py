@@ -0,0 +1,121 @@
+"""Tests for the local track catalog: counts, eviction and lookups."""
+
+import multiprocessing
+import sqlite3
+import threading
+
+import pytest
+
+from services import catalog
+
+
+@pytest.fixture(autouse=True)
+def fresh_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, "CATALOG_PATH", str(tmp_path / "catalog.sqlite3"))
+    monkeypatch.setattr(catalog, "_local", threading.local())
+    monkeypatch.setattr(catalog, "_schema_ready", False)
+    return tmp_path / "catalog.sqlite3"
+
+
+def _track(number, name=None, artist=None):
+    return {
+        "id": f"track{number}",
+        "name": name or f"Song {number}",
+        "artist": artist or f"Artist {number}",
+        "album": "Album",
+        "image": None,
+    }
+
+
+def _counts(path):
+    db = sqlite3.connect(path)
+    size = db.execute("SELECT id, tracks FROM catalog_size").fetchall()
+    terms = dict(db.execute("SELECT term, tracks FROM catalog_term_counts WHERE tracks > 0"))
+    actual_terms = dict(db.execute("SELECT term, COUNT(*) FROM catalog_terms GROUP BY term"))
+    (actual_size,) = db.execute("SELECT COUNT(*) FROM catalog_tracks").fetchone()
+    db.close()
+    return size, terms, actual_terms, actual_size
+
+
+def test_counts_follow_adds_and_refreshes(fresh_catalog):
+    catalog.add_tracks([_track(n) for n in range(10)])
+    catalog.add_tracks([_track(n) for n in range(5, 15)])  # half are refreshes
+
+    size, terms, actual_terms, actual_size = _counts(fresh_catalog)
+    assert size == [(0, 15)]
+    assert actual_size == 15
+    assert terms == actual_terms
+
+
+def test_eviction_keeps_counts(fresh_catalog, monkeypatch):
+    monkeypatch.setattr(catalog, "CATALOG_MAX_TRACKS", 20)
+    monkeypatch.setattr(catalog, "CATALOG_EVICT_BATCH", 5)
+    for start in range(0, 30, 10):
+        catalog.add_tracks([_track(n) for n in range(start, start + 10)])
+
+    size, terms, actual_terms, actual_size = _counts(fresh_catalog)
+    assert actual_size == 15  # 30 - (10 over the limit + a batch of 5)
+    assert size == [(0, actual_size)]
+    assert terms == actual_terms
+
+
+def test_backfills_counts_for_existing_database(fresh_catalog):
+    catalog.add_tracks([_track(n) for n in range(5)])
+    db = sqlite3.connect(fresh_catalog)
+    db.execute("DROP TABLE catalog_size")
+    db.execute("DELETE FROM catalog_term_counts")
+    db.commit()
+    db.close()
+
+    # A new process opens the file
+    catalog._local = threading.local()
+    catalog._schema_ready = False
+    catalog.add_tracks([_track(5)])
+
+    size, terms, actual_terms, actual_size = _counts(fresh_catalog)
+    assert size == [(0, 6)]
+    assert terms == actual_terms
+
+
+def _open_catalog(path, start):
+    catalog.CATALOG_PATH = path
+    start.wait()
+    catalog._connect()
+
+
+def test_concurrent_schema_setup_creates_one_size_row(fresh_catalog):
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    processes = [
+        context.Process(target=_open_catalog, args=(str(fresh_catalog), start))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join(10)
+
+    assert [process.exitcode for process in processes] == [0] * 4
+    db = sqlite3.connect(fresh_catalog)
+    assert db.execute("SELECT id, tracks FROM catalog_size").fetchall() == [(0, 0)]
+    with pytest.raises(sqlite3.IntegrityError):
+        db.execute("INSERT INTO catalog_size (id, tracks) VALUES (1, 0)")
+
+
+def test_exact_lookup():
+    catalog.add_tracks([_track(1, "Hurt", "Johnny Cash")])
+    found = catalog.lookup_many({"k": ("HURT", "johnny cash")})
+    assert found["k"]["id"] == "track1"
+
+
+def test_fuzzy_lookup_uses_rare_words():
+    catalog.add_tracks([_track(n, f"Love Song {n}", "The Band") for n in range(50)])
+    catalog.add_tracks([_track(999, "Bohemian Rhapsody", "Queen")])
+    found = catalog.lookup_many({"k": ("Bohemian Rhapsodie", "Queen")})
+    assert found["k"]["id"] == "track999"
+
+
+def test_fuzzy_lookup_rejects_weak_matches():
+    catalog.add_tracks([_track(1, "Bohemian Rhapsody", "Queen")])
+    assert catalog.lookup_many({"k": ("Bohemian Grove", "Someone Else")}) == {}
@@ -0,0 +1,94 @@
+"""Tests for how generation requests wait for (or hand back) their job."""
+
+import threading
+
+import pytest
+
+from app import create_app
+from blueprints import generation
+from config import Config
+
+
+class _TestConfig(Config):
+    TESTING = True
+    RATE_LIMIT_MAX = 1000
+    RATE_LIMIT_BACKEND = "memory"
+    SESSION_BACKEND = "cookie"
+
+
+@pytest.fixture
+def client():
+    return create_app(_TestConfig).test_client()
+
+
+@pytest.fixture
+def release(monkeypatch):
+    """Make generations block until the returned event is set."""
+    released = threading.Event()
+
+    def fake_generate(description, progress=None, use_cache=True):
+        released.wait(5)
+        return {
+            "playlist_id": "playlist1",
+            "title": description,
+            "description": "",
+            "tracks": [],
+        }
+
+    monkeypatch.setattr(generation, "generate_from_text", fake_generate)
+    yield released
+    released.set()
+
+
+def _generate(client, description, headers=None, **flags):
+    return client.post(
+        "/api/generate/from-text",
+        json={"description": description, **flags},
+        headers=headers or {},
+    )
+
+
+def test_returns_job_by_default(client, release):
+    response = _generate(client, "returns job by default")
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["status"] in ("queued", "running")
+    assert response.headers["Location"] == body["status_url"]
+
+
+def test_wait_flag_returns_result(client, release):
+    release.set()
+    response = _generate(client, "wait flag", wait=True)
+    assert response.status_code == 200
+    assert response.get_json()["playlist_id"] == "playlist1"
+
+
+def test_prefer_wait_header_returns_result(client, release):
+    release.set()
+    response = _generate(client, "prefer wait", headers={"Prefer": "wait=10"})
+    assert response.status_code == 200
+
+
+def test_prefer_wait_zero_returns_job(client, release):
+    response = _generate(client, "prefer wait zero", headers={"Prefer": "wait=0"})
+    assert response.status_code == 202
+
+
+def test_async_flag_wins_over_wait(client, release):
+    release.set()
+    response = _generate(
+        client, "async wins", headers={"Prefer": "respond-async, wait=10"}, wait=True
+    )
+    assert response.status_code == 202
+
+
+def test_job_status_reports_result(client, release):
+    job = _generate(client, "status").get_json()
+    release.set()
+    for _ in range(100):
+        status = client.get(job["status_url"]).get_json()
+        if status["status"] == "succeeded":
+            break
+        threading.Event().wait(0.02)
+    assert status["status"] == "succeeded"
+    assert status["result"]["title"] == "status"
@@ -0,0 +1,122 @@
+"""Tests for the queued, structured logging setup."""
+
+import atexit
+import json
+import logging
+import sys
+import threading
+import time
+
+import pytest
+
+from utils import log
+
+
+def _record(msg="Resolved %s tracks", args=(3,), level=logging.INFO, **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = log.JsonFormatter().format(_record(job_id="abc", found=3))
+    entry = json.loads(line)
+    assert entry["msg"] == "Resolved 3 tracks"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["job_id"] == "abc"
+    assert entry["found"] == 3
+    assert "args" not in entry and "sample" not in entry
+
+
+def test_json_formatter_includes_exceptions():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("app", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+    entry = json.loads(log.JsonFormatter().format(record))
+    assert "ValueError: boom" in entry["exc"]
+
+
+def test_text_formatter_appends_extra_fields():
+    line = log.TextFormatter().format(_record(job_id="abc"))
+    assert line.endswith("app.test: Resolved 3 tracks job_id=abc")
+
+
+def test_sampling_keeps_one_in_n_per_template():
+    sampler = log.SamplingFilter()
+    kept = [sampler.filter(_record(sample=10)) for _ in range(30)]
+    assert sum(kept) == 3
+
+    other = [sampler.filter(_record(msg="Other %s", sample=10)) for _ in range(10)]
+    assert sum(other) == 1
+
+
+def test_sampling_never_drops_errors_or_unsampled_records():
+    sampler = log.SamplingFilter()
+    assert all(sampler.filter(_record(level=logging.ERROR, sample=100)) for _ in range(5))
+    assert all(sampler.filter(_record()) for _ in range(5))
+
+
+class SlowStream:
+    """A stdout that takes a while to accept each write."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = []
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        time.sleep(self.delay)
+        with self.lock:
+            self.lines.append(text)
+
+    def flush(self):
+        pass
+
+
+def _stop_listener():
+    listener = log._listener["listener"]
+    if listener is not None:
+        listener.stop()
+        atexit.unregister(listener.stop)
+        log._listener["listener"] = None
+
+
+@pytest.fixture
+def isolated_root(monkeypatch):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    monkeypatch.setattr(log, "_listener", {"listener": None, "pid": None})
+    yield root
+    _stop_listener()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_logging_does_not_wait_for_slow_output(isolated_root, monkeypatch):
+    stream = SlowStream(delay=0.2)
+    monkeypatch.setattr(sys, "stdout", stream)
+    log.configure_logging("INFO", "json")
+
+    started = time.monotonic()
+    for n in range(5):
+        logging.getLogger("app.test").info("event %s", n, extra={"n": n})
+    assert time.monotonic() - started < 0.1
+
+    _stop_listener()  # drains the queue
+    messages = [json.loads(line)["msg"] for line in "".join(stream.lines).splitlines()]
+    assert messages == [f"event {n}" for n in range(5)]
+
+
+def test_configure_logging_is_idempotent(isolated_root, monkeypatch):
+    monkeypatch.setattr(sys, "stdout", SlowStream(delay=0))
+    log.configure_logging("INFO", "text")
+    listener = log._listener["listener"]
+    log.configure_logging("DEBUG", "text")
+    assert log._listener["listener"] is listener
+    assert isolated_root.level == logging.DEBUG
+    assert len(isolated_root.handlers) == 1
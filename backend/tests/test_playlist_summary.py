@@ -0,0 +1,75 @@
+"""Tests for sampling large playlists down to the Logic payload budget."""
+
+from collections import Counter
+
+from services.playlist_summary import dedupe_tracks, sample_tracks, summarize_playlist
+
+
+def _tracks(artist_counts):
+    tracks = []
+    for artist, count in artist_counts.items():
+        tracks.extend(
+            {"name": f"{artist} song {n}", "artist": artist, "album": "", "release_date": "1994"}
+            for n in range(count)
+        )
+    return tracks
+
+
+def test_small_playlists_are_returned_whole():
+    tracks = _tracks({"A": 3})
+    assert sample_tracks(tracks, 5) == tracks
+    assert sample_tracks(tracks, 0) == []
+
+
+def test_slots_are_shared_in_proportion_to_artist_counts():
+    tracks = _tracks({"A": 60, "B": 30, "C": 10})
+    sample = sample_tracks(tracks, 10)
+    assert Counter(track["artist"] for track in sample) == {"A": 6, "B": 3, "C": 1}
+
+
+def test_leftover_slots_go_to_largest_remainders():
+    tracks = _tracks({"A": 5, "B": 3, "C": 2})
+    sample = sample_tracks(tracks, 4)
+    assert len(sample) == 4
+    # Quotas are 2.0, 1.2 and 0.8: C's remainder beats B's for the last slot
+    assert Counter(track["artist"] for track in sample) == {"A": 2, "B": 1, "C": 1}
+
+
+def test_sample_is_deterministic_spread_and_in_playlist_order():
+    tracks = _tracks({"A": 40, "B": 40})
+    sample = sample_tracks(tracks, 8)
+    assert sample == sample_tracks(tracks, 8)
+    assert sample == sorted(sample, key=tracks.index)
+    assert [track["name"] for track in sample if track["artist"] == "A"] == [
+        f"A song {n}" for n in (0, 10, 20, 30)
+    ]
+
+
+def test_artist_names_are_grouped_after_normalizing():
+    # Counted apart, neither spelling would earn one of the two slots
+    tracks = _tracks({"Beyoncé": 3, "beyonce": 3, "Other": 14})
+    sample = sample_tracks(tracks, 2)
+    assert sum(track["artist"] != "Other" for track in sample) == 1
+
+
+def test_dedupe_keeps_first_occurrence():
+    tracks = _tracks({"A": 2})
+    duplicate = dict(tracks[0], name=tracks[0]["name"].upper())
+    assert dedupe_tracks(tracks + [duplicate]) == tracks
+
+
+def test_summary_describes_the_full_playlist():
+    tracks = _tracks({"A": 6, "B": 4})
+    payload = summarize_playlist(tracks + tracks[:2], budget=5)
+    assert len(payload["tracks"]) == 5
+    summary = payload["summary"]
+    assert summary["total_tracks"] == 12
+    assert summary["unique_tracks"] == 10
+    assert summary["sampled_tracks"] == 5
+    assert summary["top_artists"][0] == {"artist": "A", "tracks": 6}
+    assert summary["eras"] == {"1990s": 10}
+
+
+def test_playlists_within_budget_get_no_summary():
+    tracks = _tracks({"A": 3})
+    assert summarize_playlist(tracks, budget=5) == {"tracks": tracks}
@@ -0,0 +1,151 @@
+"""Tests for the rate limiter backends and the rate_limit_required decorator."""
+
+import threading
+
+import pytest
+from flask import Flask, g, jsonify
+
+from utils import rate_limit
+from utils.rate_limit import MemoryRateLimiter, SQLiteRateLimiter, rate_limit_required
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    if request.param == "memory":
+        return MemoryRateLimiter()
+    return SQLiteRateLimiter(str(tmp_path / "rate_limit.sqlite3"))
+
+
+def test_reserves_up_to_the_limit(limiter, clock):
+    assert limiter.reserve("a", 2, 60)[0]
+    assert limiter.reserve("a", 2, 60)[0]
+    reservation, retry_after = limiter.reserve("a", 2, 60)
+    assert reservation is None
+    assert retry_after == 61
+    assert limiter.reserve("b", 2, 60)[0]  # other keys are unaffected
+
+
+def test_window_slides(limiter, clock):
+    limiter.reserve("a", 2, 60)
+    clock.now += 30
+    limiter.reserve("a", 2, 60)
+
+    assert limiter.peek("a", 2, 60) == (True, 31)
+    clock.now += 30  # the first reservation expires
+    assert limiter.peek("a", 2, 60) == (False, 0)
+    assert limiter.reserve("a", 2, 60)[0]
+
+
+def test_release_gives_the_slot_back(limiter, clock):
+    reservation, _ = limiter.reserve("a", 1, 60)
+    assert limiter.reserve("a", 1, 60)[0] is None
+    limiter.release("a", reservation)
+    assert limiter.reserve("a", 1, 60)[0]
+
+
+def test_concurrent_reservations_respect_the_limit(limiter):
+    granted = []
+    barrier = threading.Barrier(16)
+
+    def reserve():
+        barrier.wait()
+        reservation, _ = limiter.reserve("a", 5, 60)
+        if reservation:
+            granted.append(reservation)
+
+    threads = [threading.Thread(target=reserve) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(granted) == 5
+
+
+def test_memory_limiter_evicts_idle_keys(clock):
+    limiter = MemoryRateLimiter()
+    for n in range(100):
+        limiter.reserve(f"key{n}", 3, 60)
+    assert len(limiter) == 100
+
+    clock.now += 60
+    limiter.reserve("fresh", 3, 60)
+    assert len(limiter) == 1
+
+
+def test_sqlite_limits_are_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "rate_limit.sqlite3")
+    first, second = SQLiteRateLimiter(path), SQLiteRateLimiter(path)
+    first.reserve("a", 2, 60)
+    second.reserve("a", 2, 60)
+    assert first.reserve("a", 2, 60)[0] is None
+
+
+def test_sqlite_sweeps_expired_rows_periodically(tmp_path, clock):
+    limiter = SQLiteRateLimiter(str(tmp_path / "rate_limit.sqlite3"), sweep_interval=60)
+    limiter.reserve("a", 5, 10)  # the first reservation sweeps
+    clock.now += 30
+    limiter.reserve("b", 5, 10)  # "a" expired, but isn't swept yet
+    assert limiter.peek("a", 1, 10) == (False, 0)
+
+    clock.now += 30
+    limiter.reserve("c", 5, 10)
+    rows = limiter._connect().execute("SELECT key FROM rate_limit_hits").fetchall()
+    assert rows == [("c",)]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY="test", RATE_LIMIT_MAX=2, RATE_LIMIT_WINDOW=60)
+
+    @app.route("/limited", methods=["POST"])
+    @rate_limit_required
+    def limited():
+        return jsonify({"ok": True})
+
+    @app.route("/refunded", methods=["POST"])
+    @rate_limit_required
+    def refunded():
+        g.rate_limit_refund = True
+        return jsonify({"ok": True})
+
+    @app.route("/failing", methods=["POST"])
+    @rate_limit_required
+    def failing():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def test_decorator_returns_429_over_the_limit(app):
+    client = app.test_client()
+    assert client.post("/limited").status_code == 200
+    assert client.post("/limited").status_code == 200
+    response = client.post("/limited")
+    assert response.status_code == 429
+    assert response.get_json()["retry_after"] > 0
+
+
+def test_decorator_refunds_and_releases(app):
+    client = app.test_client()
+    for _ in range(3):
+        assert client.post("/refunded").status_code == 200
+    for _ in range(3):
+        assert client.post("/failing").status_code == 500
+    assert client.post("/limited").status_code == 200
+    assert client.post("/limited").status_code == 200
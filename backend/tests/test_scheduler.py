@@ -0,0 +1,193 @@
+"""Tests for the outbound request scheduler."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.scheduler import (
+    BACKGROUND,
+    INTERACTIVE,
+    RequestScheduler,
+    SchedulerTimeout,
+    inherit_priority,
+    parse_retry_after,
+    request_priority,
+)
+
+
+def _start(target, *args):
+    """Run target on a thread, recording when it returned and what it raised."""
+    outcome = {}
+
+    def run():
+        try:
+            target(*args)
+        except Exception as e:
+            outcome["error"] = e
+        outcome["at"] = time.monotonic()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def _wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None, default=2.0) == 2.0
+    assert parse_retry_after("soon", default=2.0) == 2.0
+    assert parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT") == 0.0
+
+
+def test_limit_grows_about_one_slot_per_round():
+    scheduler = RequestScheduler(initial_limit=4, max_limit=32)
+    for _ in range(5):
+        scheduler.acquire()
+        scheduler.release(200)
+    assert scheduler.get_stats()["limit"] == 5
+
+
+def test_limit_is_capped():
+    scheduler = RequestScheduler(initial_limit=2, max_limit=3)
+    for _ in range(50):
+        scheduler.acquire()
+        scheduler.release(200)
+    assert scheduler.get_stats()["limit"] == 3
+
+
+def test_throttling_halves_limit_once_per_episode():
+    scheduler = RequestScheduler(initial_limit=8, min_limit=1)
+    for _ in range(3):
+        scheduler.acquire()
+    for _ in range(3):
+        scheduler.release(429, retry_after=0.05)
+
+    stats = scheduler.get_stats()
+    assert stats["limit"] == 4
+    assert stats["throttled"] == 3
+
+
+def test_server_errors_leave_limit_alone():
+    scheduler = RequestScheduler(initial_limit=4)
+    scheduler.acquire()
+    scheduler.release(503)
+    assert scheduler.get_stats()["limit"] == 4
+
+
+def test_retry_after_pauses_new_requests():
+    scheduler = RequestScheduler(initial_limit=4)
+    scheduler.acquire()
+    scheduler.release(429, retry_after=0.2)
+
+    waited = scheduler.acquire()
+    assert waited >= 0.15
+
+
+def test_times_out_when_no_slot_frees():
+    scheduler = RequestScheduler(initial_limit=1, queue_timeout=0.1)
+    scheduler.acquire()
+    with pytest.raises(SchedulerTimeout):
+        scheduler.acquire()
+    assert scheduler.get_stats()["timeouts"] == 1
+
+
+def test_interactive_requests_go_first():
+    scheduler = RequestScheduler(initial_limit=1, max_limit=1, queue_timeout=5)
+    scheduler.acquire()
+
+    background, background_done = _start(scheduler.acquire, BACKGROUND)
+    _wait_for(lambda: scheduler.get_stats()["queued"]["background"] == 1)
+    interactive, interactive_done = _start(scheduler.acquire, INTERACTIVE)
+    _wait_for(lambda: scheduler.get_stats()["queued"]["interactive"] == 1)
+
+    scheduler.release(200)
+    interactive.join(2)
+    assert "at" in interactive_done and "at" not in background_done
+
+    scheduler.release(200)
+    background.join(2)
+    assert "at" in background_done
+
+
+def test_background_goes_once_interactive_waiter_is_admitted():
+    # The release raises the limit to 2, so both waiters fit. The background
+    # waiter wakes first, sees the interactive one still queued and parks;
+    # it must be woken again when the interactive one is admitted.
+    scheduler = RequestScheduler(initial_limit=1, max_limit=4, queue_timeout=5)
+    scheduler.acquire()
+
+    background, background_done = _start(scheduler.acquire, BACKGROUND)
+    _wait_for(lambda: scheduler.get_stats()["queued"]["background"] == 1)
+    interactive, interactive_done = _start(scheduler.acquire, INTERACTIVE)
+    _wait_for(lambda: scheduler.get_stats()["queued"]["interactive"] == 1)
+
+    released = time.monotonic()
+    scheduler.release(200)
+    interactive.join(2)
+    background.join(2)
+    assert background_done["at"] - released < 1
+
+
+def test_async_waiters_share_slots():
+    scheduler = RequestScheduler(initial_limit=1, max_limit=1, queue_timeout=5)
+
+    async def main():
+        await scheduler.acquire_async()
+        waiter = asyncio.ensure_future(scheduler.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        threading.Thread(target=scheduler.release, args=(200,)).start()
+        await asyncio.wait_for(waiter, 2)
+
+    asyncio.run(main())
+    assert scheduler.get_stats()["in_flight"] == 1
+
+
+def test_inherit_priority_carries_to_other_threads():
+    seen = []
+
+    def record():
+        from utils.scheduler import _priority
+        seen.append(_priority.get())
+
+    with request_priority(BACKGROUND):
+        wrapped = inherit_priority(record)
+    thread = threading.Thread(target=wrapped)
+    thread.start()
+    thread.join()
+    assert seen == [BACKGROUND]
+
+
+def test_adapter_waits_out_retry_after(monkeypatch):
+    from requests import Response
+    from requests.adapters import HTTPAdapter
+
+    from utils.scheduler import ScheduledAdapter
+
+    statuses = [429, 200]
+
+    def fake_send(self, request, **kwargs):
+        response = Response()
+        response.status_code = statuses.pop(0)
+        response.headers["Retry-After"] = "0.1"
+        response._content = b""
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", fake_send)
+    scheduler = RequestScheduler(initial_limit=4)
+    adapter = ScheduledAdapter(scheduler)
+
+    started = time.monotonic()
+    response = adapter.send(object())
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.08
+    assert scheduler.get_stats()["throttled"] == 1
+    assert scheduler.get_stats()["in_flight"] == 0
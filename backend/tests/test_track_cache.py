@@ -0,0 +1,79 @@
+"""Tests for the persistent track resolution cache."""
+
+import pytest
+
+from services import track_cache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def clock(tmp_path, monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(track_cache, "TRACK_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(track_cache, "_db", None)
+    monkeypatch.setattr(track_cache, "_next_sweep", 0)
+    monkeypatch.setattr(track_cache, "time", fake)
+    yield fake
+    if track_cache._db is not None:
+        track_cache._db.close()
+
+
+def _rows():
+    with track_cache._db_lock:
+        return track_cache._get_db().execute("SELECT COUNT(*) FROM track_cache").fetchone()[0]
+
+
+def test_make_key_normalizes():
+    assert track_cache.make_key("Beyoncé", "JAY-Z") == track_cache.make_key("beyonce", "jay z")
+
+
+def test_stores_tracks_and_misses():
+    track_cache.put_many({"found": {"id": "1"}, "missing": None})
+    assert track_cache.get_many(["found", "missing", "unknown"]) == {
+        "found": {"id": "1"},
+        "missing": None,
+    }
+
+
+def test_entries_expire_after_their_ttl(clock):
+    track_cache.put_many({"found": {"id": "1"}, "missing": None})
+
+    clock.now += track_cache.TRACK_CACHE_NEGATIVE_TTL
+    assert track_cache.get_many(["found", "missing"]) == {"found": {"id": "1"}}
+
+    clock.now += track_cache.TRACK_CACHE_TTL
+    assert track_cache.get_many(["found"]) == {}
+
+
+def test_evicts_least_recently_used(clock, monkeypatch):
+    monkeypatch.setattr(track_cache, "TRACK_CACHE_MAX_ENTRIES", 3)
+    for n in range(3):
+        track_cache.put_many({f"k{n}": {"id": str(n)}})
+        clock.now += 1
+    track_cache.get_many(["k0"])  # k0 is now the most recently used
+
+    clock.now += track_cache.TRACK_CACHE_SWEEP_INTERVAL
+    track_cache.put_many({"k3": {"id": "3"}})
+
+    assert set(track_cache.get_many(["k0", "k1", "k2", "k3"])) == {"k0", "k2", "k3"}
+
+
+def test_sweeps_at_most_once_per_interval(clock, monkeypatch):
+    monkeypatch.setattr(track_cache, "TRACK_CACHE_MAX_ENTRIES", 2)
+    track_cache.put_many({"k0": {"id": "0"}})  # first write sweeps
+
+    clock.now += 1
+    track_cache.put_many({f"k{n}": {"id": str(n)} for n in range(1, 5)})
+    assert _rows() == 5  # over the limit until the next sweep
+
+    clock.now += track_cache.TRACK_CACHE_SWEEP_INTERVAL
+    track_cache.put_many({"k5": {"id": "5"}})
+    assert _rows() == 2
+    assert track_cache.get_stats()["evictions"] >= 4
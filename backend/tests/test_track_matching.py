@@ -0,0 +1,137 @@
+"""Tests for scoring Spotify search results against recommendations."""
+
+from services import spotify
+from utils.text import similarity, similarity_many
+
+
+def _track(name, *artists, track_id=None):
+    return {
+        "id": track_id or name.lower().replace(" ", "-"),
+        "name": name,
+        "artists": [{"name": artist} for artist in artists],
+        "album": {"name": "Album", "images": []},
+    }
+
+
+class FakeSpotify:
+    """Answers searches from a query -> results table, recording the queries."""
+
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def search(self, q, type, limit):
+        self.queries.append(q)
+        return {"tracks": {"items": self.results.get(q, [])[:limit]}}
+
+
+def _resolve(monkeypatch, recommendation, results):
+    sp = FakeSpotify(results)
+    monkeypatch.setattr(spotify, "get_system_spotify", lambda: sp)
+    pending = {"key": [0]}
+    (key, track, definitive), = spotify._search_pending(pending, [recommendation])
+    return sp, track, definitive
+
+
+def test_similarity_many_matches_similarity():
+    choices = ["hello world", "hello", "", "goodbye world", "hello world"]
+    assert similarity_many("hello world", choices) == [
+        similarity("hello world", choice) for choice in choices
+    ]
+
+
+def test_similarity_many_cutoff_zeroes_distant_choices():
+    scores = similarity_many("bohemian rhapsody", ["bohemian rhapsody live", "xyz"], cutoff=0.7)
+    assert scores[0] > 0.7
+    assert scores[1] == 0.0
+
+
+def test_best_match_featured_artist_credit():
+    candidates = [
+        _track("Umbrella", "Rihanna", "JAY-Z"),
+        _track("This Is What You Came For", "Calvin Harris", "Rihanna"),
+    ]
+    score, track = spotify._best_match(
+        "This Is What You Came For (feat. Rihanna)", "Calvin Harris feat. Rihanna", candidates
+    )
+    assert track["name"] == "This Is What You Came For"
+    assert score >= spotify.SEARCH_MATCH_THRESHOLD
+
+
+def test_best_match_credit_listed_second():
+    candidates = [_track("Stay (with Justin Bieber)", "The Kid LAROI", "Justin Bieber")]
+    match = spotify._best_match("Stay", "Justin Bieber", candidates)
+    assert match is not None
+
+
+def test_best_match_parenthetical_title():
+    candidates = [_track("Bohemian Rhapsody - Remastered 2011", "Queen")]
+    match = spotify._best_match("Bohemian Rhapsody (Live Aid)", "Queen", candidates)
+    assert match is not None
+    assert match[1]["name"] == "Bohemian Rhapsody - Remastered 2011"
+
+
+def test_best_match_prefers_requested_version():
+    remaster = _track("Heroes - 2017 Remaster", "David Bowie", track_id="remaster")
+    original = _track("Heroes", "David Bowie", track_id="original")
+    score, track = spotify._best_match("Heroes", "David Bowie", [remaster, original])
+    assert track["id"] == "original"
+
+
+def test_best_match_below_threshold():
+    candidates = [_track("Completely Different Song", "Someone Else")]
+    assert spotify._best_match("Yesterday", "The Beatles", candidates) is None
+
+
+def test_best_match_right_title_wrong_artist():
+    candidates = [_track("Hurt", "Nine Inch Nails")]
+    assert spotify._best_match("Hurt", "Johnny Cash", candidates) is None
+
+
+def test_search_uses_strict_query_when_it_matches(monkeypatch):
+    recommendation = {"name": "Hurt (Live)", "artist": "Johnny Cash"}
+    sp, track, definitive = _resolve(monkeypatch, recommendation, {
+        "track:Hurt (Live) artist:Johnny Cash": [_track("Hurt", "Johnny Cash")],
+    })
+    assert track["name"] == "Hurt"
+    assert definitive
+    assert sp.queries == ["track:Hurt (Live) artist:Johnny Cash"]
+
+
+def test_search_escalates_to_fallback_tier(monkeypatch):
+    recommendation = {"name": "Hurt (Live)", "artist": "Johnny Cash feat. June Carter"}
+    sp, track, definitive = _resolve(monkeypatch, recommendation, {
+        "track:Hurt artist:Johnny Cash": [_track("Hurt", "Johnny Cash")],
+    })
+    assert track["name"] == "Hurt"
+    assert sp.queries[0] == "track:Hurt (Live) artist:Johnny Cash feat. June Carter"
+    assert set(sp.queries[1:]) == {"track:Hurt artist:Johnny Cash", "Hurt Johnny Cash"}
+
+
+def test_search_rejects_unscored_top_hit(monkeypatch):
+    recommendation = {"name": "Yesterday (Remastered)", "artist": "The Beatles"}
+    wrong = [_track("Yesterday Once More", "Carpenters")]
+    sp, track, definitive = _resolve(monkeypatch, recommendation, {
+        query: wrong for query in (
+            "track:Yesterday (Remastered) artist:The Beatles",
+            "track:Yesterday artist:The Beatles",
+            "Yesterday The Beatles",
+        )
+    })
+    assert track is None
+    assert definitive  # every search ran, so the miss can be cached
+    assert len(sp.queries) == 3
+
+
+def test_search_failure_is_not_definitive(monkeypatch):
+    class FailingSpotify(FakeSpotify):
+        def search(self, q, type, limit):
+            raise RuntimeError("boom")
+
+    sp = FailingSpotify({})
+    monkeypatch.setattr(spotify, "get_system_spotify", lambda: sp)
+    (key, track, definitive), = spotify._search_pending(
+        {"key": [0]}, [{"name": "Song", "artist": "Artist"}]
+    )
+    assert track is None
+    assert not definitive
@@ -1,3 +1,18 @@
 """Utility modules for the backend."""
 
-from .rate_limit import check_rate_limit, record_generation, rate_limit_required
+from .rate_limit import (
+    check_rate_limit,
+    record_generation,
+    rate_limit_required,
+    RateLimiterBackend,
+    MemoryRateLimiter,
+    SQLiteRateLimiter,
+)
+from .pacing import TokenBucket
+from .scheduler import RequestScheduler, ScheduledAdapter, request_priority
+from .cache import TTLCache
+from .http_cache import cacheable_json
+from .metrics import instrument_app, track_outbound
+from .capture import capture_traffic
+from .handoff import can_defer, defer, defer_stream
+from .sessions import init_sessions, MemorySessionStore, SQLiteSessionStore
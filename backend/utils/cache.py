@@ -0,0 +1,84 @@
+"""
+In-memory caching utilities.
+
+TTLCache is a small thread-safe cache with per-entry expiry and LRU
+eviction, used to avoid repeating Spotify and Logic calls whose results
+don't change from one request to the next.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a time-to-live.
+    """
+
+    def __init__(self, max_size, ttl):
+        """
+        Args:
+            max_size: Maximum number of entries before the least recently
+                      used ones are evicted
+            ttl: Default time-to-live in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """
+        Get a live entry.
+
+        Args:
+            key: Cache key
+            default: Value returned if the key is missing or expired
+
+        Returns:
+            The cached value, or default
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store an entry, evicting the least recently used ones if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time-to-live in seconds (defaults to the cache's ttl)
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove an entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
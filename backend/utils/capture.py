@@ -0,0 +1,246 @@
+"""
+Traffic capture for replay and capacity testing.
+
+When TRAFFIC_CAPTURE_PATH is set, every API request is appended to that
+file as a JSON line, along with the timing of every outbound Spotify and
+Logic call. benchmarks/replay.py reissues the captured request sequences
+against a target instance and serves the captured upstream timings from a
+local stand-in.
+
+Captures are sanitized as they are written:
+- Clients are identified only by a keyed hash of their address and
+  User-Agent, so one visitor's sequence can be replayed in order.
+- Usernames, playlist IDs, search queries, descriptions and idempotency
+  keys are replaced with keyed hashes. The same value always maps to the
+  same pseudonym within a capture, so repeat visits stay repeats.
+- Job IDs in paths become "{job}"; the replayer substitutes the ID its own
+  generate request returned.
+- No other headers, cookies or response bodies are kept, and upstream
+  calls are recorded as timings and outcomes only.
+
+Set TRAFFIC_CAPTURE_KEY to keep pseudonyms stable across processes and
+restarts (otherwise each process uses a random key). TRAFFIC_CAPTURE_SAMPLE
+keeps that fraction of clients, chosen per client so sequences stay whole.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from flask import g, request
+
+from .handoff import deferred_handoff
+from .metrics import add_outbound_observer
+
+logger = logging.getLogger(__name__)
+
+# Request headers worth replaying (values of the second set are pseudonymized)
+_KEPT_HEADERS = ("Prefer",)
+_HASHED_HEADERS = ("Idempotency-Key",)
+
+# Query/body values kept as-is when numeric (page sizes, not identifiers);
+# every other string is pseudonymized, digits included
+_KEPT_NUMERIC_PARAMS = ("limit",)
+
+_PLAYLIST_URL = re.compile(r"playlist[/:]([A-Za-z0-9]+)")
+
+# Pseudonym prefixes for fields that hold the same kind of ID, so e.g. a
+# validated playlist URL and the playlist_id generated from match up
+_PREFIXES = {
+    "username": "user",
+    "playlist_id": "playlist",
+    "playlist_url": "playlist",
+    "Idempotency-Key": "key",
+}
+
+
+class TrafficRecorder:
+    """Append sanitized request and upstream records to a JSON lines file."""
+
+    def __init__(self, path, key=None, sample=1.0):
+        """
+        Args:
+            path: File to append to
+            key: Secret for pseudonyms (random if not given)
+            sample: Fraction of clients to capture (0-1)
+        """
+        self.path = path
+        self.sample = sample
+        self._key = key.encode() if key else os.urandom(32)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1)
+
+    def pseudonym(self, value, name="x"):
+        """
+        Replace a value with a stable keyed hash.
+
+        Pseudonyms are alphanumeric, so they still pass the app's username
+        and playlist ID validation when replayed.
+
+        Args:
+            value: Value to hide
+            name: Field name; its label is kept in front of the hash
+
+        Returns:
+            str: e.g. "user3f9c0a6b21d4e587"
+        """
+        prefix = _PREFIXES.get(name) or re.sub(r"[^a-z]", "", name.lower())
+        digest = hmac.new(self._key, str(value).encode(), hashlib.sha256).hexdigest()
+        return f"{prefix}{digest[:16]}"
+
+    def client_id(self):
+        """Pseudonymous ID for the client making the current request."""
+        address = request.access_route[0] if request.access_route else request.remote_addr
+        return self.pseudonym(f"{address}\x1f{request.user_agent.string}", "client")
+
+    def sampled(self, client):
+        """Whether a client falls in the captured sample."""
+        if self.sample >= 1:
+            return True
+        bucket = int(hashlib.sha256(client.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return bucket < self.sample
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    # Sanitizing
+
+    def sanitize_path(self):
+        """Rebuild the request path from its route with pseudonymized arguments."""
+        rule = request.url_rule.rule
+        for name, value in (request.view_args or {}).items():
+            replacement = "{job}" if name == "job_id" else self.pseudonym(value, name)
+            rule = re.sub(rf"<(?:[^:<>]+:)?{re.escape(name)}>", replacement, rule)
+        return rule
+
+    def sanitize_value(self, name, value):
+        """Pseudonymize a query or body value, keeping flags and JSON integers."""
+        if isinstance(value, int) or value is None:
+            return value
+        if not isinstance(value, str):
+            return None
+        # A numeric string may be a username or search query
+        if name in _KEPT_NUMERIC_PARAMS and value.isdigit():
+            return value
+        if name == "playlist_url":
+            match = _PLAYLIST_URL.search(value)
+            playlist_id = self.pseudonym(match.group(1) if match else value, name)
+            return f"https://open.spotify.com/playlist/{playlist_id}"
+        return self.pseudonym(value, name)
+
+    def request_record(self, response, started):
+        record = {
+            "type": "request",
+            "t": round(started, 4),
+            "client": g.capture_client,
+            "method": request.method,
+            "path": self.sanitize_path(),
+            "status": response.status_code,
+            "duration": round(time.time() - started, 4),
+        }
+        if request.args:
+            record["query"] = {
+                name: self.sanitize_value(name, value) for name, value in request.args.items()
+            }
+        body = request.get_json(silent=True) if request.is_json else None
+        if isinstance(body, dict):
+            record["json"] = {
+                name: self.sanitize_value(name, value) for name, value in body.items()
+            }
+        headers = {name: request.headers[name] for name in _KEPT_HEADERS if name in request.headers}
+        headers.update(
+            (name, self.pseudonym(request.headers[name], name))
+            for name in _HASHED_HEADERS if name in request.headers
+        )
+        if headers:
+            record["headers"] = headers
+        if response.is_streamed:
+            record["streamed"] = True
+        return record
+
+    def upstream_record(self, service, stage, duration, error):
+        self.write({
+            "type": "upstream",
+            "t": round(time.time(), 4),
+            "service": service,
+            "stage": stage,
+            "duration": round(duration, 4),
+            "error": error,
+        })
+
+
+def capture_traffic(app):
+    """
+    Record API traffic if TRAFFIC_CAPTURE_PATH is configured.
+
+    Admin routes, the frontend and unmatched paths are not captured.
+
+    Args:
+        app: Flask application
+
+    Returns:
+        TrafficRecorder: The recorder, or None if capture is off
+    """
+    path = app.config.get("TRAFFIC_CAPTURE_PATH")
+    if not path:
+        return None
+
+    recorder = TrafficRecorder(
+        path,
+        key=app.config.get("TRAFFIC_CAPTURE_KEY"),
+        sample=float(app.config.get("TRAFFIC_CAPTURE_SAMPLE", 1.0)),
+    )
+    add_outbound_observer(recorder.upstream_record)
+    logger.warning("Capturing API traffic to %s", path)
+
+    def _captured():
+        return (
+            request.url_rule is not None
+            and request.path.startswith("/api/")
+            and request.blueprint != "admin"
+        )
+
+    @app.before_request
+    def _start_capture():
+        if not _captured():
+            return
+        client = recorder.client_id()
+        if recorder.sampled(client):
+            g.capture_client = client
+            g.capture_started = time.time()
+
+    @app.after_request
+    def _record_capture(response):
+        started = g.get("capture_started")
+        if started is None:
+            return response
+        handoff = deferred_handoff()
+        try:
+            record = recorder.request_record(response, started)
+            if handoff is None:
+                recorder.write(record)
+        except Exception as e:
+            logger.warning("Traffic capture failed: %s", e)
+            return response
+        if handoff is None:
+            return response
+
+        # Finished by the ASGI server; record the final status and duration
+        def _record_deferred(status):
+            record["status"] = status
+            record["duration"] = round(time.time() - started, 4)
+            if handoff.stream is not None:
+                record["streamed"] = True
+            recorder.write(record)
+
+        handoff.add_done_callback(_record_deferred)
+        return response
+
+    return recorder
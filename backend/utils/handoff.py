@@ -0,0 +1,141 @@
+"""
+Handing slow waits from Flask views to the ASGI server.
+
+Under asgi.py, Flask views still run on worker threads, but a view that
+would block on Spotify, Logic or a generation job can defer that wait
+instead: it does its validation (and rate limiting, sessions, CORS and
+so on run as usual), then returns what to await. The ASGI server awaits
+it on the event loop, where hundreds of waits cost no threads, and then
+sends the final response:
+
+- defer(awaitable, render): await, then call render(result, error) in the
+  original request's context to build the response.
+- defer_stream(chunks): send the view's headers, then the chunks of an
+  async iterator as the body (used for event streams).
+
+Headers set on the view's own response (Set-Cookie, Vary, CORS) are kept.
+Under any other server (waitress, the dev server) can_defer() is False
+and views take their blocking path.
+"""
+
+import logging
+from contextvars import ContextVar
+
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+# The Handoff of the request being served; set by asgi.py and carried into
+# the worker thread running the view
+current_handoff = ContextVar("current_handoff", default=None)
+
+
+class Handoff:
+    """The part of a request the ASGI server finishes asynchronously."""
+
+    def __init__(self):
+        self.awaitable = None
+        self.render = None
+        self.environ = None  # the request's environ, for render
+        self.stream = None
+        self._done_callbacks = []
+
+    @property
+    def deferred(self):
+        """Whether the view deferred its response."""
+        return self.awaitable is not None or self.stream is not None
+
+    def add_done_callback(self, callback):
+        """
+        Call ``callback(status)`` once the final response has been sent.
+
+        Args:
+            callback: Callable taking the final HTTP status
+        """
+        self._done_callbacks.append(callback)
+
+    def finish(self, status):
+        """Run the done callbacks (called by the ASGI server)."""
+        for callback in self._done_callbacks:
+            try:
+                callback(status)
+            except Exception:
+                logger.exception("Handoff callback failed")
+
+
+def get_handoff():
+    """
+    Get the current request's Handoff.
+
+    Returns:
+        Handoff: The handoff, or None if not served by asgi.py
+    """
+    return current_handoff.get()
+
+
+def can_defer():
+    """Check whether the current request is served by asgi.py."""
+    return get_handoff() is not None
+
+
+def deferred_handoff():
+    """
+    Get the current request's Handoff if its view deferred the response.
+
+    after_request hooks use this to report the final status instead of
+    the placeholder's.
+
+    Returns:
+        Handoff: The handoff, or None
+    """
+    handoff = get_handoff()
+    return handoff if handoff is not None and handoff.deferred else None
+
+
+def defer(awaitable, render):
+    """
+    Finish the request by awaiting ``awaitable`` on the event loop.
+
+    Args:
+        awaitable: Coroutine to await (created here, run by the server)
+        render: Callable(result, error) returning a view response; called
+                with the awaited result, or with result None and the
+                exception if awaiting raised
+
+    Returns:
+        Response: Placeholder to return from the view
+
+    Raises:
+        RuntimeError: If the request isn't served by asgi.py
+    """
+    handoff = _require_handoff()
+    handoff.awaitable = awaitable
+    handoff.render = render
+    handoff.environ = request.environ
+    return Response()
+
+
+def defer_stream(chunks, **response_kwargs):
+    """
+    Finish the request by sending the chunks of an async iterator.
+
+    Args:
+        chunks: Async iterator of str or bytes
+        **response_kwargs: Status, headers and mimetype for the response
+
+    Returns:
+        Response: Placeholder carrying the headers; return it from the view
+
+    Raises:
+        RuntimeError: If the request isn't served by asgi.py
+    """
+    handoff = _require_handoff()
+    handoff.stream = chunks
+    return Response(**response_kwargs)
+
+
+def _require_handoff():
+    handoff = get_handoff()
+    if handoff is None:
+        raise RuntimeError("Deferred responses need the ASGI server (asgi.py)")
+    return handoff
@@ -0,0 +1,26 @@
+"""
+HTTP caching helpers for JSON API responses.
+
+Adds Cache-Control and strong ETag headers so browsers and any CDN in
+front of the app can reuse responses and revalidate them with a 304.
+"""
+
+from flask import jsonify, request
+
+
+def cacheable_json(payload, max_age):
+    """
+    Build a JSON response that clients may cache and revalidate.
+
+    Args:
+        payload: JSON-serializable response body
+        max_age: Seconds clients may reuse the response without revalidating
+
+    Returns:
+        Response: 200 with ETag/Cache-Control headers, or 304 if the
+                  request's If-None-Match matches the ETag
+    """
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    response.add_etag()
+    return response.make_conditional(request)
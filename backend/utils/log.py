@@ -0,0 +1,140 @@
+"""
+Logging setup.
+
+Log calls on request and worker threads only put the record on a queue;
+a QueueListener thread formats it and writes it to stdout, so slow stdout
+(or a blocked log collector) never stalls a request.
+
+Records are written as JSON lines in production (LOG_FORMAT=json) or as
+readable text in development. Fields passed with ``extra=`` are included
+in the output, so log lines can be filtered by e.g. playlist or job ID.
+
+High-frequency events can be sampled by passing ``extra={"sample": N}``:
+only one in every N records with the same message template is kept.
+Records at ERROR or above are always kept.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "sample",
+}
+
+_listener_lock = threading.Lock()
+_listener = {
+    "listener": None,
+    "pid": None,
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                  + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS
+        )
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable one-line format with any extra fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        extras = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS
+        )
+        return f"{line} {extras}" if extras else line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one in every N records that ask to be sampled.
+
+    A record opts in with ``extra={"sample": N}``. Counting is done per
+    message template, so different events are sampled independently.
+    Records at ERROR or above are never dropped.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def filter(self, record):
+        rate = getattr(record, "sample", None)
+        if not rate or rate <= 1 or record.levelno >= logging.ERROR:
+            return True
+
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % rate:
+            return False
+        record.sampled = f"1/{rate}"
+        return True
+
+
+def configure_logging(level=None, fmt=None):
+    """
+    Route all logging through a background writer thread.
+
+    Safe to call more than once; each process (e.g. a forked worker) gets
+    its own listener.
+
+    Args:
+        level: Log level name (defaults to LOG_LEVEL, then INFO)
+        fmt: "json" or "text" (defaults to LOG_FORMAT, then "text")
+    """
+    level = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT") or "text").lower()
+
+    with _listener_lock:
+        root = logging.getLogger()
+        root.setLevel(level)
+
+        if _listener["listener"] is not None and _listener["pid"] == os.getpid():
+            return
+
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter())
+
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+        listener = logging.handlers.QueueListener(
+            log_queue, stream, respect_handler_level=True
+        )
+        listener.start()
+        _listener.update(listener=listener, pid=os.getpid())
+        atexit.register(listener.stop)
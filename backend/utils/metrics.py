@@ -0,0 +1,323 @@
+"""
+Prometheus-style metrics.
+
+A small in-process registry of counters and histograms, rendered in the
+Prometheus text exposition format by the admin metrics endpoint. Latency
+histograms let Prometheus compute p50/p95/p99 per stage with
+histogram_quantile().
+
+Instrumented:
+- outbound_request_duration_seconds{service,stage}: every outbound call
+  (Spotify search, playlist fetch/create/add, token refresh, Logic
+  execution, ...)
+- outbound_request_errors_total{service,stage}: outbound calls that raised
+- http_request_duration_seconds{endpoint,method,status}: every route
+- generation_duration_seconds{kind,status}: whole generation jobs
+"""
+
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+from .handoff import deferred_handoff
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds, from cache-speed lookups to Logic executions
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120,
+)
+
+_registry_lock = threading.Lock()
+_registry = []
+
+# Callables notified of every outbound call (see add_outbound_observer)
+_outbound_observers = []
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """Base class for labelled metrics kept in the registry."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # label values tuple -> metric state
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        return list(zip(self.labelnames, key)) + list(extra)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        """
+        Increase the counter.
+
+        Args:
+            amount: Amount to add
+            **labels: Value for each label name
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self, items):
+        return [
+            f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        """
+        Record an observation.
+
+        Args:
+            value: Observed value (seconds for latency histograms)
+            **labels: Value for each label name
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the enclosed block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                labels = self._labels(key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+            labels = _format_labels(self._labels(key))
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+OUTBOUND_LATENCY = Histogram(
+    "outbound_request_duration_seconds",
+    "Duration of outbound API calls by service and stage.",
+    ("service", "stage"),
+)
+OUTBOUND_ERRORS = Counter(
+    "outbound_request_errors_total",
+    "Outbound API calls that raised an error.",
+    ("service", "stage"),
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests handled by the app.",
+    ("endpoint", "method", "status"),
+)
+GENERATION_LATENCY = Histogram(
+    "generation_duration_seconds",
+    "Duration of playlist generation jobs, from start to finish.",
+    ("kind", "status"),
+)
+
+
+@contextmanager
+def track_outbound(service, stage):
+    """
+    Time an outbound call and count it as an error if it raises.
+
+    Args:
+        service: Upstream name (e.g. "spotify", "logic")
+        stage: What the call does (e.g. "search", "playlist_create")
+    """
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        OUTBOUND_ERRORS.inc(service=service, stage=stage)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        OUTBOUND_LATENCY.observe(duration, service=service, stage=stage)
+        for observer in _outbound_observers:
+            # A failing observer (e.g. a full capture disk) mustn't replace
+            # the call's own result or error
+            try:
+                observer(service, stage, duration, error)
+            except Exception:
+                logger.exception("Outbound observer failed")
+
+
+def add_outbound_observer(observer):
+    """
+    Call ``observer(service, stage, duration, error)`` after every outbound
+    call timed with track_outbound.
+
+    Args:
+        observer: Callable; it runs on the calling thread, so keep it quick
+    """
+    _outbound_observers.append(observer)
+
+
+def instrument_app(app):
+    """
+    Record the duration of every request handled by a Flask app.
+
+    Args:
+        app: Flask application
+    """
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get("metrics_started")
+        if started is None:
+            return response
+
+        labels = {"endpoint": request.endpoint or "unmatched", "method": request.method}
+        handoff = deferred_handoff()
+        if handoff is not None:
+            # Finished by the ASGI server; time it until the final response
+            handoff.add_done_callback(
+                lambda status: HTTP_LATENCY.observe(
+                    time.perf_counter() - started, status=status, **labels
+                )
+            )
+        else:
+            HTTP_LATENCY.observe(
+                time.perf_counter() - started, status=response.status_code, **labels
+            )
+        return response
+
+
+def render_gauges(prefix, stats, documentation=""):
+    """
+    Render numeric values of a stats dict as gauges.
+
+    Nested dicts become labelled series, e.g. {"queued": {"background": 2}}
+    renders as ``<prefix>_queued{key="background"} 2``. Non-numeric values
+    are skipped.
+
+    Args:
+        prefix: Metric name prefix (e.g. "spotify_scheduler")
+        stats: dict of name -> number or dict of label -> number
+        documentation: Optional HELP text
+
+    Returns:
+        list: Exposition format lines
+    """
+    lines = []
+    for name, value in sorted(stats.items()):
+        metric = f"{prefix}_{name}"
+        if isinstance(value, dict):
+            samples = [
+                (f"{metric}{_format_labels([('key', key)])}", sub)
+                for key, sub in sorted(value.items())
+                if _is_number(sub)
+            ]
+        elif _is_number(value):
+            samples = [(metric, value)]
+        else:
+            continue
+
+        if samples:
+            if documentation:
+                lines.append(f"# HELP {metric} {documentation}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(f"{sample} {_format_value(float(number))}" for sample, number in samples)
+    return lines
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def generate_latest():
+    """
+    Render every registered metric.
+
+    Returns:
+        str: Prometheus text exposition format
+    """
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
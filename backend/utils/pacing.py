@@ -0,0 +1,71 @@
+"""
+Pacing utilities for outbound API calls.
+
+A token bucket lets a pool of worker threads share a single request budget,
+so concurrency can be raised without exceeding an upstream rate limit.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    ``acquire`` reserves tokens immediately and sleeps off any deficit outside
+    the lock, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate, capacity=1):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens that can accumulate (burst size)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Take ``tokens`` from the bucket, blocking until they are available.
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def reserve(self, tokens=1):
+        """
+        Take ``tokens`` from the bucket without waiting for them.
+
+        The caller must wait out the returned deficit itself before going
+        ahead (e.g. with asyncio.sleep).
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            float: Seconds until the tokens are available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
@@ -1,20 +1,284 @@
 """
 Rate limiting utilities for playlist generation endpoints.
 
-Uses in-memory storage for simplicity. For production with multiple
-workers or distributed deployment, consider using Redis.
+Limits are enforced through a pluggable backend chosen by the
+RATE_LIMIT_BACKEND config value:
+
+- "memory": per-process sliding window (default). Fast, but each worker
+  process keeps its own counts.
+- "sqlite": sliding window stored in a SQLite file (RATE_LIMIT_DB_PATH),
+  so limits hold across every worker process on the host.
+
+A request first reserves a slot atomically, so a burst of concurrent
+requests from one session can't all slip through before any of them is
+recorded. The reservation is committed when the route returns, or released
+if it raises or sets ``g.rate_limit_refund`` (e.g. for a duplicate request
+that didn't start new work).
 
 Session-based tracking allows per-browser rate limiting without requiring login.
 """
 
+import logging
+import sqlite3
+import threading
 import time
 import uuid
+from collections import OrderedDict, deque
 from functools import wraps
-from flask import request, jsonify, current_app, session
+from flask import request, jsonify, current_app, session, g
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiterBackend:
+    """
+    Interface for rate limit storage.
+
+    Each key (a session ID) may hold at most ``limit`` reservations within
+    any ``window`` seconds. Reservations count from the moment they are made.
+    """
+
+    def reserve(self, key, limit, window):
+        """
+        Atomically reserve a slot for key if it is under the limit.
+
+        Returns:
+            tuple: (reservation_id, retry_after) - reservation_id is None
+                   when the limit is reached, and retry_after is the number
+                   of seconds until a slot frees up
+        """
+        raise NotImplementedError
+
+    def commit(self, key, reservation_id):
+        """Confirm a reservation once the limited action has completed."""
+        raise NotImplementedError
+
+    def release(self, key, reservation_id):
+        """Give a reservation back (the limited action didn't happen)."""
+        raise NotImplementedError
+
+    def peek(self, key, limit, window):
+        """
+        Check the limit without reserving.
+
+        Returns:
+            tuple: (is_limited, retry_after)
+        """
+        raise NotImplementedError
+
+
+class MemoryRateLimiter(RateLimiterBackend):
+    """
+    In-process sliding-window limiter.
+
+    Each key keeps a deque of at most ``limit`` reservation timestamps, so
+    every check is O(1) amortized. Keys idle for longer than their window
+    are evicted, keeping memory bounded by the number of active sessions.
+    """
+
+    def __init__(self):
+        # key -> {"window": seconds, "last_seen": ts, "hits": deque[(ts, id)]}
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key, limit, window):
+        now = time.time()
+        with self._lock:
+            hits = self._hits(key, window, now)
+            if len(hits) >= limit:
+                return None, _retry_after(hits[0][0], window, now)
+
+            reservation_id = uuid.uuid4().hex
+            hits.append((now, reservation_id))
+            return reservation_id, 0
+
+    def commit(self, key, reservation_id):
+        # Reservations already count toward the limit; nothing to update
+        pass
+
+    def release(self, key, reservation_id):
+        with self._lock:
+            entry = self._keys.get(key)
+            if not entry:
+                return
+            for hit in entry["hits"]:
+                if hit[1] == reservation_id:
+                    entry["hits"].remove(hit)
+                    break
+
+    def peek(self, key, limit, window):
+        now = time.time()
+        with self._lock:
+            hits = self._hits(key, window, now)
+            if len(hits) >= limit:
+                return True, _retry_after(hits[0][0], window, now)
+            return False, 0
+
+    def _hits(self, key, window, now):
+        """Get a key's live hits, evicting idle keys. Caller must hold _lock."""
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = {"window": window, "last_seen": now, "hits": deque()}
+            self._keys[key] = entry
+        else:
+            self._keys.move_to_end(key)
+        entry["window"] = window
+        entry["last_seen"] = now
+
+        hits = entry["hits"]
+        while hits and now - hits[0][0] >= window:
+            hits.popleft()
+
+        # Least recently seen keys sit at the front
+        while self._keys:
+            oldest_key, oldest = next(iter(self._keys.items()))
+            if now - oldest["last_seen"] < oldest["window"]:
+                break
+            del self._keys[oldest_key]
+
+        return hits
+
+    def __len__(self):
+        with self._lock:
+            return len(self._keys)
+
+
+class SQLiteRateLimiter(RateLimiterBackend):
+    """
+    Sliding-window limiter stored in a SQLite database.
+
+    All worker processes pointing at the same file share the limits.
+    Reservations are made inside an IMMEDIATE transaction, so the check and
+    the insert are atomic across processes. Expired rows are ignored by the
+    checks and swept out at most every ``sweep_interval`` seconds.
+    """
 
-# In-memory rate limit storage
-# Format: {session_id: [timestamp1, timestamp2, ...]}
-rate_limit_store = {}
+    def __init__(self, path, sweep_interval=60):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_hits ("
+                " reservation TEXT PRIMARY KEY,"
+                " key TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS rate_limit_hits_key "
+                "ON rate_limit_hits (key, created_at)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS rate_limit_hits_expires "
+                "ON rate_limit_hits (expires_at)"
+            )
+
+    def _connect(self):
+        """Get this thread's connection (sqlite3 connections aren't shareable)."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def reserve(self, key, limit, window):
+        now = time.time()
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if now >= self._next_sweep:
+                # Drops expired rows for every key, which also evicts idle sessions
+                self._next_sweep = now + self.sweep_interval
+                db.execute("DELETE FROM rate_limit_hits WHERE expires_at <= ?", (now,))
+            count, oldest = db.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM rate_limit_hits "
+                "WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+
+            if count >= limit:
+                db.execute("COMMIT")
+                return None, _retry_after(oldest, window, now)
+
+            reservation_id = uuid.uuid4().hex
+            db.execute(
+                "INSERT INTO rate_limit_hits "
+                "(reservation, key, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (reservation_id, key, now, now + window),
+            )
+            db.execute("COMMIT")
+            return reservation_id, 0
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def commit(self, key, reservation_id):
+        # Reservations already count toward the limit; nothing to update
+        pass
+
+    def release(self, key, reservation_id):
+        self._connect().execute(
+            "DELETE FROM rate_limit_hits WHERE reservation = ?",
+            (reservation_id,),
+        )
+
+    def peek(self, key, limit, window):
+        now = time.time()
+        count, oldest = self._connect().execute(
+            "SELECT COUNT(*), MIN(created_at) FROM rate_limit_hits "
+            "WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        if count >= limit:
+            return True, _retry_after(oldest, window, now)
+        return False, 0
+
+
+def _retry_after(oldest, window, now):
+    """Seconds until the oldest hit in the window expires."""
+    return int(window - (now - oldest)) + 1
+
+
+_limiter_lock = threading.Lock()
+
+
+def create_rate_limiter(config):
+    """
+    Create the rate limiter backend selected by the app config.
+
+    Args:
+        config: Flask config mapping
+
+    Returns:
+        RateLimiterBackend: Configured backend
+    """
+    backend = config.get("RATE_LIMIT_BACKEND", "memory")
+    if backend == "memory":
+        return MemoryRateLimiter()
+    if backend == "sqlite":
+        return SQLiteRateLimiter(config.get("RATE_LIMIT_DB_PATH", "./.rate_limit.sqlite3"))
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+
+def get_rate_limiter():
+    """
+    Get the current app's rate limiter, creating it on first use.
+
+    Returns:
+        RateLimiterBackend: The app's backend
+    """
+    app = current_app._get_current_object()
+    limiter = app.extensions.get("rate_limiter")
+    if limiter is None:
+        with _limiter_lock:
+            limiter = app.extensions.get("rate_limiter")
+            if limiter is None:
+                limiter = create_rate_limiter(app.config)
+                app.extensions["rate_limiter"] = limiter
+    return limiter
 
 
 def get_session_id():
@@ -29,6 +293,11 @@ def get_session_id():
     return session['session_id']
 
 
+def _limits():
+    config = current_app.config
+    return config.get("RATE_LIMIT_MAX", 3), config.get("RATE_LIMIT_WINDOW", 60)
+
+
 def check_rate_limit():
     """
     Check if the current session has exceeded the rate limit.
@@ -36,38 +305,18 @@ def check_rate_limit():
     Returns:
         tuple: (is_limited: bool, retry_after: int) where retry_after is seconds to wait
     """
-    session_id = get_session_id()
-    current_time = time.time()
-
-    max_requests = current_app.config.get("RATE_LIMIT_MAX", 3)
-    window = current_app.config.get("RATE_LIMIT_WINDOW", 60)
-
-    # Clean up old entries
-    if session_id in rate_limit_store:
-        rate_limit_store[session_id] = [
-            t for t in rate_limit_store[session_id]
-            if current_time - t < window
-        ]
-
-    # Check limit
-    if session_id in rate_limit_store and len(rate_limit_store[session_id]) >= max_requests:
-        # Calculate time until oldest request expires
-        oldest_request = min(rate_limit_store[session_id])
-        retry_after = int(window - (current_time - oldest_request)) + 1
-        return True, retry_after
-
-    return False, 0
+    max_requests, window = _limits()
+    return get_rate_limiter().peek(get_session_id(), max_requests, window)
 
 
 def record_generation():
     """Record a playlist generation for rate limiting."""
+    max_requests, window = _limits()
+    limiter = get_rate_limiter()
     session_id = get_session_id()
-    current_time = time.time()
-
-    if session_id not in rate_limit_store:
-        rate_limit_store[session_id] = []
-
-    rate_limit_store[session_id].append(current_time)
+    reservation_id, _ = limiter.reserve(session_id, max_requests, window)
+    if reservation_id:
+        limiter.commit(session_id, reservation_id)
 
 
 def rate_limit_required(f):
@@ -77,15 +326,25 @@ def rate_limit_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        is_limited, retry_after = check_rate_limit()
+        max_requests, window = _limits()
+        limiter = get_rate_limiter()
+        session_id = get_session_id()
 
-        if is_limited:
-            session_id = get_session_id()
+        # Reserve before running the route so concurrent requests can't all pass
+        reservation_id, retry_after = limiter.reserve(session_id, max_requests, window)
+
+        if reservation_id is None:
             # Log rate limit violation (hash session_id for privacy)
             session_hash = hash(session_id) % 10000  # Simple hash for logging
-            print(f"Rate limit violation - Session: {session_hash}, "
-                  f"Endpoint: {request.endpoint}, "
-                  f"Retry after: {retry_after}s")
+            logger.info(
+                "Rate limit exceeded",
+                extra={
+                    "session": session_hash,
+                    "endpoint": request.endpoint,
+                    "retry_after": retry_after,
+                    "sample": 10,
+                },
+            )
 
             return jsonify({
                 "error": "rate_limit_exceeded",
@@ -93,12 +352,16 @@ def rate_limit_required(f):
                 "retry_after": retry_after
             }), 429
 
-        # Call the function
-        result = f(*args, **kwargs)
-
-        # Record the generation after successful call
-        record_generation()
+        try:
+            result = f(*args, **kwargs)
+        except Exception:
+            limiter.release(session_id, reservation_id)
+            raise
 
+        if g.get("rate_limit_refund"):
+            limiter.release(session_id, reservation_id)
+        else:
+            limiter.commit(session_id, reservation_id)
         return result
 
     return decorated_function
@@ -0,0 +1,365 @@
+"""
+Scheduling of outbound API requests.
+
+RequestScheduler admits requests to an upstream API through a single
+process-wide gate:
+
+- Concurrency adapts AIMD-style: each successful response raises the limit
+  a little (about one slot per round of requests), and a 429 halves it.
+- A 429's Retry-After pauses every request to that upstream until it has
+  passed, instead of each caller retrying on its own.
+- Waiting requests are admitted by priority, so interactive calls (a user
+  waiting on a page) go ahead of background work (generation jobs).
+- An optional rate ceiling is applied with a token bucket.
+
+ScheduledAdapter plugs the scheduler into a requests Session, so every
+call made through the session (including spotipy's) is scheduled without
+changes at the call sites. Coroutines (the async clients used by asgi.py)
+wait for the same slots with acquire_async.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from functools import wraps
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .pacing import TokenBucket
+
+# Request priorities (lower is served first)
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+class SchedulerTimeout(requests.exceptions.RequestException):
+    """Raised when a request waits too long for a slot."""
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    Run the enclosed outbound requests at the given priority.
+
+    Args:
+        priority: INTERACTIVE or BACKGROUND
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def inherit_priority(func):
+    """
+    Bind the caller's request priority to a function that will run on
+    another thread (e.g. one submitted to a ThreadPoolExecutor).
+
+    Args:
+        func: Function to wrap
+
+    Returns:
+        callable: Wrapper that runs func at the caller's priority
+    """
+    priority = _priority.get()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with request_priority(priority):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def parse_retry_after(value, default=1.0):
+    """
+    Parse a Retry-After header (delta seconds or an HTTP date).
+
+    Args:
+        value: Header value, or None
+        default: Seconds returned when the header is missing or invalid
+
+    Returns:
+        float: Seconds to wait
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RequestScheduler:
+    """
+    Thread-safe admission control for requests to one upstream API.
+    """
+
+    def __init__(self, initial_limit=8, max_limit=32, min_limit=1, rate=None,
+                 queue_timeout=30):
+        """
+        Args:
+            initial_limit: Concurrent requests allowed at start
+            max_limit: Upper bound for the adaptive limit
+            min_limit: Lower bound for the adaptive limit
+            rate: Optional ceiling in requests per second
+            queue_timeout: Max seconds a request waits for a slot
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.queue_timeout = queue_timeout
+        self._limit = float(initial_limit)
+        self._pacer = TokenBucket(rate, capacity=max(1, int(rate))) if rate else None
+        self._changed = threading.Condition()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._async_waiters = set()  # (loop, asyncio.Event) of waiting coroutines
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "timeouts": 0,
+            "max_queue_depth": 0,
+            "total_wait": 0.0,
+        }
+
+    def acquire(self, priority=None):
+        """
+        Block until the request may be sent.
+
+        Args:
+            priority: INTERACTIVE or BACKGROUND (defaults to the current
+                      request_priority)
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            SchedulerTimeout: If no slot frees up within queue_timeout
+        """
+        if priority is None:
+            priority = _priority.get()
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+
+        with self._changed:
+            self._waiting[priority] += 1
+            depth = sum(self._waiting.values())
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._admission_delay(priority, now)
+                    if wait == 0:
+                        break
+                    if now >= deadline:
+                        self._stats["timeouts"] += 1
+                        raise SchedulerTimeout("Timed out waiting for an upstream request slot")
+                    self._changed.wait(min(wait, deadline - now))
+            finally:
+                self._waiting[priority] -= 1
+                # Lower priority waiters may have been held back by this one
+                self._wake_waiters()
+            self._in_flight += 1
+
+        if self._pacer:
+            self._pacer.acquire()
+
+        return self._admitted(started)
+
+    async def acquire_async(self, priority=None):
+        """
+        Wait until the request may be sent, without blocking the event loop.
+
+        Same admission rules (and slots) as acquire(), so coroutines and
+        threads share one limit and one 429 pause.
+
+        Args:
+            priority: INTERACTIVE or BACKGROUND (defaults to the current
+                      request_priority)
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            SchedulerTimeout: If no slot frees up within queue_timeout
+        """
+        if priority is None:
+            priority = _priority.get()
+        loop = asyncio.get_running_loop()
+        woken = asyncio.Event()
+        waiter = (loop, woken)
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+
+        with self._changed:
+            self._waiting[priority] += 1
+            depth = sum(self._waiting.values())
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                # Cleared before checking, so a release after the check
+                # still wakes us up
+                woken.clear()
+                with self._changed:
+                    now = time.monotonic()
+                    wait = self._admission_delay(priority, now)
+                    if wait == 0:
+                        self._in_flight += 1
+                        break
+                    if now >= deadline:
+                        self._stats["timeouts"] += 1
+                        raise SchedulerTimeout("Timed out waiting for an upstream request slot")
+                try:
+                    await asyncio.wait_for(woken.wait(), min(wait, deadline - now))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._changed:
+                self._waiting[priority] -= 1
+                self._async_waiters.discard(waiter)
+                # Lower priority waiters may have been held back by this one
+                self._wake_waiters()
+
+        if self._pacer:
+            delay = self._pacer.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+
+        return self._admitted(started)
+
+    def _admitted(self, started):
+        """Count an admitted request and return how long it waited."""
+        waited = time.monotonic() - started
+        with self._changed:
+            self._stats["requests"] += 1
+            self._stats["total_wait"] += waited
+        return waited
+
+    def _admission_delay(self, priority, now):
+        """
+        Seconds to wait before checking again whether a request can go
+        (0 if it can go now). Caller must hold the lock.
+        """
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= int(self._limit):
+            return self.queue_timeout  # until a release wakes us up
+        if any(count for p, count in self._waiting.items() if p < priority):
+            return self.queue_timeout  # until the higher priority requests go
+        return 0
+
+    def release(self, status=None, retry_after=None):
+        """
+        Free a slot and adapt the concurrency limit to the response.
+
+        Args:
+            status: HTTP status of the response (None if the request failed
+                    without one)
+            retry_after: Seconds from a 429's Retry-After header
+        """
+        now = time.monotonic()
+        with self._changed:
+            self._in_flight -= 1
+
+            if status == 429:
+                self._stats["throttled"] += 1
+                # Back off once per throttling episode, not once per response
+                if now >= self._paused_until:
+                    self._limit = max(self.min_limit, self._limit / 2)
+                self._paused_until = max(self._paused_until, now + (retry_after or 1.0))
+            elif status is not None and status < 500:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Wake waiting threads and coroutines. Caller must hold the lock."""
+        self._changed.notify_all()
+        for loop, woken in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(woken.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def get_stats(self):
+        """
+        Get scheduler state and counters.
+
+        Returns:
+            dict: limit, in_flight, queued (per priority), paused_for, and
+                  the requests, throttled, timeouts, max_queue_depth and
+                  total_wait counters
+        """
+        with self._changed:
+            stats = dict(self._stats)
+            stats.update(
+                limit=int(self._limit),
+                in_flight=self._in_flight,
+                queued={
+                    "interactive": self._waiting[INTERACTIVE],
+                    "background": self._waiting[BACKGROUND],
+                },
+                paused_for=max(0.0, self._paused_until - time.monotonic()),
+            )
+            return stats
+
+
+class ScheduledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that sends every request through a RequestScheduler.
+
+    429 responses are retried (up to ``throttle_retries`` times) once the
+    scheduler's pause has passed; a Retry-After longer than
+    ``max_retry_after`` is returned to the caller instead of waited out.
+    """
+
+    def __init__(self, scheduler, throttle_retries=3, max_retry_after=30, **kwargs):
+        """
+        Args:
+            scheduler: RequestScheduler to admit requests through
+            throttle_retries: Retries for a 429 response
+            max_retry_after: Longest Retry-After (seconds) worth waiting for
+            **kwargs: Passed to HTTPAdapter
+        """
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+        self.throttle_retries = throttle_retries
+        self.max_retry_after = max_retry_after
+
+    def send(self, request, **kwargs):
+        attempt = 0
+        while True:
+            self.scheduler.acquire()
+            try:
+                response = super().send(request, **kwargs)
+            except Exception:
+                self.scheduler.release()
+                raise
+
+            if response.status_code != 429:
+                self.scheduler.release(response.status_code)
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.scheduler.release(429, retry_after)
+
+            attempt += 1
+            if attempt > self.throttle_retries or retry_after > self.max_retry_after:
+                return response
+
+            # Drain the 429 so its connection goes back to the pool
+            response.content
+            response.close()
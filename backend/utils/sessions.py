@@ -0,0 +1,284 @@
+"""
+Session storage.
+
+The session only carries the anonymous ``session_id`` used as the rate
+limit key, so it is kept as cheap as possible. The backend is chosen by the
+SESSION_BACKEND config value:
+
+- "cookie": Flask's signed cookie session (default). No server-side state
+  or disk writes; works across workers and containers as long as they
+  share SECRET_KEY.
+- "memory": server-side sessions in a per-process dict. The cookie only
+  holds a random session ID.
+- "sqlite": server-side sessions in a SQLite file (SESSION_DB_PATH) shared
+  by every worker process on the host.
+
+Server-side sessions are written only when their contents change or when
+less than half of their lifetime (PERMANENT_SESSION_LIFETIME) is left, so
+a returning visitor doesn't cost a write per request. Expired sessions are
+swept every SESSION_SWEEP_INTERVAL seconds.
+"""
+
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.sessions import SecureCookieSession, SessionInterface
+
+logger = logging.getLogger(__name__)
+
+SESSION_SWEEP_INTERVAL = 300  # seconds between expired-session sweeps
+
+
+class SessionStore:
+    """Interface for server-side session storage."""
+
+    def load(self, sid):
+        """
+        Get a session's data.
+
+        Returns:
+            tuple: (data, expires_at), or None if missing or expired
+        """
+        raise NotImplementedError
+
+    def save(self, sid, data, expires_at):
+        """Create or replace a session."""
+        raise NotImplementedError
+
+    def delete(self, sid):
+        """Remove a session."""
+        raise NotImplementedError
+
+    def sweep(self, now):
+        """
+        Remove expired sessions.
+
+        Returns:
+            int: Number of sessions removed
+        """
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process session store."""
+
+    def __init__(self):
+        self._sessions = {}  # sid -> (data, expires_at)
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return dict(entry[0]), entry[1]
+
+    def save(self, sid, data, expires_at):
+        with self._lock:
+            self._sessions[sid] = (dict(data), expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def sweep(self, now):
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._sessions.items() if expires_at <= now]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a SQLite database, shared by all worker processes
+    pointing at the same file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        db = self._connect()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " sid TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " expires_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires_at)"
+        )
+
+    def _connect(self):
+        """Get this thread's connection (sqlite3 connections aren't shareable)."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def load(self, sid):
+        row = self._connect().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?",
+            (sid, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def save(self, sid, data, expires_at):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+            (sid, json.dumps(data, separators=(",", ":")), expires_at),
+        )
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def sweep(self, now):
+        return self._connect().execute(
+            "DELETE FROM sessions WHERE expires_at <= ?", (now,)
+        ).rowcount
+
+
+class ServerSession(SecureCookieSession):
+    """Session dict that remembers its ID and stored expiry."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.expires_at = expires_at
+
+
+class StoreSessionInterface(SessionInterface):
+    """Flask session interface backed by a SessionStore."""
+
+    session_class = ServerSession
+
+    def __init__(self, store, sweep_interval=SESSION_SWEEP_INTERVAL):
+        """
+        Args:
+            store: SessionStore to keep sessions in
+            sweep_interval: Seconds between expired-session sweeps
+        """
+        self.store = store
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+        self._sweep_lock = threading.Lock()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            try:
+                stored = self.store.load(sid)
+            except sqlite3.Error as e:
+                logger.warning("Session load failed: %s", e)
+                stored = None
+            if stored is not None:
+                data, expires_at = stored
+                return self.session_class(data, sid=sid, expires_at=expires_at)
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.sid and session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        stale = session.sid and session.expires_at - now < lifetime / 2
+        if not (session.modified or stale):
+            return
+
+        is_new = session.sid is None
+        sid = session.sid or secrets.token_urlsafe(32)
+        try:
+            self.store.save(sid, dict(session), now + lifetime)
+        except sqlite3.Error as e:
+            logger.warning("Session save failed: %s", e)
+            return
+        self._maybe_sweep(now)
+
+        if is_new or session.permanent:
+            response.set_cookie(
+                name,
+                sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+    def _maybe_sweep(self, now):
+        with self._sweep_lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        try:
+            removed = self.store.sweep(now)
+        except sqlite3.Error as e:
+            logger.warning("Session sweep failed: %s", e)
+            return
+        if removed:
+            logger.debug("Swept %d expired sessions", removed)
+
+
+def create_session_interface(config):
+    """
+    Create the session interface selected by the app config.
+
+    Args:
+        config: Flask config mapping
+
+    Returns:
+        SessionInterface: Server-side interface, or None to keep Flask's
+                          signed cookie sessions
+    """
+    backend = config.get("SESSION_BACKEND", "cookie")
+    if backend == "cookie":
+        return None
+    if backend == "memory":
+        return StoreSessionInterface(MemorySessionStore())
+    if backend == "sqlite":
+        return StoreSessionInterface(
+            SQLiteSessionStore(config.get("SESSION_DB_PATH", "./.sessions.sqlite3"))
+        )
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+
+def init_sessions(app):
+    """
+    Install the configured session backend on an app.
+
+    Args:
+        app: Flask application
+    """
+    interface = create_session_interface(app.config)
+    if interface is not None:
+        app.session_interface = interface
+    elif not os.getenv("SECRET_KEY") and not app.debug:
+        logger.warning(
+            "SECRET_KEY is not set; cookie sessions (and rate limits) won't carry "
+            "over between worker processes or restarts"
+        )
@@ -0,0 +1,236 @@
+"""
+In-memory serving of the built frontend.
+
+At startup every file in frontend/dist is read into a manifest together
+with its gzip (and, if the brotli package is installed, brotli) variant,
+a strong ETag and its cache policy, so a request for an asset is a dict
+lookup instead of filesystem checks and a file read.
+
+- Hashed Vite assets (assets/index-B3xZ9aQ1.js) never change under the
+  same name and are served with a one-year immutable Cache-Control.
+- Everything else, including index.html for the SPA fallback, is served
+  with no-cache so browsers revalidate it with the ETag (a 304 if
+  unchanged).
+- .gz/.br files already present in dist (e.g. from a build plugin) are
+  used as the compressed variants instead of compressing at startup.
+
+With reload on (development), the manifest is rebuilt when files in dist
+change, so `vite build --watch` output is picked up without a restart.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Static serving settings
+STATIC_MIN_COMPRESS_SIZE = 1024  # bytes; smaller files aren't worth compressing
+STATIC_RELOAD_INTERVAL = 1.0  # seconds between change checks in reload mode
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_COMPRESSIBLE = {
+    ".html", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".txt", ".xml",
+    ".ico", ".webmanifest",
+}
+# Vite's default asset names: assets/<name>-<8+ char hash>.<ext>
+_HASHED_ASSET = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.\w+$")
+_PRECOMPRESSED = {".br": "br", ".gz": "gzip"}
+
+
+class StaticFile:
+    """One file of the manifest with its compressed variants."""
+
+    def __init__(self, path, data, immutable):
+        """
+        Args:
+            path: Path relative to the root, with forward slashes
+            data: File contents
+            immutable: Whether the name is content-hashed
+        """
+        self.path = path
+        self.data = data
+        self.immutable = immutable
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = hashlib.sha256(data).hexdigest()[:32]
+        self.variants = {}  # content coding -> bytes
+
+    def compress(self):
+        """Add gzip/brotli variants that are meaningfully smaller."""
+        if os.path.splitext(self.path)[1] not in _COMPRESSIBLE:
+            return
+        if len(self.data) < STATIC_MIN_COMPRESS_SIZE:
+            return
+        if "gzip" not in self.variants:
+            self.add_variant("gzip", gzip.compress(self.data, compresslevel=9, mtime=0))
+        if brotli is not None and "br" not in self.variants:
+            self.add_variant("br", brotli.compress(self.data, quality=11))
+
+    def add_variant(self, coding, data):
+        if len(data) < len(self.data) * 0.9:
+            self.variants[coding] = data
+
+
+class StaticManifest:
+    """Files of a directory held in memory, ready to serve."""
+
+    def __init__(self, root, reload=False, fallback="index.html"):
+        """
+        Args:
+            root: Directory to serve
+            reload: Rebuild the manifest when files change (development)
+            fallback: File served for paths that don't match a file
+        """
+        self.root = str(root)
+        self.reload = reload
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._files = {}
+        self._signature = None
+        self._checked = 0.0
+        self.load()
+
+    def _scan(self):
+        """List (relative path, mtime, size) for every file under root."""
+        entries = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                full = os.path.join(directory, name)
+                try:
+                    stat = os.stat(full)
+                except OSError:
+                    continue
+                rel = os.path.relpath(full, self.root).replace(os.sep, "/")
+                entries.append((rel, stat.st_mtime_ns, stat.st_size))
+        return sorted(entries)
+
+    def load(self):
+        """(Re)build the manifest from disk."""
+        started = time.perf_counter()
+        signature = self._scan()
+        paths = {rel for rel, _, _ in signature}
+
+        files = {}
+        precompressed = []
+        for rel, _, _ in signature:
+            base, ext = os.path.splitext(rel)
+            if ext in _PRECOMPRESSED and base in paths:
+                precompressed.append((base, _PRECOMPRESSED[ext], rel))
+                continue
+            try:
+                with open(os.path.join(self.root, rel), "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                logger.warning("Could not read %s: %s", rel, e)
+                continue
+            files[rel] = StaticFile(rel, data, bool(_HASHED_ASSET.match(rel)))
+
+        for base, coding, rel in precompressed:
+            if base not in files:
+                continue
+            try:
+                with open(os.path.join(self.root, rel), "rb") as f:
+                    files[base].add_variant(coding, f.read())
+            except OSError as e:
+                logger.warning("Could not read %s: %s", rel, e)
+        for entry in files.values():
+            entry.compress()
+
+        with self._lock:
+            self._files = files
+            self._signature = signature
+            self._checked = time.monotonic()
+
+        if files:
+            logger.info(
+                "Loaded %d frontend files in %.2fs", len(files), time.perf_counter() - started,
+                extra={
+                    "bytes": sum(len(f.data) for f in files.values()),
+                    "brotli": brotli is not None,
+                },
+            )
+        else:
+            logger.warning("No frontend build found in %s", self.root)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked < STATIC_RELOAD_INTERVAL:
+                return
+            self._checked = now
+            previous = self._signature
+        if self._scan() != previous:
+            self.load()
+
+    def get(self, path):
+        """
+        Look up a file, falling back to the SPA entry point.
+
+        Missing files under assets/ are not given the fallback, so a stale
+        script tag gets a 404 instead of HTML.
+
+        Args:
+            path: Request path relative to the root
+
+        Returns:
+            StaticFile: The file, or None
+        """
+        if self.reload:
+            self._maybe_reload()
+        with self._lock:
+            files = self._files
+        entry = files.get(path)
+        if entry is None and not path.startswith("assets/"):
+            entry = files.get(self.fallback)
+        return entry
+
+    def serve(self, path):
+        """
+        Build the response for a request path.
+
+        Args:
+            path: Request path relative to the root
+
+        Returns:
+            Response: The file (200), 304 if the client's copy is current,
+                      or None if there's nothing to serve
+        """
+        entry = self.get(path)
+        if entry is None:
+            return None
+
+        coding = None
+        if entry.variants:
+            offered = [c for c in ("br", "gzip") if c in entry.variants] + ["identity"]
+            coding = request.accept_encodings.best_match(offered, default="identity")
+        data = entry.variants.get(coding, entry.data)
+        coding = coding if coding in entry.variants else None
+        etag = f"{entry.etag}-{coding}" if coding else entry.etag
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(data, mimetype=entry.mimetype)
+            if coding:
+                response.headers["Content-Encoding"] = coding
+
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL if entry.immutable else REVALIDATE_CACHE_CONTROL
+        )
+        if entry.variants:
+            response.vary.add("Accept-Encoding")
+        return response
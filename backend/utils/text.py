@@ -0,0 +1,158 @@
+"""
+Text normalization helpers for matching track titles and artist names.
+"""
+
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+# Title decorations: "(feat. X)", "[Remastered]", " - Live at ...", " feat. X"
+_BRACKETED = re.compile(r"\s*[\(\[][^\)\]]*[\)\]]")
+_DASH_SUFFIX = re.compile(r"\s+-\s+.*$")
+_FEATURING = re.compile(r"\s+(?:feat\.?|ft\.?|featuring)\s+.*$", re.IGNORECASE)
+_BRACKETED_FEATURING = re.compile(
+    r"\s*[\(\[](?:feat\.?|ft\.?|featuring|with)\s[^\)\]]*[\)\]]", re.IGNORECASE
+)
+_ARTIST_SEPARATORS = re.compile(r"\s*(?:,|;|\s/\s|\s+x\s+|\s+with\s+)\s*", re.IGNORECASE)
+
+
+def normalize_text(value):
+    """
+    Normalize a title or artist name for comparison.
+
+    Lowercases, strips accents, turns '&' into 'and', drops punctuation
+    and collapses whitespace, so "Beyoncé & JAY-Z" and "beyonce and jay z"
+    compare equal.
+
+    Args:
+        value: String to normalize (None is treated as empty)
+
+    Returns:
+        str: Normalized string
+    """
+    if not value:
+        return ""
+
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    value = value.lower().replace("&", " and ")
+    value = _PUNCTUATION.sub(" ", value)
+    return _WHITESPACE.sub(" ", value).strip()
+
+
+def strip_featuring(value):
+    """
+    Remove featured-artist credits from a track title.
+
+    "Song (feat. X) - Live" becomes "Song - Live": unlike strip_title, the
+    version information is kept.
+
+    Args:
+        value: Track title
+
+    Returns:
+        str: Title without featuring credits
+    """
+    if not value:
+        return ""
+
+    stripped = _BRACKETED_FEATURING.sub("", value)
+    return _FEATURING.sub("", stripped).strip() or value
+
+
+def strip_title(value):
+    """
+    Remove version and featuring decorations from a track title.
+
+    "Song (feat. X) - Remastered 2011" becomes "Song". Titles that are
+    nothing but decorations are returned unchanged.
+
+    Args:
+        value: Track title
+
+    Returns:
+        str: Title without decorations
+    """
+    if not value:
+        return ""
+
+    stripped = _BRACKETED.sub("", value)
+    stripped = _DASH_SUFFIX.sub("", stripped)
+    stripped = _FEATURING.sub("", stripped).strip()
+    return stripped or value
+
+
+def primary_artist(value):
+    """
+    Get the lead artist from an artist credit.
+
+    "Calvin Harris feat. Rihanna" and "Calvin Harris, Rihanna" both give
+    "Calvin Harris". Names joined with "&" are kept, since that is usually
+    part of the act's name.
+
+    Args:
+        value: Artist credit
+
+    Returns:
+        str: Lead artist
+    """
+    if not value:
+        return ""
+
+    lead = _FEATURING.sub("", value)
+    return _ARTIST_SEPARATORS.split(lead, maxsplit=1)[0].strip() or value
+
+
+def similarity(a, b):
+    """
+    Score how alike two normalized strings are.
+
+    Args:
+        a: First string (already passed through normalize_text)
+        b: Second string (already passed through normalize_text)
+
+    Returns:
+        float: Ratio between 0.0 (nothing in common) and 1.0 (identical)
+    """
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def similarity_many(query, choices, cutoff=0.0):
+    """
+    Score one normalized string against many in a single pass.
+
+    The query's match index is built once and reused for every choice
+    (difflib caches it for the second sequence), and choices whose cheap
+    upper bounds already fall below ``cutoff`` skip the full comparison.
+
+    Args:
+        query: String to compare (already passed through normalize_text)
+        choices: Strings to compare it with (normalized likewise)
+        cutoff: Scores known to be below this are reported as 0.0
+
+    Returns:
+        list: Ratio (as in similarity) for each choice, in order
+    """
+    matcher = SequenceMatcher(None)
+    matcher.set_seq2(query)
+    scores = []
+    for choice in choices:
+        if choice == query:
+            scores.append(1.0)
+            continue
+        if not choice or not query:
+            scores.append(0.0)
+            continue
+        matcher.set_seq1(choice)
+        if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+            scores.append(0.0)
+            continue
+        scores.append(matcher.ratio())
+    return scores
@@ -7,6 +7,7 @@ import type {
   Playlist,
   Track,
   GeneratedPlaylist,
+  GenerationJob,
   PlaylistValidation,
   ApiError,
   PlaylistOwnerResponse,
@@ -72,22 +73,87 @@ class ApiClient {
   }
 
   /**
-   * Generate a playlist from an existing playlist
+   * Generate a playlist from an existing playlist, waiting for the result
    */
   async generateFromPlaylist(playlistId: string): Promise<GeneratedPlaylist> {
     return this.fetchJson<GeneratedPlaylist>('/generate/from-playlist', {
       method: 'POST',
-      body: JSON.stringify({ playlist_id: playlistId }),
+      body: JSON.stringify({ playlist_id: playlistId, wait: true }),
     });
   }
 
   /**
-   * Generate a playlist from a text description
+   * Generate a playlist from a text description, waiting for the result
    */
   async generateFromText(description: string): Promise<GeneratedPlaylist> {
     return this.fetchJson<GeneratedPlaylist>('/generate/from-text', {
       method: 'POST',
-      body: JSON.stringify({ description }),
+      body: JSON.stringify({ description, wait: true }),
+    });
+  }
+
+  /**
+   * Start generating a playlist from an existing playlist in the background
+   */
+  async startGenerationFromPlaylist(playlistId: string): Promise<GenerationJob> {
+    return this.fetchJson<GenerationJob>('/generate/from-playlist', {
+      method: 'POST',
+      body: JSON.stringify({ playlist_id: playlistId, async: true }),
+    });
+  }
+
+  /**
+   * Start generating a playlist from a text description in the background
+   */
+  async startGenerationFromText(description: string): Promise<GenerationJob> {
+    return this.fetchJson<GenerationJob>('/generate/from-text', {
+      method: 'POST',
+      body: JSON.stringify({ description, async: true }),
+    });
+  }
+
+  /**
+   * Follow a generation job's event stream until it finishes.
+   * onEvent is called for every progress event (stage changes, resolved tracks).
+   */
+  followGenerationJob(
+    job: GenerationJob,
+    onEvent: (event: string, data: any) => void
+  ): Promise<GeneratedPlaylist> {
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(job.events_url);
+      const progressEvents = [
+        'fetching_playlist',
+        'waiting_for_logic',
+        'logic_response',
+        'track',
+        'adding_tracks',
+        'tracks_added',
+      ];
+
+      progressEvents.forEach((name) => {
+        source.addEventListener(name, (e) => {
+          onEvent(name, JSON.parse((e as MessageEvent).data));
+        });
+      });
+
+      source.addEventListener('done', (e) => {
+        source.close();
+        resolve(JSON.parse((e as MessageEvent).data).result);
+      });
+
+      source.addEventListener('failed', (e) => {
+        source.close();
+        const { error } = JSON.parse((e as MessageEvent).data);
+        reject(new Error(error.message || error.error || 'Failed to generate playlist'));
+      });
+
+      // EventSource reconnects on its own; only give up once it has closed
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          reject(new Error('Lost connection while generating playlist'));
+        }
+      };
     });
   }
 
@@ -23,6 +23,35 @@ export function ResultCard() {
 
   // Loading state
   if (state.status === 'loading') {
+    const progress = state.progress;
+
+    // Show the playlist as it fills in once Logic has responded
+    if (progress?.title) {
+      return (
+        <div className="flex flex-col h-full min-h-0">
+          <div className="flex-shrink-0">
+            <h3 className="text-xl font-bold text-white mb-2">
+              {progress.title}
+            </h3>
+            <p className="text-spotify-text text-sm">{progress.description}</p>
+          </div>
+
+          <div className="flex-1 min-h-0 overflow-y-auto my-4">
+            <TrackList tracks={progress.tracks} />
+          </div>
+
+          <div className="shrink-0 flex items-center gap-3 text-spotify-text text-sm">
+            <div className="w-5 h-5 border-2 border-spotify-green border-t-transparent rounded-full animate-spin" />
+            {progress.stage === 'adding_tracks' || progress.stage === 'tracks_added'
+              ? 'Adding tracks to your playlist...'
+              : `Finding tracks on Spotify (${progress.tracks.length}${
+                  progress.tracksTotal ? ` of ${progress.tracksTotal}` : ''
+                })...`}
+          </div>
+        </div>
+      );
+    }
+
     return (
       <div className="flex flex-col items-center justify-center h-full text-center">
         <div className="w-16 h-16 border-4 border-spotify-green border-t-transparent rounded-full animate-spin mb-4" />
@@ -5,7 +5,12 @@ import {
   useState,
   useCallback,
 } from 'react';
-import type { GenerationState, GeneratedPlaylist } from '../types';
+import type {
+  GenerationState,
+  GenerationJob,
+  GenerationProgress,
+  Track,
+} from '../types';
 import { api } from '../api/client';
 
 interface GenerationContextType {
@@ -35,8 +40,32 @@ const initialState: GenerationState = {
   status: 'idle',
   result: null,
   error: null,
+  progress: null,
 };
 
+const initialProgress: GenerationProgress = {
+  stage: 'queued',
+  title: null,
+  description: null,
+  tracksTotal: null,
+  tracks: [],
+};
+
+function getErrorMessage(e: unknown): string {
+  let errorMessage = 'Failed to generate playlist';
+  if (e instanceof Error) {
+    // Check if error contains retry_after (format: "message|||retryAfter")
+    const parts = e.message.split('|||');
+    if (parts.length === 2) {
+      // Use the message which already includes the retry_after time
+      errorMessage = parts[0];
+    } else {
+      errorMessage = e.message;
+    }
+  }
+  return errorMessage;
+}
+
 export function GenerationProvider({ children }: GenerationProviderProps) {
   const [state, setState] = useState<GenerationState>(initialState);
   const [selectedPlaylistId, setSelectedPlaylistId] = useState<string | null>(
@@ -69,37 +98,74 @@ export function GenerationProvider({ children }: GenerationProviderProps) {
     setTextDescriptionState(text);
   }, []);
 
+  const runGeneration = useCallback(
+    async (start: () => Promise<GenerationJob>) => {
+      setState({
+        status: 'loading',
+        result: null,
+        error: null,
+        progress: initialProgress,
+      });
+
+      // Resolved tracks arrive out of order; keep them sorted by position
+      const resolved: { index: number; track: Track }[] = [];
+
+      const updateProgress = (update: Partial<GenerationProgress>) => {
+        setState((prev) =>
+          prev.status === 'loading' && prev.progress
+            ? { ...prev, progress: { ...prev.progress, ...update } }
+            : prev
+        );
+      };
+
+      try {
+        const job = await start();
+        const result = await api.followGenerationJob(job, (event, data) => {
+          if (event === 'logic_response') {
+            updateProgress({
+              stage: event,
+              title: data.title,
+              description: data.description,
+              tracksTotal: data.tracks_total,
+            });
+          } else if (event === 'track') {
+            if (data.track) {
+              resolved.push({ index: data.index, track: data.track });
+              resolved.sort((a, b) => a.index - b.index);
+              updateProgress({ tracks: resolved.map((r) => r.track) });
+            }
+          } else {
+            updateProgress({ stage: event });
+          }
+        });
+        setState({ status: 'success', result, error: null, progress: null });
+      } catch (e) {
+        setState({
+          status: 'error',
+          result: null,
+          error: getErrorMessage(e),
+          progress: null,
+        });
+      }
+    },
+    []
+  );
+
   const generateFromPlaylist = useCallback(async () => {
     if (!selectedPlaylistId) {
       setState({
         status: 'error',
         result: null,
         error: 'Please select a playlist first',
+        progress: null,
       });
       return;
     }
 
-    setState({ status: 'loading', result: null, error: null });
-
-    try {
-      const result: GeneratedPlaylist =
-        await api.generateFromPlaylist(selectedPlaylistId);
-      setState({ status: 'success', result, error: null });
-    } catch (e) {
-      let errorMessage = 'Failed to generate playlist';
-      if (e instanceof Error) {
-        // Check if error contains retry_after (format: "message|||retryAfter")
-        const parts = e.message.split('|||');
-        if (parts.length === 2) {
-          // Use the message which already includes the retry_after time
-          errorMessage = parts[0];
-        } else {
-          errorMessage = e.message;
-        }
-      }
-      setState({ status: 'error', result: null, error: errorMessage });
-    }
-  }, [selectedPlaylistId]);
+    await runGeneration(() =>
+      api.startGenerationFromPlaylist(selectedPlaylistId)
+    );
+  }, [selectedPlaylistId, runGeneration]);
 
   const generateFromText = useCallback(async () => {
     if (!textDescription.trim()) {
@@ -107,31 +173,13 @@ export function GenerationProvider({ children }: GenerationProviderProps) {
         status: 'error',
         result: null,
         error: 'Please enter a description first',
+        progress: null,
       });
       return;
     }
 
-    setState({ status: 'loading', result: null, error: null });
-
-    try {
-      const result: GeneratedPlaylist =
-        await api.generateFromText(textDescription);
-      setState({ status: 'success', result, error: null });
-    } catch (e) {
-      let errorMessage = 'Failed to generate playlist';
-      if (e instanceof Error) {
-        // Check if error contains retry_after (format: "message|||retryAfter")
-        const parts = e.message.split('|||');
-        if (parts.length === 2) {
-          // Use the message which already includes the retry_after time
-          errorMessage = parts[0];
-        } else {
-          errorMessage = e.message;
-        }
-      }
-      setState({ status: 'error', result: null, error: errorMessage });
-    }
-  }, [textDescription]);
+    await runGeneration(() => api.startGenerationFromText(textDescription));
+  }, [textDescription, runGeneration]);
 
   const reset = useCallback(() => {
     setState(initialState);
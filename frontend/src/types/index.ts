@@ -50,10 +50,26 @@ export interface PlaylistValidation {
 
 export type GenerationStatus = 'idle' | 'loading' | 'success' | 'error';
 
+export interface GenerationJob {
+  job_id: string;
+  status: string;
+  status_url: string;
+  events_url: string;
+}
+
+export interface GenerationProgress {
+  stage: string;
+  title: string | null;
+  description: string | null;
+  tracksTotal: number | null;
+  tracks: Track[];
+}
+
 export interface GenerationState {
   status: GenerationStatus;
   result: GeneratedPlaylist | null;
   error: string | null;
+  progress: GenerationProgress | null;
 }
 
 export interface ApiError {